@@ -0,0 +1,345 @@
+""" Benchmark tsrc against synthetic workspaces
+
+Generates a local "git server" made of bare repositories, along with a
+manifest referencing them, then times the main tsrc commands.
+
+Results are written as JSON so that they can be compared between releases:
+
+    $ python bench/bench.py --repos 100 --output before.json
+    $ python bench/bench.py --repos 100 --compare before.json
+
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional  # noqa
+
+import cli_ui as ui
+from path import Path
+import ruamel.yaml
+
+TSRC_MAIN = "import tsrc.cli.main; tsrc.cli.main.main()"
+
+
+def git(working_path: Path, *args: str, stdin: Optional[bytes] = None) -> str:
+    env = os.environ.copy()
+    # Make sure commits are reproducible and do not depend on the user's config
+    env.update(
+        {
+            "GIT_AUTHOR_NAME": "bench",
+            "GIT_AUTHOR_EMAIL": "bench@example.com",
+            "GIT_COMMITTER_NAME": "bench",
+            "GIT_COMMITTER_EMAIL": "bench@example.com",
+        }
+    )
+    process = subprocess.run(
+        ["git"] + list(args),
+        cwd=working_path,
+        input=stdin,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=env,
+        check=True,
+    )
+    return process.stdout.decode().strip()
+
+
+def fast_import_stream(
+    *, num_commits: int, num_files: int, start: int = 0, parent: str = ""
+) -> bytes:
+    """ Build a `git fast-import` stream creating `num_commits` commits
+    on master. The first one adds `num_files` files, and the next ones
+    modify one file each.
+
+    """
+    lines = list()  # type: List[str]
+    for i in range(start, start + num_commits):
+        message = "commit %d" % i
+        lines.append("commit refs/heads/master")
+        lines.append("committer bench <bench@example.com> %d +0000" % (1500000000 + i))
+        lines.append("data %d" % len(message))
+        lines.append(message)
+        if i == start and parent:
+            lines.append("from %s" % parent)
+        if i == 0:
+            for j in range(num_files):
+                contents = "file %d\n" % j
+                lines.append("M 644 inline src/file_%d.txt" % j)
+                lines.append("data %d" % len(contents))
+                lines.append(contents)
+        else:
+            contents = "file %d, change %d\n" % (i % num_files, i)
+            lines.append("M 644 inline src/file_%d.txt" % (i % num_files))
+            lines.append("data %d" % len(contents))
+            lines.append(contents)
+        lines.append("")
+    return "\n".join(lines).encode()
+
+
+class SyntheticWorkspace:
+    """ A set of bare repositories and a manifest referencing them """
+
+    def __init__(
+        self,
+        root_path: Path,
+        *,
+        num_repos: int,
+        depth: int,
+        num_files: int,
+        num_groups: int
+    ) -> None:
+        self.root_path = root_path
+        self.srv_path = root_path / "srv"
+        self.num_repos = num_repos
+        self.depth = depth
+        self.num_files = num_files
+        self.num_groups = num_groups
+        self.repo_names = ["repo-%04d" % i for i in range(num_repos)]
+        self.changes = 0
+
+    @property
+    def manifest_url(self) -> str:
+        return "file://" + str(self.srv_path / "manifest.git")
+
+    def generate(self) -> None:
+        self.srv_path.makedirs_p()
+        template_path = self.srv_path / "template.git"
+        git(self.srv_path, "init", "--quiet", "--bare", template_path)
+        git(template_path, "symbolic-ref", "HEAD", "refs/heads/master")
+        stream = fast_import_stream(num_commits=self.depth, num_files=self.num_files)
+        git(template_path, "fast-import", "--quiet", stdin=stream)
+        # Copying the template is much faster than re-creating each repo
+        for name in self.repo_names:
+            shutil.copytree(template_path, self.srv_path / (name + ".git"))
+        self.generate_manifest()
+
+    def manifest_data(self) -> Dict[str, Any]:
+        repos = list()
+        for name in self.repo_names:
+            url = "file://" + str(self.srv_path / (name + ".git"))
+            repos.append({"src": name, "url": url})
+        res = {"repos": repos}  # type: Dict[str, Any]
+        if self.num_groups:
+            groups = dict()  # type: Dict[str, Any]
+            for i in range(self.num_groups):
+                members = self.repo_names[i :: self.num_groups]
+                groups["group-%d" % i] = {"repos": members}
+            res["groups"] = groups
+        return res
+
+    def generate_manifest(self) -> None:
+        manifest_path = self.root_path / "manifest"
+        manifest_path.makedirs_p()
+        git(manifest_path, "init", "--quiet")
+        git(manifest_path, "symbolic-ref", "HEAD", "refs/heads/master")
+        yaml = ruamel.yaml.YAML()
+        with (manifest_path / "manifest.yml").open("w") as fileobj:
+            yaml.dump(self.manifest_data(), fileobj)
+        git(manifest_path, "add", "manifest.yml")
+        git(manifest_path, "commit", "--quiet", "--message", "Add manifest")
+        bare_path = self.srv_path / "manifest.git"
+        git(self.root_path, "clone", "--quiet", "--bare", manifest_path, bare_path)
+
+    def push_changes(self, ratio: float) -> None:
+        """ Add a new commit on the master branch of a fraction of the repos """
+        num_changed = max(1, int(self.num_repos * ratio))
+        for name in self.repo_names[:num_changed]:
+            bare_path = self.srv_path / (name + ".git")
+            parent = git(bare_path, "rev-parse", "master")
+            stream = fast_import_stream(
+                num_commits=1,
+                num_files=self.num_files,
+                start=self.depth + self.changes,
+                parent=parent,
+            )
+            git(bare_path, "fast-import", "--quiet", stdin=stream)
+        self.changes += 1
+
+
+class Benchmark:
+    def __init__(self, args: argparse.Namespace, root_path: Path) -> None:
+        self.args = args
+        self.root_path = root_path
+        self.workspace_path = root_path / "work"
+        self.synthetic = SyntheticWorkspace(
+            root_path,
+            num_repos=args.repos,
+            depth=args.depth,
+            num_files=args.files,
+            num_groups=args.groups,
+        )
+        self.results = dict()  # type: Dict[str, List[float]]
+
+    def tsrc(self, *args: str) -> float:
+        cmd = [sys.executable, "-c", TSRC_MAIN]
+        cmd.extend(args)
+        start = time.perf_counter()
+        subprocess.run(
+            cmd,
+            cwd=self.workspace_path,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+        return time.perf_counter() - start
+
+    def measure(self, name: str, func: Callable[[], float]) -> None:
+        ui.info_2(name)
+        timings = [func() for _ in range(self.args.runs)]
+        self.results[name] = timings
+        ui.info(ui.tabs(1), "%.3fs" % min(timings))
+
+    def time_init(self) -> float:
+        if self.workspace_path.exists():
+            self.workspace_path.rmtree()
+        self.workspace_path.makedirs_p()
+        return self.tsrc("init", self.synthetic.manifest_url)
+
+    def time_sync_with_changes(self) -> float:
+        self.synthetic.push_changes(self.args.changed_ratio)
+        return self.tsrc("sync")
+
+    def time_manifest_load(self) -> float:
+        import tsrc.manifest
+
+        manifest_path = self.workspace_path / ".tsrc/manifest/manifest.yml"
+        start = time.perf_counter()
+        tsrc.manifest.load(manifest_path)
+        return time.perf_counter() - start
+
+    def run(self) -> None:
+        ui.info_1("Generating workspace with %d repos" % self.args.repos)
+        self.synthetic.generate()
+        self.measure("init", self.time_init)
+        self.measure("manifest-load", self.time_manifest_load)
+        self.measure("sync-noop", lambda: self.tsrc("sync"))
+        self.measure("sync-changes", self.time_sync_with_changes)
+        self.measure("status", lambda: self.tsrc("status"))
+        self.measure(
+            "foreach", lambda: self.tsrc("foreach", "--", "git", "rev-parse", "HEAD")
+        )
+
+    def as_json(self) -> Dict[str, Any]:
+        results = dict()
+        for name, timings in self.results.items():
+            results[name] = {
+                "runs": timings,
+                "min": min(timings),
+                "median": statistics.median(timings),
+                "mean": statistics.mean(timings),
+            }
+        return {
+            "tsrc_version": get_tsrc_version(),
+            "git_version": git(self.root_path, "--version"),
+            "python_version": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {
+                "repos": self.args.repos,
+                "depth": self.args.depth,
+                "files": self.args.files,
+                "groups": self.args.groups,
+                "runs": self.args.runs,
+                "changed_ratio": self.args.changed_ratio,
+            },
+            "results": results,
+        }
+
+
+def get_tsrc_version() -> str:
+    import tsrc
+
+    setup_cfg = Path(tsrc.__file__).parent.parent / "setup.cfg"
+    for line in setup_cfg.lines(retain=False):
+        if line.startswith("version ="):
+            return line.split("=")[1].strip()
+    return "unknown"
+
+
+def compare(
+    previous: Dict[str, Any], current: Dict[str, Any], threshold: float
+) -> bool:
+    """ Display the ratio between previous and current timings. Return
+    False if any of them exceeds `threshold`
+
+    """
+    ok = True
+    data = list()
+    for name, result in current["results"].items():
+        before = previous["results"].get(name)
+        if not before:
+            continue
+        ratio = result["min"] / before["min"]
+        if ratio > threshold:
+            ok = False
+            color = ui.red
+        else:
+            color = ui.green
+        data.append(
+            (
+                (ui.bold, name),
+                (ui.reset, "%.3fs" % before["min"]),
+                (ui.reset, "%.3fs" % result["min"]),
+                (color, "x%.2f" % ratio),
+            )
+        )
+    ui.info_table(data, headers=["benchmark", "before", "after", "ratio"])
+    return ok
+
+
+def run_benchmark(args: argparse.Namespace, root_path: Path) -> Dict[str, Any]:
+    benchmark = Benchmark(args, root_path)
+    benchmark.run()
+    return benchmark.as_json()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repos", type=int, default=10, help="number of repos")
+    parser.add_argument("--depth", type=int, default=10, help="commits per repo")
+    parser.add_argument("--files", type=int, default=10, help="files per repo")
+    parser.add_argument("--groups", type=int, default=0, help="number of groups")
+    parser.add_argument("--runs", type=int, default=3, help="runs per benchmark")
+    parser.add_argument(
+        "--changed-ratio",
+        type=float,
+        default=0.1,
+        help="ratio of repos changed before each 'sync-changes' run",
+    )
+    parser.add_argument("--workdir", type=Path, help="where to create the workspace")
+    parser.add_argument("-o", "--output", type=Path, help="write results to this file")
+    parser.add_argument("--compare", type=Path, help="compare with previous results")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=1.2,
+        help="fail if a benchmark is slower than this ratio",
+    )
+    args = parser.parse_args()
+
+    if args.workdir:
+        args.workdir.makedirs_p()
+        as_json = run_benchmark(args, args.workdir)
+    else:
+        with tempfile.TemporaryDirectory(prefix="tsrc-bench-") as tmp:
+            as_json = run_benchmark(args, Path(tmp))
+
+    if args.output:
+        args.output.write_text(json.dumps(as_json, indent=2))
+        ui.info_1("Results written to", args.output)
+    if args.compare:
+        previous = json.loads(args.compare.text())
+        if not compare(previous, as_json, args.max_regression):
+            ui.error("Performance regression detected")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
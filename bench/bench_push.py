@@ -0,0 +1,318 @@
+""" Benchmark how `tsrc push` looks for an opened pull request on GitHub
+
+Starts a local HTTP server standing in for the GitHub API, serving a
+repository with a configurable number of pull requests, then times the
+lookup of the pull request for a new branch, using:
+
+* the `state` and `head` filters of the GitHub API, like `tsrc push` does
+* a scan of every opened pull request of the repository, like older
+  versions did
+
+    $ python bench/bench_push.py --history 100 1000 10000
+
+"""
+
+import argparse
+import http.server
+import json
+import socketserver
+import threading
+import time
+import urllib.parse
+from typing import cast, Any, Callable, Dict, List, Optional  # noqa
+
+import cli_ui as ui
+import github3
+from github3.repos.repo import ShortRepository
+from path import Path
+
+from tsrc.cli.push import RepositoryInfo
+from tsrc.cli.push_github import PushAction
+
+OWNER = "owner"
+PROJECT = "project"
+
+
+def make_user(base_url: str, login: str) -> Dict[str, Any]:
+    url = "%s/users/%s" % (base_url, login)
+    res = {"id": 1, "login": login, "type": "User", "gravatar_id": "", "url": url}
+    for name in [
+        "avatar",
+        "events",
+        "followers",
+        "following",
+        "gists",
+        "html",
+        "organizations",
+        "received_events",
+        "repos",
+        "starred",
+        "subscriptions",
+    ]:
+        res[name + "_url"] = url + "/" + name
+    return res
+
+
+def make_repository(base_url: str) -> Dict[str, Any]:
+    url = "%s/repos/%s/%s" % (base_url, OWNER, PROJECT)
+    res = {
+        "id": 1,
+        "name": PROJECT,
+        "full_name": "%s/%s" % (OWNER, PROJECT),
+        "description": "",
+        "fork": False,
+        "private": False,
+        "owner": make_user(base_url, OWNER),
+        "url": url,
+    }  # type: Dict[str, Any]
+    for name in [
+        "archive",
+        "assignees",
+        "blobs",
+        "branches",
+        "collaborators",
+        "comments",
+        "commits",
+        "compare",
+        "contents",
+        "contributors",
+        "deployments",
+        "downloads",
+        "events",
+        "forks",
+        "git_commits",
+        "git_refs",
+        "git_tags",
+        "hooks",
+        "html",
+        "issue_comment",
+        "issue_events",
+        "issues",
+        "keys",
+        "labels",
+        "languages",
+        "merges",
+        "milestones",
+        "notifications",
+        "pulls",
+        "releases",
+        "stargazers",
+        "statuses",
+        "subscribers",
+        "subscription",
+        "tags",
+        "teams",
+        "trees",
+    ]:
+        res[name + "_url"] = url + "/" + name
+    return res
+
+
+def make_pull_request(
+    base_url: str, repository: Dict[str, Any], number: int, state: str
+) -> Dict[str, Any]:
+    url = "%s/repos/%s/%s/pulls/%d" % (base_url, OWNER, PROJECT, number)
+    branch = "branch-%d" % number
+    head = {
+        "ref": branch,
+        "label": "%s:%s" % (OWNER, branch),
+        "sha": "0" * 40,
+    }  # type: Dict[str, Any]
+    base = {
+        "ref": "master",
+        "label": "%s:master" % OWNER,
+        "sha": "0" * 40,
+    }  # type: Dict[str, Any]
+    # Like GitHub, include the whole repository in both
+    head["repo"] = base["repo"] = repository
+    res = {
+        "id": number,
+        "number": number,
+        "state": state,
+        "title": branch,
+        "url": url,
+        "assignee": None,
+        "assignees": list(),
+        "body": "",
+        "body_html": "",
+        "body_text": "",
+        "closed_at": None,
+        "created_at": None,
+        "merged_at": None,
+        "updated_at": None,
+        "merge_commit_sha": None,
+        "user": make_user(base_url, OWNER),
+        "head": head,
+        "base": base,
+        "_links": dict(),
+    }  # type: Dict[str, Any]
+    for name in [
+        "comments",
+        "commits",
+        "diff",
+        "html",
+        "issue",
+        "patch",
+        "review_comment",
+        "review_comments",
+        "statuses",
+    ]:
+        res[name + "_url"] = url + "/" + name
+    return res
+
+
+class FakeGitHub(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """ Serve the pull requests of a single repository, honoring the
+    `state`, `head`, `page` and `per_page` parameters
+
+    """
+
+    def __init__(self, *, history: int, open_ratio: float) -> None:
+        super().__init__(("127.0.0.1", 0), PullRequestsHandler)
+        self.base_url = "http://127.0.0.1:%d/api/v3" % self.server_address[1]
+        # Newest first, like GitHub does by default
+        self.repository = make_repository(self.base_url)
+        self.pull_requests = list()  # type: List[Dict[str, Any]]
+        num_opened = int(history * open_ratio)
+        for number in range(history, 0, -1):
+            state = "open" if number <= num_opened else "closed"
+            self.pull_requests.append(
+                make_pull_request(self.base_url, self.repository, number, state)
+            )
+        self.num_requests = 0
+
+    def filter(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        state = params.get("state", "open")
+        head = params.get("head")
+        res = list()
+        for pull_request in self.pull_requests:
+            if state != "all" and pull_request["state"] != state:
+                continue
+            if head and pull_request["head"]["label"] != head:
+                continue
+            res.append(pull_request)
+        return res
+
+
+class PullRequestsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        server = cast(FakeGitHub, self.server)
+        server.num_requests += 1
+        url = urllib.parse.urlsplit(self.path)
+        params = dict(urllib.parse.parse_qsl(url.query))
+        if not url.path.endswith("/pulls"):
+            self.send_error(404)
+            return
+        matches = server.filter(params)
+        page = int(params.get("page", "1"))
+        per_page = int(params.get("per_page", "30"))
+        start = (page - 1) * per_page
+        body = json.dumps(matches[start : start + per_page]).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if start + per_page < len(matches):
+            params["page"] = str(page + 1)
+            next_url = "http://%s:%d%s?%s" % (
+                *server.server_address,
+                url.path,
+                urllib.parse.urlencode(params),
+            )
+            self.send_header("Link", '<%s>; rel="next"' % next_url)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+def scan_all_pull_requests(action: PushAction) -> Optional[Any]:
+    """ How older versions of tsrc looked for the pull request """
+    assert action.repository
+    for pull_request in action.repository.pull_requests():
+        if pull_request.head.ref == action.remote_branch:
+            if pull_request.state == "open":
+                return pull_request
+    return None
+
+
+def measure(
+    server: FakeGitHub, func: Callable[[], Any], *, runs: int
+) -> Dict[str, float]:
+    timings = list()
+    for _ in range(runs):
+        server.num_requests = 0
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {"time": min(timings), "requests": server.num_requests}
+
+
+def bench_history(
+    history: int, *, open_ratio: float, runs: int
+) -> Dict[str, Dict[str, float]]:
+    server = FakeGitHub(history=history, open_ratio=open_ratio)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        github_api = github3.GitHubEnterprise(url=server.base_url[: -len("api/v3")])
+        repository_info = RepositoryInfo(
+            project_name="%s/%s" % (OWNER, PROJECT),
+            url="git@127.0.0.1:%s/%s" % (OWNER, PROJECT),
+            path=Path.getcwd(),
+            current_branch="new-feature",
+            service="github_enterprise",
+            tracking_ref=None,
+            repository_login_url=server.base_url,
+        )
+        action = PushAction(repository_info, argparse.Namespace(), github_api)
+        action.repository = ShortRepository(server.repository, github_api)
+        return {
+            "filtered": measure(server, action.find_opened_pull_request, runs=runs),
+            "scan": measure(server, lambda: scan_all_pull_requests(action), runs=runs),
+        }
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--history",
+        type=int,
+        nargs="+",
+        default=[100, 1000, 10000],
+        help="number of pull requests in the repository",
+    )
+    parser.add_argument(
+        "--open-ratio",
+        type=float,
+        default=0.1,
+        help="ratio of pull requests that are still opened",
+    )
+    parser.add_argument("--runs", type=int, default=3, help="runs per benchmark")
+    args = parser.parse_args()
+
+    data = list()
+    for history in args.history:
+        ui.info_2("Looking up pull request among %d" % history)
+        results = bench_history(history, open_ratio=args.open_ratio, runs=args.runs)
+        filtered = results["filtered"]
+        scan = results["scan"]
+        data.append(
+            (
+                (ui.bold, str(history)),
+                (ui.reset, "%.3fs" % filtered["time"]),
+                (ui.reset, str(filtered["requests"])),
+                (ui.reset, "%.3fs" % scan["time"]),
+                (ui.reset, str(scan["requests"])),
+            )
+        )
+    headers = ["pull requests", "filtered", "requests", "full scan", "requests"]
+    ui.info_table(data, headers=headers)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,10 @@ from typing import Any, Callable, Type, NoReturn
 class Marker:
     @classmethod
     def xfail(cls, condition: bool, reason: str) -> Callable[..., Any]: ...
+    @classmethod
+    def skipif(cls, condition: bool, reason: str) -> Callable[..., Any]: ...
+    @classmethod
+    def parametrize(cls, names: str, values: Any) -> Callable[..., Any]: ...
 
 mark = Marker()
 
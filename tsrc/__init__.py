@@ -1,18 +1,61 @@
 """ Common tools """
 
+import importlib
+import sys
+import time
+from typing import Any, Dict, Tuple, TYPE_CHECKING  # noqa
+
+# Used by `tsrc version --timing` to measure import times
+IMPORT_START = time.perf_counter()
 
-from .config import parse_config, dump_config  # noqa
-from .config import (  # noqa
-    Config,
-    parse_tsrc_config,
-    dump_tsrc_config,
-    get_tsrc_config_path,
-)
 from .errors import Error, InvalidConfig  # noqa
-from .executor import Task, run_sequence, ExecutorFailed  # noqa
-from .groups import GroupList, Group  # noqa
-from .groups import GroupNotFound, UnknownElement as UnknownGroupElement  # noqa
+from .executor import Task, run_sequence, run_parallel, run_dag, ExecutorFailed  # noqa
 from .repo import Repo, Remote  # noqa
-from .manifest import Manifest  # noqa
-from .manifest import load as load_manifest  # noqa
-from .workspace import Workspace  # noqa
+
+# Those are imported on first access, so that commands that do not need them
+# (like `tsrc version`) do not pay the price of importing ruamel.yaml, schema
+# and so on
+_LAZY_ATTRIBUTES = {
+    "parse_config": ("config", "parse_config"),
+    "dump_config": ("config", "dump_config"),
+    "Config": ("config", "Config"),
+    "parse_tsrc_config": ("config", "parse_tsrc_config"),
+    "dump_tsrc_config": ("config", "dump_tsrc_config"),
+    "get_tsrc_config_path": ("config", "get_tsrc_config_path"),
+    "GroupList": ("groups", "GroupList"),
+    "Group": ("groups", "Group"),
+    "GroupNotFound": ("groups", "GroupNotFound"),
+    "UnknownGroupElement": ("groups", "UnknownElement"),
+    "Manifest": ("manifest", "Manifest"),
+    "load_manifest": ("manifest", "load"),
+    "Workspace": ("workspace", "Workspace"),
+}  # type: Dict[str, Tuple[str, str]]
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError("module 'tsrc' has no attribute '%s'" % name)
+    module_name, attr_name = _LAZY_ATTRIBUTES[name]
+    module = importlib.import_module("tsrc.%s" % module_name)
+    res = getattr(module, attr_name)
+    globals()[name] = res
+    return res
+
+
+if TYPE_CHECKING:
+    from .config import parse_config, dump_config  # noqa
+    from .config import (  # noqa
+        Config,
+        parse_tsrc_config,
+        dump_tsrc_config,
+        get_tsrc_config_path,
+    )
+    from .groups import GroupList, Group  # noqa
+    from .groups import GroupNotFound, UnknownElement as UnknownGroupElement  # noqa
+    from .manifest import Manifest  # noqa
+    from .manifest import load as load_manifest  # noqa
+    from .workspace import Workspace  # noqa
+elif sys.version_info < (3, 7):
+    # Module-level __getattr__ is only supported since Python 3.7 (PEP 562)
+    for _name in _LAZY_ATTRIBUTES:
+        __getattr__(_name)
@@ -0,0 +1,89 @@
+""" Remember results of GitHub and GitLab API calls between two tsrc
+invocations, so that `tsrc push` only makes the API calls it really needs
+
+Each entry is stored as a JSON file in ~/.cache/tsrc/api/, along with the
+time after which it should no longer be used.
+This is only a cache: it is fine to delete it at any time.
+
+"""
+
+from typing import Any, Optional  # noqa
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from path import Path
+import xdg.BaseDirectory
+
+
+def get_cache_path() -> Path:
+    return Path(xdg.BaseDirectory.save_cache_path("tsrc")) / "api"
+
+
+class ApiCache:
+    """ Store JSON-serializable values for `ttl` seconds.
+
+    Entries are written atomically, so the same cache can be used
+    by several threads and several tsrc processes at once
+
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def _get_entry_path(self, key: str) -> Path:
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        return self.path / (digest + ".json")
+
+    def get(self, key: str) -> Optional[Any]:
+        """ Return the value stored for the given key, or None if there is
+        no such value or if it has expired
+
+        """
+        entry_path = self._get_entry_path(key)
+        try:
+            entry = json.loads(entry_path.text())
+        except (OSError, ValueError):
+            return None
+        if not isinstance(entry, dict) or entry.get("key") != key:
+            return None
+        if entry.get("expires", 0) < time.time():
+            return None
+        return entry.get("value")
+
+    def set(self, key: str, value: Any, *, ttl: float) -> None:
+        entry = {"key": key, "expires": time.time() + ttl, "value": value}
+        # Note: failing to write to the cache is not an error, the value
+        # will just be fetched again next time
+        try:
+            self.path.makedirs_p()
+            fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "w") as fileobj:
+                json.dump(entry, fileobj)
+            os.replace(tmp_path, self._get_entry_path(key))
+        except OSError:
+            Path(tmp_path).remove_p()
+
+    def invalidate(self, key: str) -> None:
+        self._get_entry_path(key).remove_p()
+
+
+class NullCache(ApiCache):
+    """ A cache that never stores anything """
+
+    def __init__(self) -> None:
+        super().__init__(Path(""))
+
+    def get(self, key: str) -> Optional[Any]:
+        return None
+
+    def set(self, key: str, value: Any, *, ttl: float) -> None:
+        pass
+
+    def invalidate(self, key: str) -> None:
+        pass
@@ -25,7 +25,7 @@ def find_workspace_path() -> Path:
     raise tsrc.Error("Could not find current workspace")
 
 
-def get_workspace(args: argparse.Namespace) -> tsrc.Workspace:
+def get_workspace(args: argparse.Namespace) -> "tsrc.Workspace":
     if args.workspace_path:
         workspace_path = Path(args.workspace_path)
     else:
@@ -0,0 +1,40 @@
+""" Entry point for tsrc bundle """
+
+from typing import Dict, Optional  # noqa
+import argparse
+
+import cli_ui as ui
+from path import Path
+
+import tsrc
+import tsrc.cli
+
+
+def read_sha1s(lock_path: Path) -> Dict[str, str]:
+    """ Return the sha1 of each repo in a file written by `tsrc snapshot` """
+    if not lock_path.exists():
+        raise tsrc.Error(lock_path, "does not exist")
+    lock_data = tsrc.parse_config(lock_path)
+    res = dict()  # type: Dict[str, str]
+    for repo_data in lock_data.get("repos") or list():
+        sha1 = repo_data.get("sha1")
+        if sha1:
+            res[repo_data["src"]] = sha1
+    return res
+
+
+def create(args: argparse.Namespace) -> None:
+    workspace = tsrc.cli.get_workspace(args)
+    workspace.load_manifest()
+    since = None  # type: Optional[Dict[str, str]]
+    if args.lock_path:
+        since = read_sha1s(Path(args.lock_path))
+    workspace.create_bundles(args.output_path, since=since)
+    ui.info("Done", ui.check)
+
+
+def main(args: argparse.Namespace) -> None:
+    if args.bundle_command == "create":
+        create(args)
+    else:
+        raise tsrc.Error("Usage: tsrc bundle create OUTPUT_DIR")
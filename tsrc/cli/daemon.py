@@ -0,0 +1,148 @@
+""" Entry point for tsrc daemon
+
+Keep the manifest and the statuses of every repo in memory, and use
+inotify to know which repos need their status to be collected again.
+`tsrc status` and `tsrc foreach` use the daemon when it is running.
+
+"""
+
+import argparse
+import json
+import os
+import socketserver
+import threading
+from typing import Any, Dict, List, Optional  # noqa
+
+import cli_ui as ui
+
+import tsrc
+import tsrc.cli
+import tsrc.cli.status
+import tsrc.daemon
+import tsrc.errors
+import tsrc.watch
+
+
+class DaemonState(tsrc.watch.WorkspaceState):
+    def __init__(self, workspace: tsrc.Workspace) -> None:
+        collector = tsrc.cli.status.StatusCollector(workspace.root_path)
+        super().__init__(workspace, collector.collect)
+
+    def watch(self, stop_event: threading.Event) -> None:
+        """ Run in a background thread, until stop_event is set """
+        self.refresh()
+        while not stop_event.is_set():
+            self.wait_and_refresh(timeout=0.5)
+
+    def get_statuses(self, *, dirty_only: bool = False) -> List[Dict[str, Any]]:
+        res = list()  # type: List[Dict[str, Any]]
+        with self.lock:
+            # The status was explicitly requested, so also check repos
+            # that cannot be watched
+            self.refresh(check_unwatched=True)
+            for repo in self.repos:
+                status = self.statuses[repo.src]
+                if dirty_only and not tsrc.cli.status.should_report(repo, status):
+                    continue
+                as_dict = tsrc.cli.status.status_as_dict(repo.src, status)
+                as_dict["missing"] = isinstance(status, tsrc.errors.MissingRepo)
+                res.append(as_dict)
+        return res
+
+    def get_repos(self, *, groups: Optional[List[str]] = None) -> Dict[str, Any]:
+        with self.lock:
+            manifest = self.workspace.local_manifest.manifest
+            assert manifest
+            requested_repos = manifest.get_repos(groups=groups)
+            found = list()  # type: List[Dict[str, Any]]
+            missing = list()  # type: List[Dict[str, Any]]
+            for repo in requested_repos:
+                if repo in self.repos:
+                    found.append(tsrc.daemon.repo_as_dict(repo))
+                else:
+                    missing.append(tsrc.daemon.repo_as_dict(repo))
+            return {"found": found, "missing": missing}
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        for line in self.rfile:
+            request = json.loads(line.decode())
+            try:
+                response = self.server.respond(request)  # type: ignore
+            except Exception as e:
+                response = {"error": str(e)}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, workspace: tsrc.Workspace) -> None:
+        self.socket_path = tsrc.daemon.get_socket_path(workspace.root_path)
+        self.state = DaemonState(workspace)
+        self.stop_event = threading.Event()
+        self.state.load()
+        if self.socket_path.exists():
+            # Left-over from a daemon that did not exit cleanly
+            self.socket_path.remove()
+        super().__init__(str(self.socket_path), RequestHandler)
+
+    def respond(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        command = request.get("command")
+        if command == "ping":
+            return {"pid": os.getpid()}
+        if command == "status":
+            dirty_only = request.get("dirty_only", False)
+            return {"statuses": self.state.get_statuses(dirty_only=dirty_only)}
+        if command == "repos":
+            return self.state.get_repos(groups=request.get("groups"))
+        if command == "stop":
+            # shutdown() waits for serve_forever() to return, so it must
+            # not be called from the thread handling the request
+            threading.Thread(target=self.shutdown).start()
+            return {}
+        raise tsrc.Error("Unknown command:", command)
+
+    def run(self) -> None:
+        watch_thread = threading.Thread(
+            target=self.state.watch, args=(self.stop_event,), daemon=True
+        )
+        watch_thread.start()
+        try:
+            self.serve_forever()
+        finally:
+            self.stop_event.set()
+            watch_thread.join()
+            self.server_close()
+            self.socket_path.remove_p()
+            self.state.close()
+
+
+def main(args: argparse.Namespace) -> None:
+    workspace = tsrc.cli.get_workspace(args)
+    client = tsrc.daemon.connect(workspace.root_path, force=True)
+    if args.stop:
+        if not client:
+            raise tsrc.Error("No tsrc daemon is running for this workspace")
+        client.request("stop")
+        client.close()
+        ui.info_2("tsrc daemon stopped")
+        return
+    if client:
+        pid = client.request("ping")["pid"]
+        client.close()
+        raise tsrc.Error("tsrc daemon is already running, pid:", pid)
+
+    # Do not take locks that other git commands may need. This also
+    # means our own `git status` calls do not touch .git/index, and
+    # thus do not trigger new notifications
+    os.environ["GIT_OPTIONAL_LOCKS"] = "0"
+    server = Server(workspace)
+    ui.info_1("tsrc daemon listening on", server.socket_path)
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        pass
+    ui.info_2("tsrc daemon stopped")
@@ -1,15 +1,17 @@
 """ Entry point for tsrc foreach """
 
-from typing import List
+from typing import Dict, List, Optional, Tuple  # noqa
 import argparse
 import subprocess
 import sys
+import threading
 
 from path import Path
 import cli_ui as ui
 
 import tsrc
 import tsrc.cli
+import tsrc.daemon
 
 
 class CommandFailed(tsrc.Error):
@@ -22,12 +24,23 @@ class CouldNotStartProcess(tsrc.Error):
 
 class CmdRunner(tsrc.Task[tsrc.Repo]):
     def __init__(
-        self, workspace_path: Path, cmd: List[str], cmd_as_str: str, shell: bool = False
+        self,
+        workspace_path: Path,
+        cmd: List[str],
+        cmd_as_str: str,
+        shell: bool = False,
+        *,
+        parallel: bool = False
     ) -> None:
         self.workspace_path = workspace_path
         self.cmd = cmd
         self.cmd_as_str = cmd_as_str
         self.shell = shell
+        # When running in parallel, capture the output of each command
+        # and display it at once when the command is done, so that the
+        # outputs of several repos are not mixed up
+        self.parallel = parallel
+        self._lock = threading.Lock()
 
     def display_item(self, repo: tsrc.Repo) -> str:
         return repo.src
@@ -38,7 +51,7 @@ class CmdRunner(tsrc.Task[tsrc.Repo]):
     def on_failure(self, *, num_errors: int) -> None:
         ui.error("Command failed for %s repo(s)" % num_errors)
 
-    def process(self, index: int, count: int, repo: tsrc.Repo) -> None:
+    def display_cmd(self, index: int, count: int, repo: tsrc.Repo) -> None:
         ui.info_count(index, count, repo.src)
         # fmt: off
         ui.info(
@@ -47,6 +60,12 @@ class CmdRunner(tsrc.Task[tsrc.Repo]):
             sep=""
         )
         # fmt: on
+
+    def process(self, index: int, count: int, repo: tsrc.Repo) -> None:
+        if self.parallel:
+            self.process_captured(index, count, repo)
+            return
+        self.display_cmd(index, count, repo)
         full_path = self.workspace_path / repo.src
         try:
             rc = subprocess.call(self.cmd, cwd=full_path, shell=self.shell)
@@ -55,22 +74,97 @@ class CmdRunner(tsrc.Task[tsrc.Repo]):
         if rc != 0:
             raise CommandFailed()
 
+    def process_captured(self, index: int, count: int, repo: tsrc.Repo) -> None:
+        full_path = self.workspace_path / repo.src
+        try:
+            process = subprocess.Popen(
+                self.cmd,
+                cwd=full_path,
+                shell=self.shell,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+            )
+        except OSError as e:
+            raise CouldNotStartProcess("Error when starting process:", e)
+        out, _ = process.communicate()
+        with self._lock:
+            self.display_cmd(index, count, repo)
+            if out:
+                sys.stdout.write(out.decode(errors="replace"))
+                sys.stdout.flush()
+        if process.returncode != 0:
+            raise CommandFailed()
+
 
-def main(args: argparse.Namespace) -> None:
-    workspace = tsrc.cli.get_workspace(args)
+def plan_from_daemon(
+    client: tsrc.daemon.Client, groups: Optional[List[str]]
+) -> Tuple[List[tsrc.Repo], List[tsrc.Repo]]:
+    """ Let the running daemon tell which repos to use, so that
+    the manifest does not have to be parsed again
+
+    """
+    response = client.request("repos", groups=groups)
+    client.close()
+    found = [tsrc.daemon.repo_from_dict(x) for x in response["found"]]
+    missing = [tsrc.daemon.repo_from_dict(x) for x in response["missing"]]
+    return found, missing
+
+
+def plan(
+    workspace: tsrc.Workspace, groups: Optional[List[str]]
+) -> Tuple[List[tsrc.Repo], List[tsrc.Repo]]:
     workspace.load_manifest()
-    cmd_runner = CmdRunner(
-        workspace.root_path, args.cmd, args.cmd_as_str, shell=args.shell
-    )
     manifest = workspace.local_manifest.manifest
     assert manifest
     cloned_repos = workspace.get_repos()
-    requested_repos = manifest.get_repos(groups=args.groups)
+    requested_repos = manifest.get_repos(groups=groups)
 
     found = [x for x in requested_repos if x in cloned_repos]
     missing = [x for x in requested_repos if x not in cloned_repos]
+    return found, missing
+
+
+def get_dependencies(repos: List[tsrc.Repo]) -> List[List[int]]:
+    """ Return the indexes of the dependencies of each repo. Repos that
+    are not in the list (because of the groups used, or because they are
+    not cloned) are considered to be already processed
 
-    tsrc.run_sequence(found, cmd_runner)
+    """
+    indexes = dict()  # type: Dict[str, int]
+    for i, repo in enumerate(repos):
+        indexes[repo.src] = i
+    return [[indexes[x] for x in repo.depends_on if x in indexes] for repo in repos]
+
+
+def main(args: argparse.Namespace) -> None:
+    workspace = tsrc.cli.get_workspace(args)
+    num_jobs = args.num_jobs
+    if num_jobs is None:
+        # Only run commands in parallel by default when using --dag
+        num_jobs = None if args.dag else 1
+    cmd_runner = CmdRunner(
+        workspace.root_path,
+        args.cmd,
+        args.cmd_as_str,
+        shell=args.shell,
+        parallel=(num_jobs != 1),
+    )
+    client = tsrc.daemon.connect(workspace.root_path)
+    if client:
+        found, missing = plan_from_daemon(client, args.groups)
+    else:
+        found, missing = plan(workspace, args.groups)
+
+    if args.dag:
+        dependencies = get_dependencies(found)
+        tsrc.run_dag(
+            found,
+            cmd_runner,
+            get_dependencies=lambda i: dependencies[i],
+            num_jobs=num_jobs,
+        )
+    else:
+        tsrc.run_parallel(found, cmd_runner, num_jobs=num_jobs)
     if missing:
         ui.warning("The following repos were skipped:")
         for repo in missing:
@@ -0,0 +1,109 @@
+""" Entry point for tsrc gc """
+
+from typing import Dict, List  # noqa
+import argparse
+import time
+
+from path import Path
+import cli_ui as ui
+
+import tsrc
+import tsrc.cli
+import tsrc.executor
+import tsrc.git
+from tsrc.workspace.maintainer import ALL_TASKS, DEFAULT_TASKS, RepoMaintainer
+
+
+def format_size(num_bytes: int) -> str:
+    size = float(num_bytes)
+    for unit in ["B", "KiB", "MiB"]:
+        if abs(size) < 1024:
+            return "%.1f %s" % (size, unit)
+        size /= 1024
+    return "%.1f GiB" % size
+
+
+def time_statuses(workspace_path: Path, repos: List[tsrc.Repo]) -> Dict[str, float]:
+    """ Return the time it takes to collect the status of each repo.
+    Statuses are collected one after the other, so that timings are
+    not skewed by other git processes
+
+    """
+    res = dict()  # type: Dict[str, float]
+    for repo in repos:
+        start = time.perf_counter()
+        tsrc.git.get_status(workspace_path / repo.src)
+        res[repo.src] = time.perf_counter() - start
+    return res
+
+
+def display_report(
+    maintainer: RepoMaintainer,
+    status_before: Dict[str, float],
+    status_after: Dict[str, float],
+) -> None:
+    if not maintainer.disk_usage:
+        return
+    headers = ("repo", "disk before", "disk after", "status before", "status after")
+    data = list()
+    for src, (before, after) in sorted(maintainer.disk_usage.items()):
+        row = [(ui.bold, src), (format_size(before),), (format_size(after),)]
+        if src in status_after:
+            row.append(("%.3fs" % status_before[src],))
+            row.append(("%.3fs" % status_after[src],))
+        data.append(row)
+    ui.info_table(data, headers=headers)
+
+    total_before = sum(x[0] for x in maintainer.disk_usage.values())
+    total_after = sum(x[1] for x in maintainer.disk_usage.values())
+    # Note: disk usage may grow, for instance when commit-graphs are written
+    # fmt: off
+    ui.info(
+        "Disk usage of %d repos:" % len(data),
+        ui.bold, format_size(total_before), ui.reset, "->",
+        ui.bold, format_size(total_after), ui.reset,
+        "(reclaimed %s)" % format_size(total_before - total_after),
+    )
+    # fmt: on
+    if status_after:
+        time_before = sum(status_before[x] for x in status_after)
+        time_after = sum(status_after.values())
+        # fmt: off
+        ui.info(
+            "Status time:",
+            ui.bold, "%.3fs" % time_before, ui.reset, "->",
+            ui.bold, "%.3fs" % time_after, ui.reset,
+        )
+        # fmt: on
+
+
+def main(args: argparse.Namespace) -> None:
+    workspace = tsrc.cli.get_workspace(args)
+    workspace.load_manifest()
+    repos = workspace.get_cloned_repos()
+    tasks = args.tasks or DEFAULT_TASKS
+    for task in tasks:
+        if task not in ALL_TASKS:
+            raise tsrc.Error(
+                "Unknown task: %s. Should be one of: %s" % (task, ", ".join(ALL_TASKS))
+            )
+
+    status_before = dict()  # type: Dict[str, float]
+    if args.timing:
+        ui.info_1("Measuring status time")
+        status_before = time_statuses(workspace.root_path, repos)
+
+    maintainer = RepoMaintainer(
+        workspace.root_path, tasks=tasks, jobs_per_host=args.jobs_per_host
+    )
+    # Note: only display the report once maintenance is over, even when
+    # it failed for some of the repos
+    try:
+        tsrc.executor.run_parallel(repos, maintainer, num_jobs=args.num_jobs)
+    finally:
+        status_after = dict()  # type: Dict[str, float]
+        if args.timing:
+            done = [x for x in repos if x.src in maintainer.disk_usage]
+            ui.info_1("Measuring status time again")
+            status_after = time_statuses(workspace.root_path, done)
+        display_report(maintainer, status_before, status_after)
@@ -0,0 +1,138 @@
+""" Entry point for tsrc grep """
+
+from typing import IO, List, Optional, Tuple  # noqa
+import argparse
+import concurrent.futures
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+
+import cli_ui as ui
+from path import Path
+
+import tsrc
+import tsrc.cli
+import tsrc.cli.foreach
+import tsrc.daemon
+import tsrc.errors
+import tsrc.tracing
+
+
+class Grepper:
+    """ Run `git grep` in several repos at once, and display matching
+    lines as soon as they are found, prefixed with the path of the repo
+
+    Stop early once `limit` lines have been displayed
+    """
+
+    def __init__(
+        self,
+        workspace_path: Path,
+        grep_args: List[str],
+        *,
+        max_per_repo: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> None:
+        self.workspace_path = workspace_path
+        self.grep_args = grep_args
+        self.max_per_repo = max_per_repo
+        self.limit = limit
+        self.num_matches = 0
+        self.errors = list()  # type: List[Tuple[str, str]]
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+
+    def display(self, src: str, line: str) -> bool:
+        """ Display a matching line. Return False when no more lines
+        should be displayed
+
+        """
+        with self._lock:
+            if self.done.is_set():
+                return False
+            ui.info(ui.bold, src + "/", ui.reset, line, sep="")
+            self.num_matches += 1
+            if self.limit and self.num_matches >= self.limit:
+                self.done.set()
+        return True
+
+    def grep(self, repo: tsrc.Repo) -> None:
+        if self.done.is_set():
+            return
+        repo_path = self.workspace_path / repo.src
+        if not repo_path.exists():
+            self.errors.append((repo.src, str(tsrc.errors.MissingRepo(repo.src))))
+            return
+        # Note: stderr goes to a file, so that git never blocks on a full
+        # stderr pipe while we are reading stdout
+        with tempfile.TemporaryFile() as stderr:
+            self.run_grep(repo, repo_path, stderr)
+
+    def run_grep(self, repo: tsrc.Repo, repo_path: Path, stderr: IO[bytes]) -> None:
+        cmd = ["git", "grep", "--full-name", "--no-color"] + self.grep_args
+        ui.debug(ui.lightgray, repo_path, "$", ui.reset, *cmd)
+        start = tsrc.tracing.now()
+        process = subprocess.Popen(
+            cmd, cwd=repo_path, stdout=subprocess.PIPE, stderr=stderr
+        )
+        assert process.stdout
+        num_lines = 0
+        output_size = 0
+        for raw_line in process.stdout:
+            output_size += len(raw_line)
+            line = raw_line.decode("utf-8", errors="replace").rstrip("\n")
+            if not self.display(repo.src, line):
+                break
+            num_lines += 1
+            if self.max_per_repo and num_lines >= self.max_per_repo:
+                break
+        stopped_early = process.poll() is None
+        if stopped_early:
+            process.kill()
+        returncode = process.wait()
+        stderr.seek(0)
+        error = stderr.read().decode("utf-8", errors="replace")
+        tsrc.tracing.record_command(
+            repo_path, cmd, start=start, returncode=returncode, output_size=output_size
+        )
+        # Note: git grep exits with 1 when nothing matches
+        if returncode > 1 and not stopped_early:
+            self.errors.append((repo.src, error.strip()))
+
+    def run(self, repos: List[tsrc.Repo], *, num_jobs: int) -> None:
+        with concurrent.futures.ThreadPoolExecutor(num_jobs) as pool:
+            futures = [pool.submit(self.grep, repo) for repo in repos]
+            for future in futures:
+                future.result()
+
+
+def main(args: argparse.Namespace) -> None:
+    workspace = tsrc.cli.get_workspace(args)
+    client = tsrc.daemon.connect(workspace.root_path)
+    if client:
+        repos, unused_missing = tsrc.cli.foreach.plan_from_daemon(client, args.groups)
+    else:
+        repos, unused_missing = tsrc.cli.foreach.plan(workspace, args.groups)
+
+    grepper = Grepper(
+        workspace.root_path,
+        args.grep_args,
+        max_per_repo=args.max_per_repo,
+        limit=args.limit,
+    )
+    num_jobs = args.num_jobs or os.cpu_count() or 1
+    grepper.run(repos, num_jobs=num_jobs)
+
+    if grepper.errors:
+        ui.error("git grep failed for %d repo(s)" % len(grepper.errors))
+        for src, error in grepper.errors:
+            # fmt: off
+            ui.info(ui.green, "*", ui.reset, ui.bold, src, ui.reset, ":", error,
+                    fileobj=sys.stderr)
+            # fmt: on
+        raise tsrc.Error()
+    if not grepper.num_matches:
+        # Like grep, exit with 1 so that `tsrc grep` can be used in scripts
+        raise tsrc.Error("No match found")
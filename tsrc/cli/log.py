@@ -1,33 +1,209 @@
 """ Entry point for tsrc log """
 
+from typing import Iterator, List, Optional, Tuple  # noqa
 import argparse
+import concurrent.futures
+import heapq
+import os
+import subprocess
+import tempfile
+import time
 
+import attr
 import cli_ui as ui
+from path import Path
 
 import tsrc
 import tsrc.cli
+import tsrc.git
+import tsrc.tracing
+
+
+# Fields of a commit in --merged mode, separated by NUL bytes
+MERGED_FORMAT = "%ct%x00%h%x00%d%x00%s%x00%an"
+
+
+@attr.s(frozen=True)
+class Commit:
+    timestamp = attr.ib()  # type: int
+    repo = attr.ib()  # type: str
+    sha1 = attr.ib()  # type: str
+    refs = attr.ib()  # type: str
+    subject = attr.ib()  # type: str
+    author = attr.ib()  # type: str
+
+
+def get_log_cmd(args: argparse.Namespace) -> List[str]:
+    colors = ["green", "reset", "yellow", "reset", "bold blue", "reset"]
+    log_format = "%m {}%h{} - {}%d{} %s {}<%an>{}"
+    log_format = log_format.format(*("%C({})".format(x) for x in colors))
+    return [
+        "log",
+        "--color=always",
+        "--pretty=format:%s" % log_format,
+        "%s...%s" % (args.from_, args.to),
+    ]
+
+
+class LogStream:
+    """ Read commits from a `git log` process as they come, so that only
+    a few of them are in memory at any given time
+
+    """
+
+    def __init__(self, repo_path: Path, src: str, revision_range: str) -> None:
+        self.repo_path = repo_path
+        self.src = src
+        self.cmd = [
+            "git",
+            "log",
+            "--date-order",
+            "-z",
+            "--pretty=format:%s" % MERGED_FORMAT,
+            revision_range,
+        ]
+        self.error = None  # type: Optional[str]
+        tsrc.git.assert_working_path(repo_path)
+        ui.debug(ui.lightgray, repo_path, "$", ui.reset, *self.cmd)
+        self.start = tsrc.tracing.now()
+        # Note: there may be hundreds of processes running at the same time,
+        # so use a single pipe per process. stderr goes to a file instead,
+        # since warnings printed by git would mess with the -z output
+        self.stderr = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(
+            self.cmd, cwd=repo_path, stdout=subprocess.PIPE, stderr=self.stderr
+        )
+
+    def __iter__(self) -> Iterator[Commit]:
+        fields = list()  # type: List[str]
+        output_size = 0
+        for chunk in self.read_fields():
+            output_size += len(chunk) + 1
+            fields.append(chunk.decode("utf-8", errors="replace"))
+            if len(fields) == 5:
+                timestamp, sha1, refs, subject, author = fields
+                fields = list()
+                if not timestamp.isdigit():
+                    self.process.kill()
+                    self.finish(output_size)
+                    self.error = "could not parse git log output"
+                    return
+                yield Commit(
+                    timestamp=int(timestamp),
+                    repo=self.src,
+                    sha1=sha1,
+                    refs=refs.strip(),
+                    subject=subject,
+                    author=author,
+                )
+        self.finish(output_size)
+
+    def read_fields(self) -> Iterator[bytes]:
+        # With -z, commits are separated by NUL bytes too
+        assert self.process.stdout
+        pending = b""
+        for chunk in iter(lambda: self.process.stdout.read1(65536), b""):  # type: ignore
+            pending += chunk
+            *fields, pending = pending.split(b"\0")
+            yield from fields
+        if pending:
+            yield pending
+
+    def finish(self, output_size: int) -> None:
+        returncode = self.process.wait()
+        self.stderr.seek(0)
+        error = self.stderr.read().decode("utf-8", errors="replace")
+        self.stderr.close()
+        tsrc.tracing.record_command(
+            self.repo_path,
+            self.cmd,
+            start=self.start,
+            returncode=returncode,
+            output_size=output_size,
+        )
+        if returncode != 0:
+            self.error = error.strip() or "git log failed"
+
+
+def display_commit(commit: Commit) -> None:
+    date = time.strftime("%Y-%m-%d", time.localtime(commit.timestamp))
+    # fmt: off
+    ui.info(
+        ui.lightgray, date, ui.reset,
+        ui.bold, commit.repo, ui.reset,
+        ui.green, commit.sha1, ui.reset, "-",
+        ui.brown, commit.refs, ui.reset,
+        commit.subject,
+        ui.blue, "<%s>" % commit.author, ui.reset,
+    )
+    # fmt: on
+
+
+def merged_log(workspace: tsrc.Workspace, args: argparse.Namespace) -> bool:
+    """ Display commits of all repos in a single timeline, most recent
+    first. Return False if git log failed for some of the repos
+
+    Note: every commit may have to be compared with commits from any
+    other repo, so there is one `git log` process running for each repo
+    until the end, regardless of --jobs
+
+    """
+    if args.num_jobs:
+        ui.warning("--jobs is ignored with --merged")
+    revision_range = "%s...%s" % (args.from_, args.to)
+    streams = list()  # type: List[LogStream]
+    errors = list()  # type: List[Tuple[str, str]]
+    for (unused_index, repo, full_path) in workspace.enumerate_repos():
+        try:
+            streams.append(LogStream(full_path, repo.src, revision_range))
+        except tsrc.Error as e:
+            errors.append((repo.src, str(e)))
+    # Each stream is already sorted, so a k-way merge is enough
+    timeline = heapq.merge(*streams, key=lambda x: x.timestamp, reverse=True)
+    for commit in timeline:
+        display_commit(commit)
+    errors += [(x.src, x.error) for x in streams if x.error]
+    for src, error in errors:
+        ui.error(src, ":", error)
+    return not errors
+
+
+def parallel_log(workspace: tsrc.Workspace, args: argparse.Namespace) -> bool:
+    """ Run git log on all the repos at once, but display the results
+    in the order of the manifest. Return False if git log failed for
+    some of the repos
+
+    """
+    cmd = get_log_cmd(args)
+    num_jobs = args.num_jobs or os.cpu_count() or 1
+    all_ok = True
+    with concurrent.futures.ThreadPoolExecutor(num_jobs) as pool:
+        results = [
+            (repo, pool.submit(tsrc.git.run_captured, full_path, *cmd, check=False))
+            for (unused_index, repo, full_path) in workspace.enumerate_repos()
+        ]
+        for repo, future in results:
+            try:
+                rc, out = future.result()
+            except tsrc.Error as e:
+                ui.error(repo.src, ":", e)
+                all_ok = False
+                continue
+            if rc != 0:
+                all_ok = False
+            if out:
+                ui.info(ui.bold, repo.src)
+                ui.info(ui.bold, "-" * len(repo.src))
+                ui.info(out)
+    return all_ok
 
 
 def main(args: argparse.Namespace) -> None:
     workspace = tsrc.cli.get_workspace(args)
     workspace.load_manifest()
-    all_ok = True
-    for unused_index, repo, full_path in workspace.enumerate_repos():
-        colors = ["green", "reset", "yellow", "reset", "bold blue", "reset"]
-        log_format = "%m {}%h{} - {}%d{} %s {}<%an>{}"
-        log_format = log_format.format(*("%C({})".format(x) for x in colors))
-        cmd = [
-            "log",
-            "--color=always",
-            "--pretty=format:%s" % log_format,
-            "%s...%s" % (args.from_, args.to),
-        ]
-        rc, out = tsrc.git.run_captured(full_path, *cmd, check=False)
-        if rc != 0:
-            all_ok = False
-        if out:
-            ui.info(ui.bold, repo.src)
-            ui.info(ui.bold, "-" * len(repo.src))
-            ui.info(out)
+    if args.merged:
+        all_ok = merged_log(workspace, args)
+    else:
+        all_ok = parallel_log(workspace, args)
     if not all_ok:
         raise tsrc.Error()
@@ -6,9 +6,8 @@ import importlib
 import os
 import sys
 import textwrap
-from typing import Callable, Optional, Sequence
+from typing import Any, Callable, Optional, Sequence
 
-import colored_traceback
 import cli_ui as ui
 from path import Path
 
@@ -63,12 +62,28 @@ def add_workspace_subparser(
     return parser
 
 
+def colored_excepthook(*args: Any) -> None:
+    """ Display uncaught exceptions using colored_traceback
+
+    colored_traceback imports pygments, which takes a long time, so
+    only do it when there is actually a traceback to display
+    """
+    import colored_traceback
+
+    colored_traceback.add_hook()
+    if sys.excepthook is colored_excepthook:
+        # add_hook() did nothing, for instance because stderr is not a tty
+        sys.__excepthook__(*args)
+    else:
+        sys.excepthook(*args)
+
+
 def main_wrapper(main_func: MainFunc) -> MainFunc:
     """ Wraps main() entry point to better deal with errors """
 
     @functools.wraps(main_func)
     def wrapped(args: ArgsList = None) -> None:
-        colored_traceback.add_hook()
+        sys.excepthook = colored_excepthook
         try:
             main_func(args=args)
         except tsrc.Error as e:
@@ -116,12 +131,55 @@ def main_impl(args: ArgsList = None) -> None:
 
     subparsers = parser.add_subparsers(title="subcommands", dest="command")
 
-    subparsers.add_parser("version")
+    version_parser = subparsers.add_parser("version")
+    version_parser.add_argument(
+        "--timing",
+        action="store_true",
+        help="Show time spent starting the interpreter, importing modules "
+        "and running the command",
+    )
+
+    bundle_parser = subparsers.add_parser("bundle")
+    bundle_subparsers = bundle_parser.add_subparsers(
+        title="subcommands", dest="bundle_command"
+    )
+    bundle_create_parser = add_workspace_subparser(bundle_subparsers, "create")
+    bundle_create_parser.add_argument(
+        "output_path",
+        metavar="OUTPUT_DIR",
+        type=Path,
+        help="Directory where to write the bundles",
+    )
+    bundle_create_parser.add_argument(
+        "--since",
+        dest="lock_path",
+        metavar="LOCK_FILE",
+        help="Only bundle commits that are not in the file written by `tsrc snapshot`",
+    )
+
+    daemon_parser = add_workspace_subparser(subparsers, "daemon")
+    daemon_parser.add_argument(
+        "--stop", action="store_true", help="Stop the daemon running for the workspace"
+    )
 
     foreach_parser = add_workspace_subparser(subparsers, "foreach")
     foreach_parser.add_argument("cmd", nargs="*")
     foreach_parser.add_argument("-c", dest="shell", action="store_true")
     foreach_parser.add_argument("-g", "--group", action="append", dest="groups")
+    foreach_parser.add_argument(
+        "--dag",
+        action="store_true",
+        help="Run the command on each repo as soon as it has run on all "
+        "the repos listed in its `depends_on`",
+    )
+    foreach_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        dest="num_jobs",
+        help="Number of repos to process at the same time "
+        "(default: 1, or the number of CPUs with --dag)",
+    )
     foreach_parser.epilog = textwrap.dedent(
         """\
     Usage:
@@ -130,10 +188,71 @@ def main_impl(args: ArgsList = None) -> None:
     Or:
        # Run command through the shell
        tsrc foreach -c 'some cmd'
+    Or:
+       # Respect the dependencies between repos, running up to 4 commands
+       # at the same time
+       tsrc foreach --dag -j 4 -- some-cmd
     """
     )
     foreach_parser.formatter_class = argparse.RawDescriptionHelpFormatter
 
+    gc_parser = add_workspace_subparser(subparsers, "gc")
+    gc_parser.add_argument(
+        "--task",
+        action="append",
+        dest="tasks",
+        metavar="TASK",
+        help="git maintenance task to run. Can be used several times "
+        "(default: commit-graph, loose-objects and incremental-repack)",
+    )
+    gc_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        dest="num_jobs",
+        help="Number of repos to process at the same time",
+    )
+    gc_parser.add_argument(
+        "--jobs-per-host",
+        type=int,
+        help="Number of repos fetching from the same host at the same time "
+        "(only used by the prefetch task)",
+    )
+    gc_parser.add_argument(
+        "--no-timing",
+        action="store_false",
+        dest="timing",
+        help="Do not measure status time before and after",
+    )
+
+    grep_parser = add_workspace_subparser(subparsers, "grep")
+    grep_parser.add_argument(
+        "grep_args",
+        nargs="+",
+        metavar="ARG",
+        help="Arguments for git grep. Use -- before the first one "
+        "if it starts with a dash",
+    )
+    grep_parser.add_argument("-g", "--group", action="append", dest="groups")
+    grep_parser.add_argument(
+        "-m",
+        "--max-per-repo",
+        type=int,
+        help="Display at most this many matching lines per repo",
+    )
+    grep_parser.add_argument(
+        "--limit",
+        type=int,
+        help="Stop after this many matching lines have been displayed",
+    )
+    grep_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        dest="num_jobs",
+        help="Number of git grep processes to run at the same time",
+    )
+
     init_parser = add_workspace_subparser(subparsers, "init")
     init_parser.add_argument("url", nargs="?")
     init_parser.add_argument("-b", "--branch")
@@ -147,18 +266,66 @@ def main_impl(args: ArgsList = None) -> None:
         type=Path,
         dest="file_path",
     )
+    init_parser.add_argument(
+        "--from-bundles",
+        help="Get most of the commits from bundles written by `tsrc bundle create`",
+        type=Path,
+        dest="bundles_path",
+    )
     init_parser.set_defaults(branch="master")
 
     log_parser = add_workspace_subparser(subparsers, "log")
     log_parser.add_argument("--from", required=True, dest="from_", metavar="FROM")
     log_parser.add_argument("--to")
+    log_parser.add_argument(
+        "--merged",
+        action="store_true",
+        help="display commits of all repos in a single timeline",
+    )
+    log_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        dest="num_jobs",
+        help="number of git log processes to run at the same time "
+        "(not used with --merged, which runs one per repo)",
+    )
     log_parser.set_defaults(to="HEAD")
 
+    prefetch_parser = add_workspace_subparser(subparsers, "prefetch")
+    prefetch_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        dest="num_jobs",
+        help="Number of repos to prefetch at the same time",
+    )
+
     push_parser = add_workspace_subparser(subparsers, "push")
     push_parser.add_argument("-f", "--force", action="store_true", default=False)
     push_parser.add_argument("-t", "--target", dest="target_branch")
     push_parser.add_argument("push_spec", nargs="?")
     push_parser.add_argument("-a", "--assignee", dest="assignee")
+    push_parser.add_argument(
+        "-g",
+        "--group",
+        action="append",
+        dest="groups",
+        help="Push the repos of the group that are on the same branch "
+        "as the current repo. Can be used several times",
+    )
+    push_parser.add_argument(
+        "--all-dirty-branches",
+        action="store_true",
+        help="Push all the repos that are not on the branch from the manifest",
+    )
+    push_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        dest="num_jobs",
+        help="Number of repos to push at the same time, when pushing several repos",
+    )
     push_parser.add_argument(
         "-r",
         "--reviewer",
@@ -185,10 +352,77 @@ def main_impl(args: ArgsList = None) -> None:
         "--ready", action="store_true", help="Mark merge request as ready"
     )
 
-    add_workspace_subparser(subparsers, "status")
+    snapshot_parser = add_workspace_subparser(subparsers, "snapshot")
+    snapshot_parser.add_argument(
+        "output_path",
+        metavar="OUTPUT",
+        help="Where to write the manifest with the sha1 of every repo",
+    )
+
+    status_parser = add_workspace_subparser(subparsers, "status")
+    status_parser.add_argument(
+        "--format",
+        choices=["text", "json", "ndjson"],
+        default="text",
+        help="Output format. With 'json' and 'ndjson', each repo status is "
+        "written as soon as it is collected",
+    )
+    status_parser.add_argument(
+        "--dirty-only",
+        action="store_true",
+        help="Only show repos that are dirty or not on the expected branch",
+    )
+    status_parser.add_argument(
+        "--no-untracked",
+        action="store_true",
+        help="Do not look for untracked files (faster on big repos)",
+    )
+    status_parser.add_argument(
+        "--branch-only",
+        action="store_true",
+        help="Only collect branch, tag and sha1: skip computing "
+        "ahead/behind commits and checking for local changes",
+    )
+    status_parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running, and redraw statuses when repos change (Linux only)",
+    )
+
+    tune_parser = add_workspace_subparser(subparsers, "tune")
+    tune_parser.add_argument(
+        "--no-fsmonitor",
+        action="store_false",
+        dest="fsmonitor",
+        help="Do not enable git's builtin file system monitor",
+    )
 
     sync_parser = add_workspace_subparser(subparsers, "sync")
     sync_parser.add_argument("--force", action="store_true")
+    sync_parser.add_argument(
+        "--narrow",
+        action="store_true",
+        help="Only fetch the branch, tag or sha1 specified in the manifest",
+    )
+    sync_parser.add_argument(
+        "--lock",
+        dest="lock_path",
+        metavar="LOCK_FILE",
+        help="Use a file written by `tsrc snapshot` instead of the manifest",
+    )
+    sync_parser.add_argument(
+        "--from-bundles",
+        type=Path,
+        dest="bundles_path",
+        help="Fetch from bundles written by `tsrc bundle create` first",
+    )
+    sync_parser.add_argument(
+        "--max-prefetch-age",
+        type=float,
+        metavar="MINUTES",
+        help="Use refs fetched by `tsrc prefetch` instead of fetching, if they "
+        "are more recent than this (default: always fetch)",
+    )
 
     args_ns = parser.parse_args(args=args)  # type: argparse.Namespace
     setup_ui(args_ns)
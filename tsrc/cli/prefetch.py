@@ -0,0 +1,15 @@
+""" Entry point for tsrc prefetch """
+
+import argparse
+
+import cli_ui as ui
+
+import tsrc.cli
+
+
+def main(args: argparse.Namespace) -> None:
+    workspace = tsrc.cli.get_workspace(args)
+    workspace.update_manifest()
+    workspace.load_manifest()
+    workspace.prefetch(num_jobs=args.num_jobs)
+    ui.info("Done", ui.check)
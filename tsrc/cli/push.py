@@ -3,8 +3,11 @@
 import abc
 import argparse
 import importlib
+import io
 import re
-from typing import cast, Iterable, Optional
+import sys
+import threading
+from typing import cast, Dict, IO, Iterable, List, Optional, Tuple  # noqa
 from urllib.parse import urlparse
 
 import attr
@@ -12,6 +15,8 @@ from path import Path
 import cli_ui as ui
 
 import tsrc
+import tsrc.cache
+import tsrc.executor
 import tsrc.git
 import tsrc.cli
 
@@ -102,10 +107,31 @@ class RepositoryInfo:
 
 class PushAction(metaclass=abc.ABCMeta):
     def __init__(
-        self, repository_info: RepositoryInfo, args: argparse.Namespace
+        self,
+        repository_info: RepositoryInfo,
+        args: argparse.Namespace,
+        *,
+        api_cache: Optional[tsrc.cache.ApiCache] = None
     ) -> None:
         self.args = args
         self.repository_info = repository_info
+        self.api_cache = api_cache or tsrc.cache.NullCache()
+        # URL of the merge request or pull request, once post_push() is done
+        self.review_url = None  # type: Optional[str]
+        # When set, messages and the output of git push go there instead of
+        # stdout, so that repos pushed in parallel do not mix their output
+        self.output = None  # type: Optional[io.StringIO]
+
+    def get_cache_key(self, *parts: str) -> str:
+        """ Return a key for the API cache, specific to the service used """
+        service_url = self.repository_info.repository_login_url or ""
+        return "/".join([self.repository_info.service, service_url, *parts])
+
+    @property
+    def fileobj(self) -> IO[str]:
+        if self.output is None:
+            return sys.stdout
+        return self.output
 
     @property
     def repo_path(self) -> Path:
@@ -161,7 +187,7 @@ class PushAction(metaclass=abc.ABCMeta):
         pass
 
     def push(self) -> None:
-        ui.info_2("Running git push")
+        ui.info_2("Running git push", fileobj=self.fileobj)
         remote_name = self.remote_name or "origin"
         if self.args.push_spec:
             push_spec = self.args.push_spec
@@ -170,7 +196,12 @@ class PushAction(metaclass=abc.ABCMeta):
         cmd = ["push", "-u", remote_name, push_spec]
         if self.args.force:
             cmd.append("--force")
-        tsrc.git.run(self.repo_path, *cmd)
+        if self.output is None:
+            tsrc.git.run(self.repo_path, *cmd)
+            return
+        unused_rc, out = tsrc.git.run_captured(self.repo_path, *cmd)
+        if out:
+            self.output.write(out + "\n")
 
     def execute(self) -> None:
         self.setup_service()
@@ -178,14 +209,161 @@ class PushAction(metaclass=abc.ABCMeta):
         self.post_push()
 
 
+def get_push_action(
+    repository_info: RepositoryInfo,
+    args: argparse.Namespace,
+    *,
+    api_cache: tsrc.cache.ApiCache
+) -> PushAction:
+    service_name = repository_info.service
+    module = importlib.import_module("tsrc.cli.push_%s" % service_name)
+    push_action = module.PushAction(repository_info, args, api_cache=api_cache)
+    return cast(PushAction, push_action)
+
+
+class MultiPusher(tsrc.executor.Task[tsrc.Repo]):
+    """ Push several repos at once, creating or updating their merge
+    requests or pull requests.
+
+    Note: GitHub and GitLab clients are shared by all the repos using
+    the same service, so login only happens once
+
+    """
+
+    def __init__(
+        self,
+        workspace: tsrc.Workspace,
+        args: argparse.Namespace,
+        *,
+        api_cache: tsrc.cache.ApiCache
+    ) -> None:
+        self.workspace = workspace
+        self.args = args
+        self.api_cache = api_cache
+        # src -> (branch, review url)
+        self.pushed = dict()  # type: Dict[str, Tuple[str, Optional[str]]]
+        self._lock = threading.Lock()
+
+    def on_start(self, *, num_items: int) -> None:
+        ui.info_1("Pushing %d repos" % num_items)
+
+    def on_failure(self, *, num_errors: int) -> None:
+        ui.error("Failed to push %d repo(s)" % num_errors)
+
+    def display_item(self, repo: tsrc.Repo) -> str:
+        return repo.src
+
+    def process(self, index: int, count: int, repo: tsrc.Repo) -> None:
+        repo_path = self.workspace.root_path / repo.src
+        repository_info = RepositoryInfo.read(repo_path, workspace=self.workspace)
+        push_action = get_push_action(
+            repository_info, self.args, api_cache=self.api_cache
+        )
+        push_action.output = io.StringIO()
+        try:
+            push_action.execute()
+        finally:
+            # Display everything at once, once the repo is done
+            with self._lock:
+                ui.info_count(index, count, repo.src)
+                ui.info(push_action.output.getvalue(), end="")
+        with self._lock:
+            self.pushed[repo.src] = (
+                repository_info.current_branch,
+                push_action.review_url,
+            )
+
+
+def get_branch(repo_path: Path) -> Optional[str]:
+    """ Return the current branch, or None when HEAD is detached """
+    rc, out = tsrc.git.run_captured(
+        repo_path, "symbolic-ref", "--short", "-q", "HEAD", check=False
+    )
+    if rc != 0:
+        return None
+    return out
+
+
+def find_repos_to_push(
+    workspace: tsrc.Workspace, args: argparse.Namespace
+) -> List[tsrc.Repo]:
+    """ Return the cloned repos of the given groups (or of the workspace)
+    that are on the same branch as the current repo, or, with
+    --all-dirty-branches, on any branch.
+
+    Repos on the branch from the manifest are never pushed
+
+    """
+    manifest = workspace.local_manifest.manifest
+    assert manifest
+    if args.groups:
+        repos = manifest.get_repos(groups=args.groups)
+    else:
+        repos = workspace.get_repos()
+    expected_branch = None  # type: Optional[str]
+    if not args.all_dirty_branches:
+        current_path = tsrc.git.get_repo_root(working_path=Path.getcwd())
+        expected_branch = tsrc.git.get_current_branch(current_path)
+        for repo in workspace.get_repos():
+            if (workspace.root_path / repo.src).realpath() != current_path.realpath():
+                continue
+            if repo.branch == expected_branch:
+                raise tsrc.Error(
+                    "Current branch is the branch from the manifest:", expected_branch
+                )
+
+    res = list()
+    for repo in repos:
+        repo_path = workspace.root_path / repo.src
+        if not repo_path.exists():
+            continue
+        branch = get_branch(repo_path)
+        if not branch or branch == repo.branch:
+            continue
+        if expected_branch is None or branch == expected_branch:
+            res.append(repo)
+    return res
+
+
+def display_summary(pusher: MultiPusher) -> None:
+    if not pusher.pushed:
+        return
+    headers = ("repo", "branch", "review")
+    data = list()
+    for src, (branch, review_url) in sorted(pusher.pushed.items()):
+        data.append([(ui.bold, src), (branch,), (review_url or "-",)])
+    ui.info_table(data, headers=headers)
+
+
+def push_many(
+    workspace: tsrc.Workspace,
+    args: argparse.Namespace,
+    *,
+    api_cache: tsrc.cache.ApiCache
+) -> None:
+    if args.push_spec:
+        raise tsrc.Error("Cannot use a push spec when pushing several repos")
+    repos = find_repos_to_push(workspace, args)
+    if not repos:
+        raise tsrc.Error("No repo to push")
+    pusher = MultiPusher(workspace, args, api_cache=api_cache)
+    # Note: display the links even when some of the repos could not be pushed
+    try:
+        tsrc.executor.run_parallel(repos, pusher, num_jobs=args.num_jobs)
+    finally:
+        display_summary(pusher)
+
+
 def main(args: argparse.Namespace) -> None:
     workspace = tsrc.cli.get_workspace(args)
     workspace.load_manifest()
+    api_cache = tsrc.cache.ApiCache(tsrc.cache.get_cache_path())
+    if args.groups or args.all_dirty_branches:
+        push_many(workspace, args, api_cache=api_cache)
+        return
 
     repository_info = RepositoryInfo.read(Path.getcwd(), workspace=workspace)
-    service_name = repository_info.service
-    module = importlib.import_module("tsrc.cli.push_%s" % service_name)
-    push_action = module.PushAction(repository_info, args)  # type: ignore
+    push_action = get_push_action(repository_info, args, api_cache=api_cache)
     push_action.execute()
 
 
@@ -2,15 +2,22 @@
     No pull requests will be automatically created. """
 
 import argparse
+from typing import Optional
+
+import tsrc.cache
 import tsrc.git
 from tsrc.cli.push import RepositoryInfo
 
 
 class PushAction(tsrc.cli.push.PushAction):
     def __init__(
-        self, repository_info: RepositoryInfo, args: argparse.Namespace
+        self,
+        repository_info: RepositoryInfo,
+        args: argparse.Namespace,
+        *,
+        api_cache: Optional[tsrc.cache.ApiCache] = None
     ) -> None:
-        super().__init__(repository_info, args)
+        super().__init__(repository_info, args, api_cache=api_cache)
 
     def setup_service(self) -> None:
         pass
@@ -1,18 +1,28 @@
 """ Entry point for tsrc push """
 
 import argparse
-import sys
-from typing import Optional
+from typing import List, Optional
 
 import github3
 from github3 import GitHub
 from github3.pulls import PullRequest
+from github3.repos.repo import Repository
 import cli_ui as ui
 
 import tsrc
+import tsrc.cache
 import tsrc.github
 from tsrc.cli.push import RepositoryInfo
 
+# How long to remember repositories (and thus their default branch)
+REPOSITORY_TTL = 24 * 3600
+
+
+class CouldNotCreatePullRequest(tsrc.Error):
+    def __init__(self, messages: List[str]) -> None:
+        self.messages = messages
+        super().__init__("\n".join(["Could not create pull request"] + messages))
+
 
 class PushAction(tsrc.cli.push.PushAction):
     def __init__(
@@ -20,8 +30,10 @@ class PushAction(tsrc.cli.push.PushAction):
         repository_info: RepositoryInfo,
         args: argparse.Namespace,
         github_api: Optional[GitHub] = None,
+        *,
+        api_cache: Optional[tsrc.cache.ApiCache] = None
     ) -> None:
-        super().__init__(repository_info, args)
+        super().__init__(repository_info, args, api_cache=api_cache)
         self.github_api = github_api
         self.repository = None
         self.pull_request = None
@@ -30,15 +42,29 @@ class PushAction(tsrc.cli.push.PushAction):
         if not self.github_api:
             self.github_api = tsrc.github.login()
         assert self.project_name
-        owner, name = self.project_name.split("/")
-        self.repository = self.github_api.repository(owner, name)
+        self.repository = self.get_repository(self.project_name)
+
+    def get_repository(self, project_name: str) -> Repository:
+        assert self.github_api
+        cache_key = self.get_cache_key("repository", project_name)
+        cached = self.api_cache.get(cache_key)
+        if cached is not None:
+            return Repository(cached, self.github_api)
+        owner, name = project_name.split("/")
+        res = self.github_api.repository(owner, name)
+        self.api_cache.set(cache_key, res.as_dict(), ttl=REPOSITORY_TTL)
+        return res
 
     def post_push(self) -> None:
         self.pull_request = self.ensure_pull_request()
         assert self.pull_request
         if self.args.close:
-            ui.info_2("Closing merge request #%s" % self.pull_request.number)
+            ui.info_2(
+                "Closing merge request #%s" % self.pull_request.number,
+                fileobj=self.fileobj,
+            )
             self.pull_request.close()
+            self.review_url = self.pull_request.html_url
             return
         params = dict()
         if self.requested_target_branch:
@@ -51,25 +77,36 @@ class PushAction(tsrc.cli.push.PushAction):
 
         if self.requested_reviewers:
             message = ["Requesting review from", ", ".join(self.requested_reviewers)]
-            ui.info_2(*message)
+            ui.info_2(*message, fileobj=self.fileobj)
             tsrc.github.request_reviewers(
                 self.repository, self.pull_request.number, self.requested_reviewers
             )
 
         if self.requested_assignee:
-            ui.info_2("Assigning to", self.requested_assignee)
+            ui.info_2("Assigning to", self.requested_assignee, fileobj=self.fileobj)
             self.assign_pull_request()
 
         if self.args.merge:
             self.merge_pull_request()
 
-        ui.info(
-            ui.green, "::", ui.reset, "See pull request at", self.pull_request.html_url
-        )
+        self.review_url = self.pull_request.html_url
+        # fmt: off
+        ui.info(ui.green, "::", ui.reset, "See pull request at",
+                self.pull_request.html_url, fileobj=self.fileobj)
+        # fmt: on
 
     def find_opened_pull_request(self) -> Optional[PullRequest]:
         assert self.repository
-        for pull_request in self.repository.pull_requests():
+        assert self.project_name
+        # Let GitHub do the filtering, so that only the matching pull requests
+        # are returned, instead of every pull request ever made in the repository.
+        # Branches are pushed to the repository itself, so the owner of the
+        # head branch is the owner of the repository
+        owner = self.project_name.split("/")[0]
+        head = "%s:%s" % (owner, self.remote_branch)
+        for pull_request in self.repository.pull_requests(state="open", head=head):
+            # Note: keep checking the results, in case the `head` filter
+            # is not honored by the server
             if pull_request.head.ref == self.remote_branch:
                 if pull_request.state == "open":
                     return pull_request
@@ -77,7 +114,7 @@ class PushAction(tsrc.cli.push.PushAction):
 
     def create_pull_request(self) -> PullRequest:
         assert self.repository
-        ui.info_2("Creating pull request", ui.ellipsis, end="")
+        ui.info_2("Creating pull request", ui.ellipsis, end="", fileobj=self.fileobj)
         title = self.requested_title or self.remote_branch
         if self.requested_target_branch:
             target_branch = self.requested_target_branch
@@ -87,24 +124,25 @@ class PushAction(tsrc.cli.push.PushAction):
             pull_request = self.repository.create_pull(
                 title, target_branch, self.remote_branch
             )
-            ui.info("done", ui.check)
+            ui.info("done", ui.check, fileobj=self.fileobj)
         except github3.GitHubError as github_error:
-            ui.info()
-            ui.error(ui.red, "\nCould not create pull request")
-            for error in github_error.errors:
-                ui.info(ui.red, error["message"])
-            sys.exit(1)
+            ui.info(fileobj=self.fileobj)
+            messages = [error["message"] for error in github_error.errors]
+            raise CouldNotCreatePullRequest(messages) from None
         return pull_request
 
     def merge_pull_request(self) -> None:
         assert self.pull_request
-        ui.info_2("Merging #", self.pull_request.number)
+        ui.info_2("Merging #", self.pull_request.number, fileobj=self.fileobj)
         self.pull_request.merge()
 
     def ensure_pull_request(self) -> PullRequest:
         pull_request = self.find_opened_pull_request()
         if pull_request:
-            ui.info_2("Found existing pull request: #%s" % pull_request.number)
+            ui.info_2(
+                "Found existing pull request: #%s" % pull_request.number,
+                fileobj=self.fileobj,
+            )
             return pull_request
         else:
             return self.create_pull_request()
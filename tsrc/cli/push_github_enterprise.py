@@ -5,6 +5,7 @@ from typing import Optional
 from github3 import GitHub
 
 import tsrc
+import tsrc.cache
 import tsrc.github
 from tsrc.cli.push import RepositoryInfo
 
@@ -15,10 +16,12 @@ class PushAction(tsrc.cli.push_github.PushAction):
         repository_info: RepositoryInfo,
         args: argparse.Namespace,
         github_api: Optional[GitHub] = None,
+        *,
+        api_cache: Optional[tsrc.cache.ApiCache] = None
     ) -> None:
         if not github_api:
             github_api = tsrc.github.login(
                 github_enterprise_url=repository_info.repository_login_url
             )
 
-        super().__init__(repository_info, args, github_api)
+        super().__init__(repository_info, args, github_api, api_cache=api_cache)
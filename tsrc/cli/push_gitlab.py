@@ -4,19 +4,40 @@
 import argparse
 import itertools
 import textwrap
-from typing import cast, Any, List, Optional, Set  # noqa
+import threading
+from typing import cast, Any, Dict, List, Optional, Set  # noqa
 
+import attr
 from gitlab import Gitlab
-from gitlab.v4.objects import Group, User, Project, ProjectMergeRequest  # noqa
+from gitlab.v4.objects import Group, Project, ProjectMergeRequest  # noqa
 from gitlab.exceptions import GitlabGetError
 import cli_ui as ui
 
 import tsrc
+import tsrc.cache
+import tsrc.sessions
 from tsrc.cli.push import RepositoryInfo
 
 
 WIP_PREFIX = "WIP: "
 
+# How long to remember project and group IDs, default branches
+# and available features
+PROJECT_TTL = 24 * 3600
+# How long to remember users matching a query
+MEMBERS_TTL = 3600
+
+# Clients already created, by GitLab URL
+_CLIENTS = dict()  # type: Dict[str, Gitlab]
+_CLIENTS_LOCK = threading.Lock()
+
+
+@attr.s(frozen=True)
+class User:
+    id = attr.ib()  # type: int
+    username = attr.ib()  # type: str
+    name = attr.ib()  # type: str
+
 
 class UserNotFound(tsrc.Error):
     def __init__(self, username: str) -> None:
@@ -66,6 +87,19 @@ def get_token() -> str:
         raise NoGitLabToken() from None
 
 
+def get_gitlab_api(url: str) -> Gitlab:
+    """ Return a client for the given GitLab URL. The same client is
+    returned when called several times
+
+    """
+    with _CLIENTS_LOCK:
+        if url not in _CLIENTS:
+            token = get_token()
+            session = tsrc.sessions.new_session()
+            _CLIENTS[url] = Gitlab(url, private_token=token, session=session)
+        return _CLIENTS[url]
+
+
 def wipify(title: str) -> str:
     if not title.startswith(WIP_PREFIX):
         return WIP_PREFIX + title
@@ -86,41 +120,66 @@ class PushAction(tsrc.cli.push.PushAction):
         repository_info: RepositoryInfo,
         args: argparse.Namespace,
         gitlab_api: Optional[Gitlab] = None,
+        *,
+        api_cache: Optional[tsrc.cache.ApiCache] = None
     ) -> None:
-        super().__init__(repository_info, args)
+        super().__init__(repository_info, args, api_cache=api_cache)
         self.gitlab_api = gitlab_api
         self.group = None  # type: Optional[Group]
         self.project = None  # type: Optional[Project]
+        self.default_branch = None  # type: Optional[str]
         self.review_candidates = []  # type: List[User]
 
+    def _get_project(self, project_name: str) -> None:
+        assert self.gitlab_api
+        # Note: with lazy=True, python-gitlab does not make any API call,
+        # which is fine since only the project ID is needed to list
+        # members and merge requests
+        cache_key = self.get_cache_key("project", project_name)
+        cached = self.api_cache.get(cache_key)
+        if cached is not None:
+            self.project = self.gitlab_api.projects.get(cached["id"], lazy=True)
+            self.default_branch = cached["default_branch"]
+            return
+        self.project = self.gitlab_api.projects.get(project_name)
+        self.default_branch = self.project.default_branch
+        value = {"id": self.project.id, "default_branch": self.default_branch}
+        self.api_cache.set(cache_key, value, ttl=PROJECT_TTL)
+
     def _get_group(self, group_name: str) -> Optional[Group]:
         assert self.gitlab_api
+        cache_key = self.get_cache_key("group", group_name)
+        cached = self.api_cache.get(cache_key)
+        if cached is not None and cached.get("id") is not None:
+            return self.gitlab_api.groups.get(cached["id"], lazy=True)
         try:
-            return self.gitlab_api.groups.get(group_name)
+            res = self.gitlab_api.groups.get(group_name)
         except GitlabGetError as e:
             if e.response_code == 404:
+                # Note: do not cache this, the group may be created later on
                 return None
-            else:
-                raise
+            raise
+        self.api_cache.set(cache_key, {"id": res.id}, ttl=PROJECT_TTL)
+        return res
 
     def check_gitlab_feature(self, name: str) -> None:
         assert self.gitlab_api
-        # Note: don't worry, the http request is cached under the hood by
-        # the python-gitlab library. This should be fine
-        features = self.gitlab_api.features.list()
-        names = [x.name for x in features]
+        cache_key = self.get_cache_key("features")
+        names = self.api_cache.get(cache_key)
+        if names is None:
+            features = self.gitlab_api.features.list()
+            names = [x.name for x in features]
+            self.api_cache.set(cache_key, names, ttl=PROJECT_TTL)
         if name not in names:
             raise FeatureNotAvailable(name)
 
     def setup_service(self) -> None:
         if not self.gitlab_api:
-            token = get_token()
-            self.gitlab_api = Gitlab(
-                self.repository_info.repository_login_url, private_token=token
-            )
+            assert self.repository_info.repository_login_url
+            self.gitlab_api = get_gitlab_api(self.repository_info.repository_login_url)
 
         assert self.project_name
-        self.project = self.gitlab_api.projects.get(self.project_name)
+        self._get_project(self.project_name)
         group_name = self.project_name.split("/")[0]
         self.group = self._get_group(group_name)
 
@@ -139,9 +198,21 @@ class PushAction(tsrc.cli.push.PushAction):
 
     def get_reviewer_by_username(self, username: str) -> User:
         assert self.project
-        in_project = self.get_users_matching(self.project.members, username)
+        in_project = self.get_users_matching(
+            self.project.members,
+            username,
+            cache_key=self.get_cache_key(
+                "project-members", str(self.project.id), username
+            ),
+        )
         if self.group:
-            in_group = self.get_users_matching(self.group.members, username)
+            in_group = self.get_users_matching(
+                self.group.members,
+                username,
+                cache_key=self.get_cache_key(
+                    "group-members", str(self.group.id), username
+                ),
+            )
         else:
             in_group = list()
         candidates = list()
@@ -157,26 +228,41 @@ class PushAction(tsrc.cli.push.PushAction):
             raise AmbiguousUser(username)
         return candidates[0]
 
-    def get_users_matching(self, members: Any, query: str) -> List[User]:
-        res = members.list(active=True, query=query, per_page=100, as_list=False)
-        if res.next_page:
+    def get_users_matching(
+        self, members: Any, query: str, *, cache_key: str
+    ) -> List[User]:
+        cached = self.api_cache.get(cache_key)
+        if cached is not None:
+            return [User(**x) for x in cached]
+        found = members.list(active=True, query=query, per_page=100, as_list=False)
+        if found.next_page:
             raise TooManyUsers(100)
-        return cast(List[User], res)
+        res = [User(id=x.id, username=x.username, name=x.name) for x in found]
+        # Note: do not remember that no user was found, in case
+        # the user is added to the project soon
+        if res:
+            self.api_cache.set(
+                cache_key, [attr.asdict(x) for x in res], ttl=MEMBERS_TTL
+            )
+        return res
 
     def post_push(self) -> None:
         merge_request = self.ensure_merge_request()
         assert self.gitlab_api
         if self.args.close:
-            ui.info_2("Closing merge request #%s" % merge_request.iid)
+            ui.info_2(
+                "Closing merge request #%s" % merge_request.iid, fileobj=self.fileobj
+            )
             merge_request.state_event = "close"
             merge_request.save()
+            self.review_url = merge_request.web_url
             return
 
         assignee = None
         if self.requested_assignee:
             assignee = self.handle_assignee()
             if assignee:
-                ui.info_2("Assigning to", assignee.username)
+                ui.info_2("Assigning to", assignee.username, fileobj=self.fileobj)
 
         title = self.handle_title(merge_request)
         merge_request.title = title
@@ -190,7 +276,9 @@ class PushAction(tsrc.cli.push.PushAction):
             approvers = self.handle_reviewers()
             if approvers:
                 ui.info_2(
-                    "Requesting approvals from", ", ".join(x.name for x in approvers)
+                    "Requesting approvals from",
+                    ", ".join(x.name for x in approvers),
+                    fileobj=self.fileobj,
                 )
                 merge_request.approvals.set_approvers([x.id for x in approvers])
 
@@ -199,7 +287,11 @@ class PushAction(tsrc.cli.push.PushAction):
         if self.args.accept:
             merge_request.merge(merge_when_pipeline_succeeds=True)
 
-        ui.info(ui.green, "::", ui.reset, "See merge request at", merge_request.web_url)
+        self.review_url = merge_request.web_url
+        # fmt: off
+        ui.info(ui.green, "::", ui.reset, "See merge request at",
+                merge_request.web_url, fileobj=self.fileobj)
+        # fmt: on
 
     def handle_title(self, merge_request: ProjectMergeRequest) -> str:
         # If explicitely set, use it
@@ -233,7 +325,8 @@ class PushAction(tsrc.cli.push.PushAction):
         if self.requested_target_branch:
             target_branch = self.requested_target_branch
         else:
-            target_branch = self.project.default_branch
+            assert self.default_branch
+            target_branch = self.default_branch
         assert self.remote_branch
         return self.project.mergerequests.create(
             {
@@ -246,7 +339,10 @@ class PushAction(tsrc.cli.push.PushAction):
     def ensure_merge_request(self) -> ProjectMergeRequest:
         merge_request = self.find_merge_request()
         if merge_request:
-            ui.info_2("Found existing merge request: !%s" % merge_request.iid)
+            ui.info_2(
+                "Found existing merge request: !%s" % merge_request.iid,
+                fileobj=self.fileobj,
+            )
             return merge_request
         else:
             return self.create_merge_request()
@@ -0,0 +1,62 @@
+""" Entry point for tsrc snapshot """
+
+from typing import Any, Dict, List  # noqa
+import argparse
+
+import cli_ui as ui
+from path import Path
+
+import tsrc
+import tsrc.cli
+import tsrc.errors
+import tsrc.executor
+import tsrc.git
+
+
+class Sha1Collector(tsrc.executor.Task[tsrc.Repo]):
+    def __init__(self, workspace_path: Path) -> None:
+        self.workspace_path = workspace_path
+        self.sha1s = dict()  # type: Dict[str, str]
+
+    def on_start(self, *, num_items: int) -> None:
+        ui.info_1("Collecting sha1s of %d repos" % num_items)
+
+    def on_failure(self, *, num_errors: int) -> None:
+        ui.error("Failed to collect sha1s")
+
+    def display_item(self, repo: tsrc.Repo) -> str:
+        return repo.src
+
+    def process(self, index: int, count: int, repo: tsrc.Repo) -> None:
+        repo_path = self.workspace_path / repo.src
+        if not repo_path.exists():
+            raise tsrc.errors.MissingRepo(repo.src)
+        self.sha1s[repo.src] = tsrc.git.get_sha1(repo_path)
+
+
+def pin_repos(manifest_data: Any, sha1s: Dict[str, str]) -> None:
+    """ Pin every repo found in `sha1s` to its sha1, leaving comments
+    and other settings of the manifest untouched
+
+    """
+    for repo_data in manifest_data["repos"]:
+        sha1 = sha1s.get(repo_data["src"])
+        if not sha1:
+            continue
+        # Note: the tag would take precedence over the sha1
+        repo_data.pop("tag", None)
+        repo_data["sha1"] = sha1
+
+
+def main(args: argparse.Namespace) -> None:
+    workspace = tsrc.cli.get_workspace(args)
+    workspace.load_manifest()
+    collector = Sha1Collector(workspace.root_path)
+    tsrc.executor.run_parallel(workspace.get_repos(), collector)
+
+    yml_path = workspace.local_manifest.get_yml_path()
+    manifest_data = tsrc.parse_config(yml_path, roundtrip=True)
+    pin_repos(manifest_data, collector.sha1s)
+    output_path = Path(args.output_path)
+    tsrc.dump_config(manifest_data, output_path)
+    ui.info_2("Snapshot of", len(collector.sha1s), "repos written to", output_path)
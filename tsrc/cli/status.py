@@ -1,18 +1,24 @@
 """ Entry point for tsrc status """
 
-from typing import Dict, List, Union
+from typing import Any, Dict, List, Optional, TextIO, Union  # noqa
 
 import argparse
 import collections
+import json
+import os
 import shutil
+import sys
 
+import attr
 import cli_ui as ui
 from path import Path
 
 import tsrc
 import tsrc.errors
 import tsrc.cli
+import tsrc.daemon
 import tsrc.git
+import tsrc.watch
 
 
 StatusOrError = Union[tsrc.git.Status, Exception]
@@ -76,33 +82,133 @@ def describe_dirty(git_status: tsrc.git.Status) -> List[ui.Token]:
     return res
 
 
+def status_as_dict(
+    src: str, status: StatusOrError, *, options: Optional["StatusOptions"] = None
+) -> Dict[str, Any]:
+    """ Fields that were not computed because of `options` are set to None,
+    so that they cannot be mistaken for real values
+
+    """
+    res = {"src": src}  # type: Dict[str, Any]
+    if isinstance(status, Exception):
+        # Keep the same keys as for a successful status, so that
+        # consumers do not have to check for their presence
+        res.update({key: None for key in tsrc.git.Status.FIELDS})
+        res["error"] = str(status)
+    else:
+        res.update(status.as_dict())
+        if options:
+            res.update({key: None for key in options.get_skipped_fields()})
+        res["error"] = None
+    return res
+
+
+def status_from_dict(workspace_path: Path, as_dict: Dict[str, Any]) -> StatusOrError:
+    """ Inverse of status_as_dict(), used for statuses sent by the daemon """
+    src = as_dict["src"]
+    if as_dict.get("missing"):
+        return tsrc.errors.MissingRepo(src)
+    if as_dict["error"]:
+        return tsrc.Error(as_dict["error"])
+    return tsrc.git.Status.from_dict(workspace_path / src, as_dict)
+
+
 def erase_last_line() -> None:
     terminal_size = shutil.get_terminal_size()
     ui.info(" " * terminal_size.columns, end="\r")
 
 
+@attr.s(frozen=True)
+class StatusOptions:
+    """ Allow skipping expensive git commands when collecting statuses,
+    and filtering out uninteresting repos
+
+    """
+
+    remote = attr.ib(default=True)  # type: bool
+    worktree = attr.ib(default=True)  # type: bool
+    untracked = attr.ib(default=True)  # type: bool
+    dirty_only = attr.ib(default=False)  # type: bool
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace) -> "StatusOptions":
+        return cls(
+            remote=not args.branch_only,
+            worktree=not args.branch_only,
+            untracked=not args.no_untracked,
+            dirty_only=args.dirty_only,
+        )
+
+    def get_skipped_fields(self) -> List[str]:
+        """ Fields of tsrc.git.Status that are not computed """
+        res = list()  # type: List[str]
+        if not self.remote:
+            res += ["ahead", "behind"]
+        if not self.worktree:
+            res += ["staged", "not_staged", "added", "untracked", "dirty"]
+        elif not self.untracked:
+            res.append("untracked")
+        return res
+
+
+def is_on_expected_branch(repo: tsrc.Repo, git_status: tsrc.git.Status) -> bool:
+    # Repos pinned to a tag or a sha1 are not expected to be on any branch
+    if repo.tag or repo.sha1:
+        return True
+    return git_status.branch == repo.branch
+
+
+def should_report(repo: tsrc.Repo, status: StatusOrError) -> bool:
+    """ Used by --dirty-only: report errors, dirty repos, and repos that are
+    not on the branch specified in the manifest
+
+    """
+    if isinstance(status, Exception):
+        return True
+    return status.dirty or not is_on_expected_branch(repo, status)
+
+
 class StatusCollector(tsrc.Task[tsrc.Repo]):
-    def __init__(self, workspace_path: Path) -> None:
+    def __init__(
+        self, workspace_path: Path, *, options: Optional[StatusOptions] = None
+    ) -> None:
         self.workspace_path = workspace_path
+        self.options = options or StatusOptions()
         self.statuses = collections.OrderedDict()  # type: CollectedStatuses
         self.num_repos = 0
 
     def display_item(self, repo: tsrc.Repo) -> str:
         return repo.src
 
-    def process(self, index: int, total: int, repo: tsrc.Repo) -> None:
-        ui.info_count(index, total, repo.src, end="\r")
+    def collect(self, repo: tsrc.Repo) -> StatusOrError:
         full_path = self.workspace_path / repo.src
 
         if not full_path.exists():
-            self.statuses[repo.src] = tsrc.errors.MissingRepo(repo.src)
-            return
+            return tsrc.errors.MissingRepo(repo.src)
 
         try:
-            self.statuses[repo.src] = tsrc.git.get_status(full_path)
+            return tsrc.git.get_status(
+                full_path,
+                remote=self.options.remote,
+                worktree=self.options.worktree,
+                untracked=self.options.untracked,
+            )
         except Exception as e:
-            self.statuses[repo.src] = e
-        erase_last_line()
+            return e
+
+    def should_skip(self, repo: tsrc.Repo, status: StatusOrError) -> bool:
+        return self.options.dirty_only and not should_report(repo, status)
+
+    def report(self, src: str, status: StatusOrError) -> None:
+        self.statuses[src] = status
+
+    def process(self, index: int, total: int, repo: tsrc.Repo) -> None:
+        ui.info_count(index, total, repo.src, end="\r")
+        status = self.collect(repo)
+        if not self.should_skip(repo, status):
+            self.report(repo.src, status)
+        if not isinstance(status, tsrc.errors.MissingRepo):
+            erase_last_line()
 
     def on_start(self, num_items: int) -> None:
         ui.info_1("Collecting statuses of %d repos" % num_items)
@@ -111,7 +217,10 @@ class StatusCollector(tsrc.Task[tsrc.Repo]):
     def on_success(self) -> None:
         erase_last_line()
         if not self.statuses:
-            ui.info_2("Workspace is empty")
+            if self.options.dirty_only:
+                ui.info_2("All repos are clean and on the expected branch")
+            else:
+                ui.info_2("Workspace is empty")
             return
         ui.info_2("Workspace status:")
         max_src = max(len(x) for x in self.statuses.keys())
@@ -121,8 +230,194 @@ class StatusCollector(tsrc.Task[tsrc.Repo]):
             ui.info(*message)
 
 
+class JSONStatusCollector(StatusCollector):
+    """ Write statuses as JSON as soon as they are collected, either
+    as a JSON array, or as newline-delimited JSON (one object per line)
+
+    """
+
+    def __init__(
+        self,
+        workspace_path: Path,
+        *,
+        options: Optional[StatusOptions] = None,
+        ndjson: bool = False,
+        fileobj: Optional[TextIO] = None
+    ) -> None:
+        super().__init__(workspace_path, options=options)
+        self.ndjson = ndjson
+        self.fileobj = fileobj or sys.stdout
+        self.num_written = 0
+
+    def on_start(self, num_items: int) -> None:
+        self.num_repos = num_items
+
+    def on_success(self) -> None:
+        pass
+
+    def begin(self) -> None:
+        if not self.ndjson:
+            self.fileobj.write("[")
+
+    def end(self) -> None:
+        if not self.ndjson:
+            self.fileobj.write("\n]\n")
+        self.fileobj.flush()
+
+    def process(self, index: int, total: int, repo: tsrc.Repo) -> None:
+        status = self.collect(repo)
+        if not self.should_skip(repo, status):
+            self.report(repo.src, status)
+
+    def report(self, src: str, status: StatusOrError) -> None:
+        as_json = json.dumps(status_as_dict(src, status, options=self.options))
+        if self.ndjson:
+            self.fileobj.write(as_json + "\n")
+        else:
+            if self.num_written:
+                self.fileobj.write(",")
+            self.fileobj.write("\n  " + as_json)
+        self.fileobj.flush()
+        self.num_written += 1
+
+
+class StatusDashboard:
+    """ Display the statuses of the workspace, and redraw them in place
+    each time some repos change. Used by `tsrc status --watch`
+
+    Only the repos that had file system events have their status
+    collected again.
+
+    """
+
+    def __init__(
+        self,
+        workspace: tsrc.Workspace,
+        *,
+        options: Optional[StatusOptions] = None,
+        fileobj: Optional[TextIO] = None
+    ) -> None:
+        self.options = options or StatusOptions()
+        self.fileobj = fileobj or sys.stdout
+        collector = StatusCollector(workspace.root_path, options=self.options)
+        self.state = tsrc.watch.WorkspaceState(workspace, collector.collect)
+        self.num_lines = 0
+        self.last_lines = list()  # type: List[str]
+
+    def render(self) -> List[List[ui.Token]]:
+        entries = list()
+        for repo in self.state.repos:
+            status = self.state.statuses[repo.src]
+            if self.options.dirty_only and not should_report(repo, status):
+                continue
+            entries.append((repo.src, status))
+        if not entries:
+            return [["No repos to report"]]
+        res = list()  # type: List[List[ui.Token]]
+        max_src = max(len(src) for src, _ in entries)
+        for src, status in entries:
+            message = [ui.green, "*", ui.reset, src.ljust(max_src)]
+            message += describe_status(status)
+            res.append(message)
+        return res
+
+    def draw(self) -> bool:
+        """ Return False if nothing had to be redrawn """
+        lines = self.render()
+        as_strings = [ui.process_tokens(x)[1] for x in lines]
+        if as_strings == self.last_lines:
+            return False
+        if self.num_lines and self.fileobj.isatty():
+            # Move the cursor back to the first line, and erase everything below
+            self.fileobj.write("\x1b[%dF\x1b[J" % self.num_lines)
+        ui.info_2("Workspace status:", fileobj=self.fileobj)
+        for line in lines:
+            ui.info(*line, fileobj=self.fileobj)
+        self.fileobj.flush()
+        self.num_lines = len(lines) + 1
+        self.last_lines = as_strings
+        return True
+
+    def start(self) -> None:
+        self.state.load()
+        self.state.refresh()
+        self.draw()
+
+    def run(self, *, max_rounds: Optional[int] = None) -> None:
+        """ Redraw statuses when they change, until interrupted or until
+        statuses have been redrawn `max_rounds` times
+
+        """
+        rounds = 0
+        while max_rounds is None or rounds < max_rounds:
+            changed = self.state.wait_and_refresh(timeout=1.0)
+            if changed and self.draw():
+                rounds += 1
+
+    def close(self) -> None:
+        self.state.close()
+
+
+def watch(workspace: tsrc.Workspace, options: StatusOptions) -> None:
+    # Do not take locks in .git, so that collecting a status does
+    # not trigger a new notification
+    os.environ["GIT_OPTIONAL_LOCKS"] = "0"
+    dashboard = StatusDashboard(workspace, options=options)
+    try:
+        dashboard.start()
+        dashboard.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        dashboard.close()
+
+
+def can_use_daemon(options: StatusOptions) -> bool:
+    # The daemon always collects full statuses
+    return options.remote and options.worktree and options.untracked
+
+
+def report_from_daemon(
+    client: tsrc.daemon.Client, collector: StatusCollector, options: StatusOptions
+) -> None:
+    response = client.request("status", dirty_only=options.dirty_only)
+    client.close()
+    statuses = response["statuses"]
+    collector.on_start(num_items=len(statuses))
+    for as_dict in statuses:
+        status = status_from_dict(collector.workspace_path, as_dict)
+        collector.report(as_dict["src"], status)
+    collector.on_success()
+
+
 def main(args: argparse.Namespace) -> None:
     workspace = tsrc.cli.get_workspace(args)
-    status_collector = StatusCollector(workspace.root_path)
-    workspace.load_manifest()
-    tsrc.run_sequence(workspace.get_repos(), status_collector)
+    options = StatusOptions.from_args(args)
+    if args.watch:
+        if args.format != "text":
+            raise tsrc.Error("--watch can only be used with the text format")
+        watch(workspace, options)
+        return
+    client = None  # type: Optional[tsrc.daemon.Client]
+    if can_use_daemon(options):
+        client = tsrc.daemon.connect(workspace.root_path)
+    if not client:
+        workspace.load_manifest()
+
+    if args.format == "text":
+        status_collector = StatusCollector(workspace.root_path, options=options)
+        if client:
+            report_from_daemon(client, status_collector, options)
+        else:
+            tsrc.run_sequence(workspace.get_repos(), status_collector)
+        return
+
+    json_collector = JSONStatusCollector(
+        workspace.root_path, options=options, ndjson=(args.format == "ndjson")
+    )
+    json_collector.begin()
+    if client:
+        report_from_daemon(client, json_collector, options)
+    else:
+        tsrc.run_sequence(workspace.get_repos(), json_collector)
+    json_collector.end()
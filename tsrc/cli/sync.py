@@ -2,19 +2,35 @@
 
 import argparse
 import cli_ui as ui
+from path import Path
 
 import tsrc.cli
 
 
 def main(args: argparse.Namespace) -> None:
     workspace = tsrc.cli.get_workspace(args)
-    workspace.update_manifest()
-    workspace.load_manifest()
+    if args.lock_path:
+        # Everything needed is in the lock file: no need to update the manifest
+        workspace.load_manifest(yml_path=Path(args.lock_path))
+    else:
+        workspace.update_manifest()
+        workspace.load_manifest()
     active_groups = workspace.active_groups
     if active_groups:
         ui.info(ui.green, "*", ui.reset, "Using groups:", ",".join(active_groups))
-    workspace.clone_missing()
+    workspace.clone_missing(bundles_path=args.bundles_path)
     workspace.set_remotes()
-    workspace.sync(force=args.force)
+    # Repos in lock files are pinned to sha1s, so only fetch those
+    narrow = args.narrow or bool(args.lock_path)
+    max_prefetch_age = None
+    if args.max_prefetch_age:
+        max_prefetch_age = args.max_prefetch_age * 60
+    # fmt: off
+    workspace.sync(
+        force=args.force, narrow=narrow, bundles_path=args.bundles_path,
+        max_prefetch_age=max_prefetch_age,
+    )
+    # fmt: on
     workspace.copy_files()
+    workspace.link_files()
     ui.info("Done", ui.check)
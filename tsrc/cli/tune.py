@@ -0,0 +1,41 @@
+""" Entry point for tsrc tune """
+
+import argparse
+import time
+from typing import List
+
+from path import Path
+import cli_ui as ui
+
+import tsrc
+import tsrc.cli
+import tsrc.git
+
+
+def time_status(workspace_path: Path, repos: List[tsrc.Repo]) -> float:
+    """ Return the time it takes to collect the status of every repo """
+    start = time.perf_counter()
+    for repo in repos:
+        tsrc.git.get_status(workspace_path / repo.src)
+    return time.perf_counter() - start
+
+
+def main(args: argparse.Namespace) -> None:
+    workspace = tsrc.cli.get_workspace(args)
+    workspace.load_manifest()
+    repos = workspace.get_cloned_repos()
+
+    ui.info_1("Measuring status time")
+    before = time_status(workspace.root_path, repos)
+
+    workspace.tune(fsmonitor=args.fsmonitor)
+
+    # Note: the first `git status` after tuning populates the untracked
+    # cache and starts the fsmonitor daemon, so it is not representative
+    time_status(workspace.root_path, repos)
+    after = time_status(workspace.root_path, repos)
+
+    ui.info_1("Time to collect the status of %d repos:" % len(repos))
+    ui.info("*", "before:", ui.bold, "%.3fs" % before)
+    ui.info("*", "after: ", ui.bold, "%.3fs" % after)
+    ui.info("Done", ui.check)
@@ -1,7 +1,9 @@
 """ Entry point for tsrc version """
 
 import argparse
-import pkg_resources
+import os
+import time
+from typing import List, Optional, Tuple  # noqa
 
 from path import Path
 import cli_ui as ui
@@ -10,25 +12,78 @@ import tsrc
 import tsrc.git
 
 
+def get_version() -> str:
+    # Note: pkg_resources is not used here because it scans every
+    # installed distribution when imported, which is slow
+    try:
+        import importlib.metadata as metadata
+    except ImportError:
+        # Python < 3.8
+        import pkg_resources
+
+        return str(pkg_resources.get_distribution("tsrc").version)
+    return metadata.version("tsrc")
+
+
 def get_details(location: Path) -> str:
     # Maybe we are importing from a wheel or an egg:
     if not location.isdir():
         return ""
     # Maybe we are not in a git repo:
     try:
-        status = tsrc.git.get_status(location)
+        sha1, dirty = tsrc.git.get_head_and_dirty(location)
     except tsrc.git.CommandError:
         return ""
-    res = " - git: %s" % status.sha1
-    if status.dirty:
+    if sha1:
+        res = " - git: %s" % sha1[:7]
+    else:
+        res = " - git: no commit yet"
+    if dirty:
         res += " (dirty)"
     return res
 
 
+def get_process_age() -> Optional[float]:
+    """ Return the number of seconds since the current process was started,
+    or None if this cannot be known (only implemented on Linux)
+
+    """
+    try:
+        uptime = float(Path("/proc/uptime").text().split()[0])
+        stat = Path("/proc/self/stat").text()
+    except OSError:
+        return None
+    # Skip the command name, which is in parenthesis and may contain spaces
+    fields = stat[stat.rindex(")") + 2 :].split()
+    # starttime is the 22nd field, expressed in clock ticks since boot
+    start_ticks = int(fields[19])
+    return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+
+
+def display_timings(command_start: float) -> None:
+    now = time.perf_counter()
+    timings = list()  # type: List[Tuple[str, Optional[float]]]
+    process_age = get_process_age()
+    if process_age is None:
+        timings.append(("interpreter startup", None))
+    else:
+        timings.append(("interpreter startup", process_age - (now - tsrc.IMPORT_START)))
+    timings.append(("imports", command_start - tsrc.IMPORT_START))
+    timings.append(("command", now - command_start))
+    for name, duration in timings:
+        if duration is None:
+            ui.info("*", name.ljust(20), ui.lightgray, "unknown")
+        else:
+            # Note: process age has a resolution of one clock tick, so
+            # avoid displaying negative values
+            ui.info("*", name.ljust(20), "%.1f ms" % max(0, duration * 1000))
+
+
 def main(args: argparse.Namespace) -> None:
-    tsrc_distribution = pkg_resources.get_distribution("tsrc")
-    version = tsrc_distribution.version
-    message = "tsrc version %s" % version
-    location = Path(tsrc_distribution.location)
+    command_start = time.perf_counter()
+    message = "tsrc version %s" % get_version()
+    location = Path(tsrc.__file__).parent.parent
     message += get_details(location)
     ui.info(message)
+    if args.timing:
+        display_timings(command_start)
@@ -3,13 +3,17 @@
 from path import Path
 import ruamel.yaml
 import schema
-from typing import Any, Dict, NewType, Optional
+from typing import Any, Dict, NewType, Optional, Tuple  # noqa
 import xdg.BaseDirectory
 
 import tsrc
 
 Config = NewType("Config", Dict[str, Any])
 
+# Results of parse_tsrc_config(), along with the mtime and size of the file
+# when it was parsed, so that it is only parsed again when it changes
+_TSRC_CONFIG_CACHE = dict()  # type: Dict[Path, Tuple[Tuple[int, int], Config]]
+
 
 def parse_config(
     file_path: Path,
@@ -68,4 +72,15 @@ def parse_tsrc_config(config_path: Path = None, roundtrip: bool = False) -> Conf
     tsrc_schema = schema.Schema({"auth": auth_schema})
     if not config_path:
         config_path = get_tsrc_config_path()
-    return parse_config(config_path, tsrc_schema, roundtrip=roundtrip)
+    # Note: round-trip configs are meant to be modified and written back,
+    # so always parse them again
+    if roundtrip or not config_path.exists():
+        return parse_config(config_path, tsrc_schema, roundtrip=roundtrip)
+    stat = config_path.stat()
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _TSRC_CONFIG_CACHE.get(config_path)
+    if cached and cached[0] == signature:
+        return cached[1]
+    res = parse_config(config_path, tsrc_schema)
+    _TSRC_CONFIG_CACHE[config_path] = (signature, res)
+    return res
@@ -0,0 +1,98 @@
+""" Talk to a running `tsrc daemon`
+
+The daemon listens on a Unix socket inside the hidden .tsrc directory
+of the workspace. Requests and responses are JSON objects, one per line.
+
+"""
+
+import json
+import os
+import socket
+from typing import Any, Dict, Optional  # noqa
+
+import attr
+from path import Path
+
+import tsrc
+
+SOCKET_NAME = "daemon.sock"
+
+# Set this to bypass a running daemon, for instance when debugging
+NO_DAEMON_ENV_VAR = "TSRC_NO_DAEMON"
+
+# Collecting statuses of a big workspace for the first time may take a while
+TIMEOUT = 300
+
+
+class DaemonError(tsrc.Error):
+    pass
+
+
+def get_socket_path(workspace_path: Path) -> Path:
+    return workspace_path / ".tsrc" / SOCKET_NAME
+
+
+def repo_as_dict(repo: tsrc.Repo) -> Dict[str, Any]:
+    return attr.asdict(repo)
+
+
+def repo_from_dict(as_dict: Dict[str, Any]) -> tsrc.Repo:
+    """ Inverse of repo_as_dict(), used for repos sent by the daemon """
+    kwargs = dict(as_dict)
+    kwargs["remotes"] = [tsrc.Remote(**x) for x in as_dict["remotes"]]
+    return tsrc.Repo(**kwargs)
+
+
+def is_supported() -> bool:
+    return hasattr(socket, "AF_UNIX")
+
+
+class Client:
+    def __init__(self, sock: socket.socket) -> None:
+        self.sock = sock
+        self.fileobj = sock.makefile("rwb")
+
+    def request(self, command: str, **kwargs: Any) -> Dict[str, Any]:
+        request = dict(kwargs)
+        request["command"] = command
+        try:
+            self.fileobj.write(json.dumps(request).encode() + b"\n")
+            self.fileobj.flush()
+            line = self.fileobj.readline()
+        except OSError as e:
+            raise DaemonError("Could not talk to tsrc daemon:", e)
+        if not line:
+            raise DaemonError("tsrc daemon closed the connection")
+        response = json.loads(line.decode())  # type: Dict[str, Any]
+        error = response.get("error")
+        if error:
+            raise DaemonError("tsrc daemon error:", error)
+        return response
+
+    def close(self) -> None:
+        self.fileobj.close()
+        self.sock.close()
+
+
+def connect(workspace_path: Path, *, force: bool = False) -> Optional[Client]:
+    """ Return a Client if a daemon is running for the given workspace, None
+    otherwise. Unless `force` is True, also return None when the
+    TSRC_NO_DAEMON environment variable is set
+
+    """
+    if not force and os.environ.get(NO_DAEMON_ENV_VAR):
+        return None
+    if not is_supported():
+        return None
+    socket_path = get_socket_path(workspace_path)
+    if not socket_path.exists():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(TIMEOUT)
+    try:
+        sock.connect(str(socket_path))
+    except OSError:
+        # Most likely a left-over from a daemon that did not exit cleanly
+        sock.close()
+        return None
+    return Client(sock)
@@ -1,8 +1,20 @@
 """ Helpers to run things on multiple repos and collect errors """
 
 import abc
+import concurrent.futures
+import os
 import sys
-from typing import Any, Generic, List, Tuple, TypeVar  # noqa
+from typing import (  # noqa
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
 
 import cli_ui as ui
 
@@ -72,6 +84,173 @@ class SequentialExecutor(Generic[T]):
             self.errors.append((item, error))
 
 
+class ParallelExecutor(SequentialExecutor[T]):
+    """ Process items using a pool of threads. Tasks run this way
+    should spend most of their time waiting for processes (like git)
+    and must not rely on the order in which items are processed.
+
+    Errors are still reported in the order of the items.
+
+    """
+
+    def __init__(self, task: Task[T], *, num_jobs: int) -> None:
+        super().__init__(task)
+        self.num_jobs = num_jobs
+
+    def process(self, items: List[T]) -> None:
+        if not items:
+            return
+        self.task.on_start(num_items=len(items))
+
+        self.errors = list()
+        num_items = len(items)
+        with concurrent.futures.ThreadPoolExecutor(self.num_jobs) as pool:
+            futures = [
+                pool.submit(self.task.process, i, num_items, item)
+                for i, item in enumerate(items)
+            ]
+            # Wait for results in the order of the items, so that errors
+            # are displayed in a predictable order
+            for item, future in zip(items, futures):
+                try:
+                    future.result()
+                except tsrc.Error as error:
+                    self.errors.append((item, error))
+
+        if self.errors:
+            self.handle_errors()
+        else:
+            self.task.on_success()
+
+
+class DependencyFailed(tsrc.Error):
+    pass
+
+
+class DagExecutor(SequentialExecutor[T]):
+    """ Process items using a pool of threads, starting each item as soon
+    as all the items it depends on have been processed successfully.
+
+    When an item fails, the items depending on it (directly or not) are
+    skipped and reported as errors, but the other ones are still processed.
+
+    `get_dependencies` must return the indexes of the items the given
+    item depends on. Dependencies must not contain cycles.
+
+    """
+
+    def __init__(
+        self,
+        task: Task[T],
+        *,
+        get_dependencies: Callable[[int], List[int]],
+        num_jobs: int
+    ) -> None:
+        super().__init__(task)
+        self.get_dependencies = get_dependencies
+        self.num_jobs = num_jobs
+        self._pending = dict()  # type: Dict[int, Set[int]]
+        self._dependents = dict()  # type: Dict[int, List[int]]
+        self._errors = dict()  # type: Dict[int, tsrc.Error]
+
+    def process(self, items: List[T]) -> None:
+        if not items:
+            return
+        self.task.on_start(num_items=len(items))
+
+        self._pending = dict()
+        self._dependents = dict()
+        self._errors = dict()
+        for i in range(len(items)):
+            self._pending[i] = set(self.get_dependencies(i))
+            for dep in self._pending[i]:
+                self._dependents.setdefault(dep, list()).append(i)
+
+        with concurrent.futures.ThreadPoolExecutor(self.num_jobs) as pool:
+            self._schedule(pool, items)
+
+        # Report errors in the order of the items, not in the order
+        # in which they occurred
+        self.errors = [(items[i], self._errors[i]) for i in sorted(self._errors)]
+        if self.errors:
+            self.handle_errors()
+        else:
+            self.task.on_success()
+
+    def _schedule(
+        self, pool: concurrent.futures.ThreadPoolExecutor, items: List[T]
+    ) -> None:
+        num_items = len(items)
+        running = dict()  # type: Dict[concurrent.futures.Future[None], int]
+        while self._pending or running:
+            ready = sorted(i for i, deps in self._pending.items() if not deps)
+            for i in ready:
+                del self._pending[i]
+                future = pool.submit(self.task.process, i, num_items, items[i])
+                running[future] = i
+            if not running:
+                # Only happens when there is a cycle
+                for i in self._pending:
+                    self._errors[i] = DependencyFailed("skipped: dependency cycle")
+                return
+            done, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                index = running.pop(future)
+                try:
+                    future.result()
+                except tsrc.Error as error:
+                    self._errors[index] = error
+                    self._skip_dependents(index, self.task.display_item(items[index]))
+                else:
+                    for dependent in self._dependents.get(index, list()):
+                        if dependent in self._pending:
+                            self._pending[dependent].discard(index)
+
+    def _skip_dependents(self, index: int, failed_desc: str) -> None:
+        for dependent in self._dependents.get(index, list()):
+            if dependent not in self._pending:
+                continue
+            del self._pending[dependent]
+            self._errors[dependent] = DependencyFailed(
+                "skipped: depends on", failed_desc, "which failed"
+            )
+            self._skip_dependents(dependent, failed_desc)
+
+
 def run_sequence(items: List[T], task: Task[Any]) -> None:
     executor = SequentialExecutor(task)
     return executor.process(items)
+
+
+def run_parallel(
+    items: List[T], task: Task[Any], *, num_jobs: Optional[int] = None
+) -> None:
+    """ Like run_sequence(), but process up to `num_jobs` items at the
+    same time (defaults to the number of CPUs)
+
+    """
+    if num_jobs is None:
+        num_jobs = os.cpu_count() or 1
+    if num_jobs == 1:
+        return run_sequence(items, task)
+    executor = ParallelExecutor(task, num_jobs=num_jobs)
+    return executor.process(items)
+
+
+def run_dag(
+    items: List[T],
+    task: Task[Any],
+    *,
+    get_dependencies: Callable[[int], List[int]],
+    num_jobs: Optional[int] = None
+) -> None:
+    """ Like run_parallel(), but respect the dependencies between items,
+    as returned by `get_dependencies` (see DagExecutor)
+
+    """
+    if num_jobs is None:
+        num_jobs = os.cpu_count() or 1
+    executor = DagExecutor(task, get_dependencies=get_dependencies, num_jobs=num_jobs)
+    return executor.process(items)
@@ -9,6 +9,7 @@ from path import Path
 import cli_ui as ui
 
 import tsrc
+import tsrc.tracing
 
 
 class Error(tsrc.Error):
@@ -45,6 +46,15 @@ def assert_working_path(path: Path) -> None:
 
 
 class Status:
+    # Attributes returned by as_dict()
+    # fmt: off
+    FIELDS = (
+        "branch", "sha1", "tag",
+        "ahead", "behind",
+        "staged", "not_staged", "added", "untracked", "dirty",
+    )
+    # fmt: on
+
     def __init__(self, working_path: Path) -> None:
         self.working_path = working_path
         self.untracked = 0
@@ -58,12 +68,32 @@ class Status:
         self.branch = None  # type: Optional[str]
         self.sha1 = None  # type: Optional[str]
 
-    def update(self) -> None:
+    def as_dict(self) -> Dict[str, Any]:
+        return {x: getattr(self, x) for x in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, working_path: Path, as_dict: Dict[str, Any]) -> "Status":
+        """ Inverse of as_dict() """
+        res = cls(working_path)
+        for key in cls.FIELDS:
+            setattr(res, key, as_dict[key])
+        return res
+
+    def update(
+        self, *, remote: bool = True, worktree: bool = True, untracked: bool = True
+    ) -> None:
+        """ Update the status. Use `remote`, `worktree` and `untracked` to
+        skip computing ahead/behind commits, running `git status`, and
+        scanning for untracked files, respectively
+
+        """
         self.update_sha1()
         self.update_branch()
         self.update_tag()
-        self.update_remote_status()
-        self.update_worktree_status()
+        if remote:
+            self.update_remote_status()
+        if worktree:
+            self.update_worktree_status(untracked=untracked)
 
     def update_sha1(self) -> None:
         self.sha1 = get_sha1(self.working_path, short=True)
@@ -93,8 +123,11 @@ class Status:
         if rc == 0:
             self.behind = len(behind_rev.splitlines())
 
-    def update_worktree_status(self) -> None:
-        _, out = run_captured(self.working_path, "status", "--porcelain")
+    def update_worktree_status(self, *, untracked: bool = True) -> None:
+        cmd = ["status", "--porcelain"]
+        if not untracked:
+            cmd.append("--untracked-files=no")
+        _, out = run_captured(self.working_path, *cmd)
 
         for line in out.splitlines():
             if line.startswith("??"):
@@ -121,7 +154,11 @@ def run(working_path: Path, *cmd: str, check: bool = True) -> None:
     git_cmd.insert(0, "git")
 
     ui.debug(ui.lightgray, working_path, "$", ui.reset, *git_cmd)
+    start = tsrc.tracing.now()
     returncode = subprocess.call(git_cmd, cwd=working_path)
+    tsrc.tracing.record_command(
+        working_path, git_cmd, start=start, returncode=returncode
+    )
     if returncode != 0 and check:
         raise CommandError(working_path, cmd)
 
@@ -141,8 +178,16 @@ def run_captured(working_path: Path, *cmd: str, check: bool = True) -> Tuple[int
     options["stderr"] = subprocess.STDOUT
 
     ui.debug(ui.lightgray, working_path, "$", ui.reset, *git_cmd)
+    start = tsrc.tracing.now()
     process = subprocess.Popen(git_cmd, cwd=working_path, **options)
     out, _ = process.communicate()
+    tsrc.tracing.record_command(
+        working_path,
+        git_cmd,
+        start=start,
+        returncode=process.returncode,
+        output_size=len(out),
+    )
     out = out.decode("utf-8")
     if out.endswith("\n"):
         out = out.strip("\n")
@@ -162,6 +207,36 @@ def get_sha1(working_path: Path, short: bool = False, ref: str = "HEAD") -> str:
     return output
 
 
+def get_head_and_dirty(working_path: Path) -> Tuple[Optional[str], bool]:
+    """ Return the sha1 of HEAD and whether the worktree is dirty,
+    using a single git process. The sha1 is None when there is no
+    commit yet
+
+    """
+    cmd = ("status", "--porcelain=v2", "--branch")
+    _, output = run_captured(working_path, *cmd)
+    sha1 = None  # type: Optional[str]
+    dirty = False
+    for line in output.splitlines():
+        if line.startswith("# branch.oid "):
+            oid = line.split()[2]
+            # Note: git displays "(initial)" when HEAD is unborn
+            if oid != "(initial)":
+                sha1 = oid
+        elif not line.startswith("#"):
+            dirty = True
+    return sha1, dirty
+
+
+def is_dirty(working_path: Path) -> bool:
+    """ Whether the worktree has changes or untracked files. Cheaper than
+    get_status(), which runs several git processes
+
+    """
+    _, output = run_captured(working_path, "status", "--porcelain")
+    return bool(output)
+
+
 def get_current_branch(working_path: Path) -> str:
     cmd = ("rev-parse", "--abbrev-ref", "HEAD")
     _, output = run_captured(working_path, *cmd)
@@ -202,9 +277,15 @@ def reset(repo: Path, ref: str) -> None:
     run(repo, "reset", "--hard", ref)
 
 
-def get_status(working_path: Path) -> Status:
+def get_status(
+    working_path: Path,
+    *,
+    remote: bool = True,
+    worktree: bool = True,
+    untracked: bool = True
+) -> Status:
     status = Status(working_path)
-    status.update()
+    status.update(remote=remote, worktree=worktree, untracked=untracked)
     return status
 
 
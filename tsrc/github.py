@@ -1,6 +1,7 @@
 """ Helpers for github web API """
 
 import getpass
+import threading
 import uuid
 from typing import cast, List, Optional, Dict, Any
 
@@ -9,6 +10,12 @@ from github3.repos.repo import Repository
 import cli_ui as ui
 
 import tsrc
+import tsrc.config
+import tsrc.sessions
+
+# Clients already logged in, by GitHub Enterprise URL (None for github.com)
+_CLIENTS = dict()  # type: Dict[Optional[str], github3.GitHub]
+_LOGIN_LOCK = threading.Lock()
 
 
 class GitHubAPIError(tsrc.Error):
@@ -108,6 +115,18 @@ def request_reviewers(repo: Repository, pr_number: int, reviewers: List[str]) ->
 
 
 def login(github_enterprise_url: Optional[str] = None) -> github3.GitHub:
+    """ Return a client logged in on GitHub, or on the given GitHub Enterprise
+    instance. The same client is returned when called several times, so that
+    login only happens once
+
+    """
+    with _LOGIN_LOCK:
+        if github_enterprise_url not in _CLIENTS:
+            _CLIENTS[github_enterprise_url] = _login(github_enterprise_url)
+        return _CLIENTS[github_enterprise_url]
+
+
+def _login(github_enterprise_url: Optional[str]) -> github3.GitHub:
     if github_enterprise_url:
         verify = get_verify_tls_setting(auth_system="github_enterprise")
         gh_api = github3.GitHubEnterprise(url=github_enterprise_url, verify=verify)
@@ -115,6 +134,7 @@ def login(github_enterprise_url: Optional[str] = None) -> github3.GitHub:
     else:
         gh_api = github3.GitHub()
         token = ensure_token(github_client=gh_api, auth_system="github")
+    tsrc.sessions.setup_session(gh_api.session)
 
     gh_api.login(token=token)
     ui.info_2("Successfully logged in on GitHub")
@@ -0,0 +1,141 @@
+""" Minimal wrapper for Linux's inotify API, using ctypes
+
+Used to watch repositories for changes without polling.
+
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+from typing import Dict, List, Optional  # noqa
+
+import attr
+from path import Path
+
+import tsrc
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+
+# Everything that can change the result of `git status`
+CHANGE_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE
+CHANGE_MASK |= IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+CHANGE_MASK |= IN_DELETE_SELF | IN_MOVE_SELF
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class NotSupported(tsrc.Error):
+    def __init__(self) -> None:
+        super().__init__("File system notifications are only supported on Linux")
+
+
+class WatchLimitReached(tsrc.Error):
+    def __init__(self) -> None:
+        super().__init__(
+            "Too many watched directories. "
+            "Consider increasing fs.inotify.max_user_watches"
+        )
+
+
+@attr.s(frozen=True)
+class Event:
+    wd = attr.ib()  # type: int
+    mask = attr.ib()  # type: int
+    cookie = attr.ib()  # type: int
+    name = attr.ib()  # type: str
+
+    @property
+    def is_dir(self) -> bool:
+        return bool(self.mask & IN_ISDIR)
+
+
+def _load_libc() -> ctypes.CDLL:
+    if not sys.platform.startswith("linux"):
+        raise NotSupported()
+    libc_name = ctypes.util.find_library("c") or "libc.so.6"
+    libc = ctypes.CDLL(libc_name, use_errno=True)
+    if not hasattr(libc, "inotify_init1"):
+        raise NotSupported()
+    return libc
+
+
+def parse_events(data: bytes) -> List[Event]:
+    res = list()  # type: List[Event]
+    offset = 0
+    while offset < len(data):
+        wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+        offset += _EVENT_HEADER.size
+        raw_name = data[offset : offset + length]
+        offset += length
+        name = os.fsdecode(raw_name.rstrip(b"\0"))
+        res.append(Event(wd=wd, mask=mask, cookie=cookie, name=name))
+    return res
+
+
+class Inotify:
+    def __init__(self) -> None:
+        self._libc = _load_libc()
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            self._raise_from_errno()
+        self.fd = fd  # type: int
+
+    def _raise_from_errno(self, path: Optional[Path] = None) -> None:
+        error_number = ctypes.get_errno()
+        if error_number == errno.ENOSPC:
+            raise WatchLimitReached()
+        message = os.strerror(error_number)
+        if path:
+            raise tsrc.Error("Could not watch %s: %s" % (path, message))
+        raise tsrc.Error("inotify error: %s" % message)
+
+    def add_watch(self, path: Path, mask: int = CHANGE_MASK) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            self._raise_from_errno(path)
+        return int(wd)
+
+    def remove_watch(self, wd: int) -> None:
+        # Note: this fails if the watch was already removed by the kernel
+        # (for instance because the directory was deleted), which is fine
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """ Wait at most `timeout` seconds for events to be available """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        return bool(readable)
+
+    def read_events(self, timeout: Optional[float] = None) -> List[Event]:
+        """ Wait at most `timeout` seconds for events. Return an empty list
+        if no events happened in the meantime
+
+        """
+        if not self.wait(timeout=timeout):
+            return list()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return list()
+        return parse_events(data)
+
+    def close(self) -> None:
+        os.close(self.fd)
@@ -2,7 +2,7 @@
 
 import operator
 import os
-from typing import cast, Any, Dict, List, NewType, Optional, Tuple  # noqa
+from typing import cast, Any, Dict, List, NewType, Optional, Set, Tuple  # noqa
 
 from path import Path
 import schema
@@ -21,37 +21,53 @@ class RepoNotFound(tsrc.Error):
         super().__init__("No repo found in '%s'" % src)
 
 
+class InvalidDependencies(tsrc.Error):
+    pass
+
+
 class Manifest:
     def __init__(self) -> None:
         self._repos = list()  # type: List[tsrc.Repo]
         self.copyfiles = list()  # type: List[Tuple[str, str]]
+        self.filelinks = list()  # type: List[Tuple[str, str, str]]
         self.gitlab = None  # type: Optional[GitLabConfig]
         self.github_enterprise = None  # type: Optional[GithubEnterpriseConfig]
         self.group_list = None  # type:  Optional[tsrc.GroupList[str]]
 
     def load(self, config: ManifestConfig) -> None:
         self.copyfiles = list()
+        self.filelinks = list()
         self.gitlab = config.get("gitlab")
         self.github_enterprise = config.get("github_enterprise")
         repos = config.get("repos") or list()
         for repo_config in repos:
             self._handle_repo(repo_config)
             self._handle_copies(repo_config)
+            self._handle_links(repo_config)
 
         self._handle_groups(config)
+        self._check_dependencies()
 
     def _handle_repo(self, repo_config: RepoConfig) -> None:
         src = repo_config["src"]
         branch = repo_config.get("branch", "master")
         tag = repo_config.get("tag")
         sha1 = repo_config.get("sha1")
+        depends_on = repo_config.get("depends_on", list())
         url = repo_config.get("url")
         if url:
             origin = tsrc.Remote(name="origin", url=url)
             remotes = [origin]
         else:
             remotes = self._handle_remotes(repo_config)
-        repo = tsrc.Repo(src=src, branch=branch, sha1=sha1, tag=tag, remotes=remotes)
+        repo = tsrc.Repo(
+            src=src,
+            branch=branch,
+            sha1=sha1,
+            tag=tag,
+            remotes=remotes,
+            depends_on=depends_on,
+        )
         self._repos.append(repo)
 
     def _handle_remotes(self, repo_config: RepoConfig) -> List[tsrc.Remote]:
@@ -75,6 +91,16 @@ class Manifest:
             src_copy = os.path.join(repo_config["src"], src_copy)
             self.copyfiles.append((src_copy, dest_copy))
 
+    def _handle_links(self, repo_config: RepoConfig) -> None:
+        if "link" not in repo_config:
+            return
+        for item in repo_config["link"]:
+            src_link = item["src"]
+            dest_link = item.get("dest", src_link)
+            link_type = item.get("type", "symlink")
+            src_link = os.path.join(repo_config["src"], src_link)
+            self.filelinks.append((src_link, dest_link, link_type))
+
     def _handle_groups(self, config: ManifestConfig) -> None:
         elements = set(repo.src for repo in self._repos)
         self.group_list = tsrc.GroupList(elements=elements)
@@ -84,6 +110,37 @@ class Manifest:
             includes = group_config.get("includes", list())
             self.group_list.add(name, elements, includes=includes)
 
+    def _check_dependencies(self) -> None:
+        """ Make sure dependencies refer to known repos, and that there
+        is no cycle
+
+        """
+        by_src = {repo.src: repo for repo in self._repos}
+        for repo in self._repos:
+            for dep in repo.depends_on:
+                if dep not in by_src:
+                    raise InvalidDependencies(
+                        "%s depends on unknown repo: %s" % (repo.src, dep)
+                    )
+        # Depth-first search, keeping track of the current path
+        done = set()  # type: Set[str]
+        path = list()  # type: List[str]
+
+        def visit(src: str) -> None:
+            if src in done:
+                return
+            if src in path:
+                cycle = path[path.index(src) :] + [src]
+                raise InvalidDependencies("Dependency cycle: " + " -> ".join(cycle))
+            path.append(src)
+            for dep in by_src[src].depends_on:
+                visit(dep)
+            path.pop()
+            done.add(src)
+
+        for repo in self._repos:
+            visit(repo.src)
+
     def get_repos(
         self, groups: Optional[List[str]] = None, all_: bool = False
     ) -> List[tsrc.Repo]:
@@ -119,12 +176,19 @@ class Manifest:
 
 def validate_repo(data: Any) -> None:
     copy_schema = {"src": str, schema.Optional("dest"): str}
+    link_schema = {
+        "src": str,
+        schema.Optional("dest"): str,
+        schema.Optional("type"): schema.Or("symlink", "hardlink"),
+    }
     remote_schema = {"name": str, "url": str}
     repo_schema = schema.Schema(
         {
             "src": str,
             schema.Optional("branch"): str,
             schema.Optional("copy"): [copy_schema],
+            schema.Optional("depends_on"): [str],
+            schema.Optional("link"): [link_schema],
             schema.Optional("sha1"): str,
             schema.Optional("tag"): str,
             schema.Optional("remotes"): [remote_schema],
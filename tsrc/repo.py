@@ -19,6 +19,8 @@ class Repo:
     shallow = attr.ib(default=None)  # type: Optional[bool]
 
     remotes = attr.ib(default=list())  # type: List[Remote]
+    # src of the repos this one depends on
+    depends_on = attr.ib(default=list())  # type: List[str]
 
     @property
     def clone_url(self) -> str:
@@ -0,0 +1,41 @@
+""" HTTP sessions used by the GitHub and GitLab clients
+
+All the sessions share the same pool of connections, so that several
+clients talking to the same host (or a client used from several threads)
+re-use connections instead of opening new ones for each request
+
+"""
+
+from typing import Optional  # noqa
+import threading
+
+import requests
+import requests.adapters
+
+# Maximum number of connections kept open for each host
+POOL_SIZE = 16
+
+_ADAPTER = None  # type: Optional[requests.adapters.HTTPAdapter]
+_LOCK = threading.Lock()
+
+
+def get_adapter() -> requests.adapters.HTTPAdapter:
+    global _ADAPTER
+    with _LOCK:
+        if not _ADAPTER:
+            _ADAPTER = requests.adapters.HTTPAdapter(
+                pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE
+            )
+        return _ADAPTER
+
+
+def setup_session(session: requests.Session) -> requests.Session:
+    """ Make the session use the shared pool of connections """
+    adapter = get_adapter()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def new_session() -> requests.Session:
+    return setup_session(requests.Session())
@@ -0,0 +1,74 @@
+from path import Path
+
+import tsrc
+import tsrc.git
+
+from cli_ui.tests import MessageRecorder
+from tsrc.test.helpers.cli import CLI
+from tsrc.test.helpers.git_server import GitServer
+
+
+def test_init_from_bundles(
+    tsrc_cli: CLI, git_server: GitServer, workspace_path: Path
+) -> None:
+    git_server.add_repo("foo")
+    git_server.add_repo("spam/eggs")
+    git_server.tag("spam/eggs", "v0.1")
+    git_server.manifest.set_repo_tag("spam/eggs", "v0.1")
+    tsrc_cli.run("init", git_server.manifest_url)
+    bundles_path = workspace_path.parent / "bundles"
+    tsrc_cli.run("bundle", "create", bundles_path)
+    assert (bundles_path / "manifest.bundle").exists()
+    assert (bundles_path / "repos/spam/eggs.bundle").exists()
+    git_server.push_file("foo", "new.txt")
+
+    other_path = workspace_path.parent / "other"
+    other_path.mkdir()
+    # fmt: off
+    tsrc_cli.run(
+        "init", "-w", other_path, git_server.manifest_url,
+        "--from-bundles", bundles_path
+    )
+    # fmt: on
+
+    foo_path = other_path / "foo"
+    assert (foo_path / "new.txt").exists(), "delta was not fetched"
+    assert tsrc.git.get_current_branch(foo_path) == "master"
+    _, upstream = tsrc.git.run_captured(
+        foo_path, "rev-parse", "--abbrev-ref", "@{upstream}"
+    )
+    assert upstream == "origin/master"
+    _, remote_url = tsrc.git.run_captured(foo_path, "remote", "get-url", "origin")
+    assert remote_url == git_server.get_url("foo")
+    eggs_path = other_path / "spam/eggs"
+    _, tag = tsrc.git.run_captured(eggs_path, "describe", "--tags", "--exact-match")
+    assert tag == "v0.1"
+
+
+def test_incremental_bundles(
+    tsrc_cli: CLI,
+    git_server: GitServer,
+    workspace_path: Path,
+    message_recorder: MessageRecorder,
+) -> None:
+    git_server.add_repo("foo")
+    git_server.add_repo("bar")
+    tsrc_cli.run("init", git_server.manifest_url)
+    tsrc_cli.run("snapshot", "lock.yml")
+    other_path = workspace_path.parent / "other"
+    other_path.mkdir()
+    tsrc_cli.run("init", "-w", other_path, git_server.manifest_url)
+    git_server.push_file("foo", "new.txt")
+    tsrc_cli.run("sync")
+    bundles_path = workspace_path.parent / "bundles"
+
+    tsrc_cli.run("bundle", "create", bundles_path, "--since", "lock.yml")
+
+    assert (bundles_path / "repos/foo.bundle").exists()
+    assert not (bundles_path / "repos/bar.bundle").exists()
+
+    message_recorder.reset()
+    tsrc_cli.run("sync", "-w", other_path, "--from-bundles", bundles_path)
+    assert message_recorder.find(r"Using .*foo\.bundle")
+    assert not message_recorder.find("Could not use")
+    assert (other_path / "foo/new.txt").exists()
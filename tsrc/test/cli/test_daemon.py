@@ -0,0 +1,205 @@
+import sys
+import threading
+from typing import Any, Iterator
+
+from path import Path
+import pytest
+
+import tsrc
+import tsrc.cli.daemon
+import tsrc.daemon
+import tsrc.git
+import tsrc.watch
+
+from cli_ui.tests import MessageRecorder
+from tsrc.test.helpers.cli import CLI
+from tsrc.test.helpers.git_server import GitServer
+
+pytestmark = pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="inotify is only available on Linux"
+)
+
+
+@pytest.fixture
+def start_daemon(workspace_path: Path, monkeypatch: Any) -> Iterator[Any]:
+    monkeypatch.setenv("GIT_OPTIONAL_LOCKS", "0")
+    threads = list()
+
+    def start() -> threading.Thread:
+        server = tsrc.cli.daemon.Server(tsrc.Workspace(workspace_path))
+        thread = threading.Thread(target=server.run)
+        thread.start()
+        threads.append((server, thread))
+        return thread
+
+    yield start
+
+    for server, thread in threads:
+        if thread.is_alive():
+            server.shutdown()
+            thread.join()
+
+
+def test_status_uses_daemon(
+    tsrc_cli: CLI,
+    git_server: GitServer,
+    workspace_path: Path,
+    message_recorder: MessageRecorder,
+    start_daemon: Any,
+    monkeypatch: Any,
+) -> None:
+    git_server.add_repo("foo")
+    git_server.add_repo("bar")
+    tsrc_cli.run("init", git_server.manifest_url)
+    start_daemon()
+
+    def fail() -> None:
+        assert False, "manifest should not be parsed when the daemon is running"
+
+    monkeypatch.setattr(tsrc.Workspace, "load_manifest", lambda self: fail())
+
+    (workspace_path / "foo/new.txt").write_text("new")
+    tsrc_cli.run("status", "--dirty-only")
+    assert message_recorder.find(r"\* foo master \(dirty\)")
+    assert not message_recorder.find(r"\* bar")
+
+    message_recorder.reset()
+    (workspace_path / "foo/new.txt").remove()
+    tsrc_cli.run("status")
+    assert message_recorder.find(r"\* foo master")
+    assert not message_recorder.find(r"dirty")
+
+
+def test_daemon_sees_missing_repos(
+    tsrc_cli: CLI,
+    git_server: GitServer,
+    workspace_path: Path,
+    message_recorder: MessageRecorder,
+    start_daemon: Any,
+) -> None:
+    git_server.add_repo("foo")
+    git_server.add_repo("bar")
+    tsrc_cli.run("init", git_server.manifest_url)
+    start_daemon()
+
+    (workspace_path / "bar").rmtree()
+    tsrc_cli.run("status")
+
+    assert message_recorder.find(r"\* bar error: missing repo")
+
+
+def test_foreach_uses_daemon(
+    tsrc_cli: CLI,
+    git_server: GitServer,
+    message_recorder: MessageRecorder,
+    start_daemon: Any,
+    monkeypatch: Any,
+) -> None:
+    git_server.add_repo("foo")
+    git_server.add_repo("bar")
+    git_server.manifest.configure_group("foo", ["foo"])
+    tsrc_cli.run("init", git_server.manifest_url)
+    start_daemon()
+    monkeypatch.setattr(tsrc.Workspace, "load_manifest", lambda self: None)
+
+    tsrc_cli.run("foreach", "--group", "foo", "ls")
+
+    assert message_recorder.find(r"Running `ls` on 1 repos")
+
+
+def test_foreach_dag_uses_daemon(
+    tsrc_cli: CLI,
+    git_server: GitServer,
+    workspace_path: Path,
+    start_daemon: Any,
+    monkeypatch: Any,
+) -> None:
+    """ Check that repos sent by the daemon still know their dependencies """
+    git_server.add_repo("app")
+    git_server.add_repo("lib")
+    git_server.manifest.configure_repo("app", "depends_on", ["lib"])
+    tsrc_cli.run("init", git_server.manifest_url)
+    start_daemon()
+    monkeypatch.setattr(tsrc.Workspace, "load_manifest", lambda self: None)
+
+    cmd = "basename $PWD >> %s" % (workspace_path / "order.txt")
+    tsrc_cli.run("foreach", "--dag", "-c", cmd)
+
+    assert (workspace_path / "order.txt").text().split() == ["lib", "app"]
+
+
+def test_watcher_skips_ignored_dirs(tmp_path: Path) -> None:
+    repo_path = Path(tmp_path) / "foo"
+    (repo_path / "src").makedirs_p()
+    (repo_path / "build/obj").makedirs_p()
+    (repo_path / ".gitignore").write_text("build/\n")
+    tsrc.git.run(repo_path, "init")
+    watcher = tsrc.watch.WorkspaceWatcher()
+    try:
+        watcher.watch_repo("foo", repo_path)
+        watched = set(watcher._paths.values())
+        assert repo_path / "src" in watched
+        assert repo_path / "build" not in watched
+        assert repo_path / "build/obj" not in watched
+
+        # Directories created later are filtered too
+        (repo_path / "build/new").mkdir()
+        (repo_path / "src/new").mkdir()
+        assert watcher.wait_for_changes(timeout=1) == {"foo"}
+        assert repo_path / "build/new" not in set(watcher._paths.values())
+        assert repo_path / "src/new" in set(watcher._paths.values())
+    finally:
+        watcher.close()
+
+
+def test_events_for_removed_watches_are_ignored(tmp_path: Path) -> None:
+    watcher = tsrc.watch.WorkspaceWatcher()
+    try:
+        watcher.watch_tree("foo", Path(tmp_path))
+        (Path(tmp_path) / "new").mkdir()
+        watcher.clear()
+        watcher.wait_for_changes(timeout=0.1)
+    finally:
+        watcher.close()
+
+
+def test_unwatched_repos_are_not_collected_every_time(
+    tsrc_cli: CLI, git_server: GitServer, workspace_path: Path
+) -> None:
+    git_server.add_repo("foo")
+    git_server.add_repo("bar")
+    tsrc_cli.run("init", git_server.manifest_url)
+    (workspace_path / "bar").rmtree()
+    collected = list()
+
+    def collect(repo: tsrc.Repo) -> None:
+        collected.append(repo.src)
+
+    state = tsrc.watch.WorkspaceState(tsrc.Workspace(workspace_path), collect)
+    try:
+        state.load()
+        state.refresh()
+        assert sorted(collected) == ["bar", "foo"]
+
+        collected.clear()
+        state.refresh()
+        assert collected == []
+
+        state.refresh(check_unwatched=True)
+        assert collected == ["bar"]
+    finally:
+        state.close()
+
+
+def test_daemon_stop(
+    tsrc_cli: CLI, git_server: GitServer, workspace_path: Path, start_daemon: Any
+) -> None:
+    git_server.add_repo("foo")
+    tsrc_cli.run("init", git_server.manifest_url)
+    thread = start_daemon()
+
+    tsrc_cli.run("daemon", "--stop")
+
+    thread.join(timeout=10)
+    assert not thread.is_alive()
+    assert tsrc.daemon.connect(workspace_path) is None
@@ -1,6 +1,7 @@
 import os
 from typing import List
 import pytest
+from path import Path
 
 from tsrc.test.helpers.cli import CLI
 from tsrc.test.helpers.git_server import GitServer
@@ -122,3 +123,51 @@ def test_cannot_start_cmd(tsrc_cli: CLI, git_server: GitServer) -> None:
     manifest_url = git_server.manifest_url
     tsrc_cli.run("init", manifest_url)
     tsrc_cli.run("foreach", "no-such", expect_fail=True)
+
+
+def test_foreach_dag_runs_dependencies_first(
+    tsrc_cli: CLI, git_server: GitServer, workspace_path: Path
+) -> None:
+    """ Scenario:
+    * Create a manifest where 'app' depends on 'lib'
+    * Run a command that records the order in which repos are processed,
+      'lib' taking longer than 'other'
+    * Check that 'app' was processed after 'lib'
+    """
+    git_server.add_repo("app")
+    git_server.add_repo("lib")
+    git_server.add_repo("other")
+    git_server.manifest.configure_repo("app", "depends_on", ["lib"])
+    tsrc_cli.run("init", git_server.manifest_url)
+
+    order_path = workspace_path / "order.txt"
+    cmd = 'if [ "$(basename $PWD)" = lib ]; then sleep 0.5; fi; '
+    cmd += "basename $PWD >> %s" % order_path
+    tsrc_cli.run("foreach", "--dag", "-j", "3", "-c", cmd)
+
+    order = order_path.text().split()
+    assert sorted(order) == ["app", "lib", "other"]
+    assert order.index("lib") < order.index("app")
+
+
+def test_foreach_dag_skips_downstream_repos(
+    tsrc_cli: CLI, git_server: GitServer, message_recorder: MessageRecorder
+) -> None:
+    """ Scenario:
+    * Create a manifest where 'app' depends on 'lib'
+    * Run a command that fails in 'lib'
+    * Check that 'app' is skipped, and that 'other' is still processed
+    """
+    git_server.add_repo("app")
+    git_server.add_repo("lib")
+    git_server.add_repo("other")
+    git_server.push_file("app", "ok.txt")
+    git_server.push_file("other", "ok.txt")
+    git_server.manifest.configure_repo("app", "depends_on", ["lib"])
+    tsrc_cli.run("init", git_server.manifest_url)
+
+    tsrc_cli.run("foreach", "--dag", "-j", "2", "-c", "cat ok.txt", expect_fail=True)
+
+    assert message_recorder.find(r"\* lib")
+    assert message_recorder.find(r"\* app: skipped: depends on lib which failed")
+    assert not message_recorder.find(r"\* other")
@@ -0,0 +1,65 @@
+from path import Path
+
+import tsrc.git
+
+from cli_ui.tests import MessageRecorder
+from tsrc.test.helpers.cli import CLI
+from tsrc.test.helpers.git_server import GitServer
+from tsrc.workspace.maintainer import get_host
+
+
+def test_gc(
+    tsrc_cli: CLI,
+    git_server: GitServer,
+    workspace_path: Path,
+    message_recorder: MessageRecorder,
+) -> None:
+    git_server.add_repo("foo")
+    git_server.add_repo("bar")
+    tsrc_cli.run("init", git_server.manifest_url)
+    foo_path = workspace_path / "foo"
+    (foo_path / "new.txt").write_text("new")
+    tsrc.git.run(foo_path, "add", "new.txt")
+    tsrc.git.run(foo_path, "commit", "--message", "new")
+
+    tsrc_cli.run("gc")
+
+    assert (foo_path / ".git/objects/info/commit-graphs").exists()
+    assert message_recorder.find(r"Disk usage of 2 repos: .* -> .* \(reclaimed .*\)")
+    assert message_recorder.find(r"Status time: \d+\.\d+s -> \d+\.\d+s")
+
+
+def test_prefetch_with_jobs_per_host(
+    tsrc_cli: CLI, git_server: GitServer, workspace_path: Path
+) -> None:
+    git_server.add_repo("foo")
+    git_server.add_repo("bar")
+    tsrc_cli.run("init", git_server.manifest_url)
+    git_server.push_file("foo", "new.txt")
+
+    # fmt: off
+    tsrc_cli.run(
+        "gc", "--task", "prefetch", "--jobs-per-host", "1", "--no-timing"
+    )
+    # fmt: on
+
+    foo_path = workspace_path / "foo"
+    _, prefetched = tsrc.git.run_captured(
+        foo_path, "rev-parse", "refs/prefetch/remotes/origin/master"
+    )
+    assert prefetched == tsrc.git.get_sha1(git_server.get_path("foo"))
+
+
+def test_unknown_task(tsrc_cli: CLI, git_server: GitServer) -> None:
+    git_server.add_repo("foo")
+    tsrc_cli.run("init", git_server.manifest_url)
+
+    tsrc_cli.run("gc", "--task", "no-such-task", expect_fail=True)
+
+
+def test_get_host() -> None:
+    assert get_host("git@example.com:foo/bar.git") == "example.com"
+    assert get_host("ssh://git@example.com:2222/foo/bar.git") == "example.com"
+    assert get_host("https://example.com/foo/bar.git") == "example.com"
+    assert get_host("file:///srv/foo") == ""
+    assert get_host("/srv/foo") == ""
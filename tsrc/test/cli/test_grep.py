@@ -0,0 +1,93 @@
+from typing import Any, List  # noqa
+
+from path import Path
+
+import tsrc.cli.grep
+
+from cli_ui.tests import MessageRecorder
+from tsrc.test.helpers.cli import CLI
+from tsrc.test.helpers.git_server import GitServer
+
+
+def test_happy(
+    tsrc_cli: CLI, git_server: GitServer, message_recorder: MessageRecorder
+) -> None:
+    git_server.add_repo("foo")
+    git_server.add_repo("spam/eggs")
+    git_server.push_file("foo", "foo.txt", contents="needle\nhay\n")
+    git_server.push_file("spam/eggs", "src/eggs.txt", contents="hay\nneedle\n")
+    tsrc_cli.run("init", git_server.manifest_url)
+    message_recorder.reset()
+
+    tsrc_cli.run("grep", "--", "-n", "needle")
+
+    assert message_recorder.find(r"^foo/foo.txt:1:needle$")
+    assert message_recorder.find(r"^spam/eggs/src/eggs.txt:2:needle$")
+    assert not message_recorder.find("hay")
+
+
+def test_groups(
+    tsrc_cli: CLI, git_server: GitServer, message_recorder: MessageRecorder
+) -> None:
+    git_server.add_repo("foo")
+    git_server.add_repo("bar")
+    git_server.push_file("foo", "foo.txt", contents="needle")
+    git_server.push_file("bar", "bar.txt", contents="needle")
+    git_server.manifest.configure_group("foo", ["foo"])
+    tsrc_cli.run("init", git_server.manifest_url)
+    message_recorder.reset()
+
+    tsrc_cli.run("grep", "--group", "foo", "needle")
+
+    assert message_recorder.find("foo.txt")
+    assert not message_recorder.find("bar.txt")
+
+
+def test_limits(tsrc_cli: CLI, git_server: GitServer, monkeypatch: Any) -> None:
+    for name in ["foo", "bar", "baz"]:
+        git_server.add_repo(name)
+        git_server.push_file(name, "lines.txt", contents="needle\n" * 10)
+    tsrc_cli.run("init", git_server.manifest_url)
+    displayed = list()  # type: List[str]
+    display = tsrc.cli.grep.Grepper.display
+
+    def spy(self: tsrc.cli.grep.Grepper, src: str, line: str) -> bool:
+        res = display(self, src, line)
+        if res:
+            displayed.append(src)
+        return res
+
+    monkeypatch.setattr(tsrc.cli.grep.Grepper, "display", spy)
+
+    tsrc_cli.run("grep", "--max-per-repo", "2", "needle")
+    assert sorted(displayed) == ["bar", "bar", "baz", "baz", "foo", "foo"]
+
+    displayed.clear()
+    tsrc_cli.run("grep", "--limit", "5", "needle")
+    assert len(displayed) == 5
+
+
+def test_no_match(tsrc_cli: CLI, git_server: GitServer) -> None:
+    git_server.add_repo("foo")
+    tsrc_cli.run("init", git_server.manifest_url)
+
+    tsrc_cli.run("grep", "no such thing", expect_fail=True)
+
+
+def test_missing_repo(
+    tsrc_cli: CLI,
+    git_server: GitServer,
+    workspace_path: Path,
+    message_recorder: MessageRecorder,
+) -> None:
+    git_server.add_repo("foo")
+    git_server.add_repo("bar")
+    git_server.push_file("foo", "foo.txt", contents="needle")
+    tsrc_cli.run("init", git_server.manifest_url)
+    (workspace_path / "bar").rmtree()
+    message_recorder.reset()
+
+    tsrc_cli.run("grep", "needle", expect_fail=True)
+
+    assert message_recorder.find("foo.txt")
+    assert message_recorder.find(r"\* bar : No repo found")
@@ -115,6 +115,28 @@ def test_copy_files_source_does_not_exist(
     assert message_recorder.find("Failed to perform the following copies")
 
 
+def test_link_files(tsrc_cli: CLI, git_server: GitServer, workspace_path: Path) -> None:
+    git_server.add_repo("foo")
+    git_server.push_file("foo", "foo.txt", contents="foo")
+    git_server.push_file("foo", "big.bin", contents="big")
+    git_server.manifest.set_repo_file_links(
+        "foo",
+        [("foo.txt", "top.txt", "symlink"), ("big.bin", "data/big.bin", "hardlink")],
+    )
+
+    tsrc_cli.run("init", git_server.manifest_url)
+
+    top_txt = workspace_path / "top.txt"
+    assert top_txt.islink()
+    assert top_txt.text() == "foo"
+    big_bin = workspace_path / "data/big.bin"
+    assert big_bin.samefile(workspace_path / "foo/big.bin")
+
+    # Running init again should leave the links alone
+    tsrc_cli.run("init", git_server.manifest_url)
+    assert top_txt.islink()
+
+
 def test_uses_correct_branch_for_repo(
     tsrc_cli: CLI, git_server: GitServer, workspace_path: Path
 ) -> None:
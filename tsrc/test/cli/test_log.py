@@ -1,3 +1,10 @@
+from typing import Any, List  # noqa
+
+from path import Path
+
+import tsrc.cli.log
+import tsrc.git
+
 from tsrc.test.helpers.cli import CLI
 from tsrc.test.helpers.git_server import GitServer
 from cli_ui.tests import MessageRecorder
@@ -32,3 +39,77 @@ def test_error(tsrc_cli: CLI, git_server: GitServer) -> None:
     tsrc_cli.run("init", manifest_url)
 
     tsrc_cli.run("log", "--from", "v0.1", expect_fail=True)
+
+
+def test_merged(tsrc_cli: CLI, git_server: GitServer, monkeypatch: Any) -> None:
+    git_server.add_repo("foo")
+    git_server.add_repo("spam")
+    git_server.tag("foo", "v0.1")
+    git_server.tag("spam", "v0.1")
+    tsrc_cli.run("init", git_server.manifest_url)
+    changes = [("foo", "first"), ("spam", "second"), ("foo", "third")]
+    for i, (repo, name) in enumerate(changes):
+        monkeypatch.setenv("GIT_COMMITTER_DATE", "2019-10-0%d 12:00:00 +0000" % (i + 1))
+        git_server.push_file(repo, name + ".txt", message=name)
+    monkeypatch.delenv("GIT_COMMITTER_DATE")
+    tsrc_cli.run("sync")
+    displayed = list()  # type: List[tsrc.cli.log.Commit]
+    monkeypatch.setattr(tsrc.cli.log, "display_commit", displayed.append)
+
+    tsrc_cli.run("log", "--from", "v0.1", "--merged")
+
+    actual = [(x.repo, x.subject) for x in displayed]
+    assert actual == [("foo", "third"), ("spam", "second"), ("foo", "first")]
+
+
+def test_merged_error(tsrc_cli: CLI, git_server: GitServer) -> None:
+    git_server.add_repo("foo")
+    tsrc_cli.run("init", git_server.manifest_url)
+
+    tsrc_cli.run("log", "--from", "v0.1", "--merged", expect_fail=True)
+
+
+def test_missing_repo(
+    tsrc_cli: CLI,
+    git_server: GitServer,
+    workspace_path: Path,
+    message_recorder: MessageRecorder,
+) -> None:
+    git_server.add_repo("foo")
+    git_server.add_repo("spam")
+    git_server.tag("foo", "v0.1")
+    git_server.tag("spam", "v0.1")
+    tsrc_cli.run("init", git_server.manifest_url)
+    git_server.push_file("foo", "foo.txt", message="new foo!")
+    tsrc_cli.run("sync")
+    (workspace_path / "spam").rmtree()
+
+    for extra_args in [[], ["--merged"]]:
+        message_recorder.reset()
+        tsrc_cli.run("log", "--from", "v0.1", *extra_args, expect_fail=True)
+        assert message_recorder.find("new foo!")
+        assert message_recorder.find("spam.* does not exist")
+
+
+def test_merged_with_git_warnings(
+    tsrc_cli: CLI,
+    git_server: GitServer,
+    workspace_path: Path,
+    message_recorder: MessageRecorder,
+) -> None:
+    """ Scenario:
+    * Create a 'v0.1' branch in the 'foo' repo, in addition to the 'v0.1' tag
+    * Check that the warning printed by git log about the ambiguous refname
+      does not prevent the commits from being displayed
+    """
+    git_server.add_repo("foo")
+    git_server.tag("foo", "v0.1")
+    tsrc_cli.run("init", git_server.manifest_url)
+    git_server.push_file("foo", "foo.txt", message="new foo!")
+    tsrc_cli.run("sync")
+    tsrc.git.run(workspace_path / "foo", "branch", "v0.1", "v0.1")
+    message_recorder.reset()
+
+    tsrc_cli.run("log", "--from", "v0.1", "--merged")
+
+    assert message_recorder.find("new foo!")
@@ -0,0 +1,95 @@
+from typing import Any
+
+from path import Path
+
+import tsrc.git
+import tsrc.workspace.state
+import tsrc.workspace.syncer
+
+from cli_ui.tests import MessageRecorder
+from tsrc.test.helpers.cli import CLI
+from tsrc.test.helpers.git_server import GitServer
+
+
+def test_prefetch_does_not_touch_working_trees(
+    tsrc_cli: CLI, git_server: GitServer, workspace_path: Path
+) -> None:
+    git_server.add_repo("foo")
+    tsrc_cli.run("init", git_server.manifest_url)
+    foo_path = workspace_path / "foo"
+    old_sha1 = tsrc.git.get_sha1(foo_path)
+    git_server.push_file("foo", "new.txt")
+    git_server.tag("foo", "v0.1")
+
+    tsrc_cli.run("prefetch")
+
+    new_sha1 = tsrc.git.get_sha1(git_server.get_path("foo"))
+    assert tsrc.git.get_sha1(foo_path) == old_sha1
+    assert tsrc.git.get_sha1(foo_path, ref="origin/master") == old_sha1
+    prefetched = tsrc.git.get_sha1(foo_path, ref="refs/prefetch/remotes/origin/master")
+    assert prefetched == new_sha1
+    rc, _ = tsrc.git.run_captured(
+        foo_path, "rev-parse", "refs/prefetch/tags/origin/v0.1", check=False
+    )
+    assert rc == 0
+    state = tsrc.workspace.state.StateStore(workspace_path)
+    assert state.get_repo("foo").last_prefetch
+
+
+def test_sync_uses_recent_prefetch(
+    tsrc_cli: CLI,
+    git_server: GitServer,
+    workspace_path: Path,
+    message_recorder: MessageRecorder,
+    monkeypatch: Any,
+) -> None:
+    git_server.add_repo("foo")
+    tsrc_cli.run("init", git_server.manifest_url)
+    git_server.push_file("foo", "new.txt")
+    tsrc_cli.run("prefetch")
+
+    def fail(*args: Any) -> None:
+        assert False, "should not fetch"
+
+    monkeypatch.setattr(tsrc.workspace.syncer.Syncer, "full_fetch", fail)
+    message_recorder.reset()
+    tsrc_cli.run("sync", "--max-prefetch-age", "60")
+
+    assert message_recorder.find("Using prefetched refs")
+    assert (workspace_path / "foo/new.txt").exists()
+
+
+def test_sync_ignores_old_prefetch(
+    tsrc_cli: CLI,
+    git_server: GitServer,
+    workspace_path: Path,
+    message_recorder: MessageRecorder,
+) -> None:
+    git_server.add_repo("foo")
+    tsrc_cli.run("init", git_server.manifest_url)
+    tsrc_cli.run("prefetch")
+    git_server.push_file("foo", "new.txt")
+
+    message_recorder.reset()
+    tsrc_cli.run("sync", "--max-prefetch-age", "0")
+
+    assert not message_recorder.find("Using prefetched refs")
+    assert (workspace_path / "foo/new.txt").exists()
+
+
+def test_sync_fetches_by_default(
+    tsrc_cli: CLI,
+    git_server: GitServer,
+    workspace_path: Path,
+    message_recorder: MessageRecorder,
+) -> None:
+    git_server.add_repo("foo")
+    tsrc_cli.run("init", git_server.manifest_url)
+    tsrc_cli.run("prefetch")
+    git_server.push_file("foo", "new.txt")
+
+    message_recorder.reset()
+    tsrc_cli.run("sync")
+
+    assert not message_recorder.find("Using prefetched refs")
+    assert (workspace_path / "foo/new.txt").exists()
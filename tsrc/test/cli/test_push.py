@@ -1,10 +1,15 @@
+from typing import Any, List
 import argparse
+import io
 import mock
 
+from cli_ui.tests import MessageRecorder
 from path import Path
 import tsrc
 from tsrc.cli.push_git import PushAction
 from tsrc.cli.push import RepositoryInfo
+from tsrc.test.helpers.cli import CLI
+from tsrc.test.helpers.git_server import GitServer
 
 
 def test_push_use_tracked_branch(
@@ -38,6 +43,110 @@ def test_push_use_given_push_spec(
     assert "heads/remote" in out
 
 
+def test_push_to_buffer(repo_path: Path, push_args: argparse.Namespace) -> None:
+    """ Check that nothing is written to stdout when pushing several
+    repos at once: everything goes to the buffer instead
+
+    """
+    tsrc.git.run(repo_path, "checkout", "-b", "local")
+    repository_info = RepositoryInfo.read(
+        repo_path, workspace=mock_workspace_git_urls()
+    )
+    dummy_push = PushAction(repository_info, push_args)
+    dummy_push.output = io.StringIO()
+    dummy_push.push()
+    output = dummy_push.output.getvalue()
+    assert "Running git push" in output
+    assert "[new branch]" in output
+
+
+def create_branch(repo_path: Path, branch: str) -> None:
+    tsrc.git.run(repo_path, "checkout", "-b", branch)
+    tsrc.git.run(repo_path, "commit", "--message", branch, "--allow-empty")
+
+
+def get_pushed_branches(git_server: GitServer, name: str) -> List[str]:
+    _, out = tsrc.git.run_captured(git_server.bare_path / name, "branch", "--list")
+    return [x[2:].strip() for x in out.splitlines()]
+
+
+def test_push_group(
+    tsrc_cli: CLI,
+    git_server: GitServer,
+    workspace_path: Path,
+    message_recorder: MessageRecorder,
+    monkeypatch: Any,
+) -> None:
+    """ Scenario:
+    * Create a group with 'foo' and 'bar', and an other repo named 'spam'
+    * Create a 'feature' branch in all of them, and a 'fix' branch in 'baz',
+      which is also part of the group
+    * Run `tsrc push --group` from 'foo'
+    * Check that only 'foo' and 'bar' are pushed
+    """
+    git_server.add_group("group", ["foo", "bar", "baz"])
+    git_server.add_repo("spam")
+    tsrc_cli.run("init", git_server.manifest_url)
+    for src in ["foo", "bar", "spam"]:
+        create_branch(workspace_path / src, "feature")
+    create_branch(workspace_path / "baz", "fix")
+
+    monkeypatch.chdir(workspace_path / "foo")
+    tsrc_cli.run("push", "--group", "group")
+
+    assert "feature" in get_pushed_branches(git_server, "foo")
+    assert "feature" in get_pushed_branches(git_server, "bar")
+    assert "fix" not in get_pushed_branches(git_server, "baz")
+    assert "feature" not in get_pushed_branches(git_server, "spam")
+    assert message_recorder.find("Pushing 2 repos")
+
+
+def test_push_group_from_manifest_branch(
+    tsrc_cli: CLI,
+    git_server: GitServer,
+    workspace_path: Path,
+    monkeypatch: Any,
+) -> None:
+    """ Scenario:
+    * Create a group with 'foo' and 'bar', both on the 'master' branch
+      from the manifest
+    * Run `tsrc push --group` from 'foo'
+    * Check that it fails, and that nothing is pushed
+    """
+    git_server.add_group("group", ["foo", "bar"])
+    tsrc_cli.run("init", git_server.manifest_url)
+    for src in ["foo", "bar"]:
+        tsrc.git.run(workspace_path / src, "commit", "--message", "wip", "--allow-empty")
+    bar_bare_path = git_server.bare_path / "bar"
+    old_sha1 = tsrc.git.get_sha1(bar_bare_path, ref="master")
+
+    monkeypatch.chdir(workspace_path / "foo")
+    tsrc_cli.run("push", "--group", "group", expect_fail=True)
+
+    assert tsrc.git.get_sha1(bar_bare_path, ref="master") == old_sha1
+
+
+def test_push_all_dirty_branches(
+    tsrc_cli: CLI, git_server: GitServer, workspace_path: Path
+) -> None:
+    """ Scenario:
+    * Create 'foo' and 'bar' repos
+    * Create a 'feature' branch in 'foo' only
+    * Run `tsrc push --all-dirty-branches` from the workspace
+    * Check that only 'foo' is pushed
+    """
+    git_server.add_repo("foo")
+    git_server.add_repo("bar")
+    tsrc_cli.run("init", git_server.manifest_url)
+    create_branch(workspace_path / "foo", "feature")
+    tsrc.git.run(workspace_path / "bar", "commit", "--message", "wip", "--allow-empty")
+
+    tsrc_cli.run("push", "--all-dirty-branches")
+
+    assert "feature" in get_pushed_branches(git_server, "foo")
+    assert get_pushed_branches(git_server, "bar") == ["master"]
+
+
 def test_service_from_url() -> None:
     workspace_mock = mock_workspace_git_urls()
 
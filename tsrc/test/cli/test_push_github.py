@@ -22,7 +22,7 @@ def github_mock() -> Any:
 
 def execute_push(
     repo_path: Path, push_args: argparse.Namespace, github_mock: Any
-) -> None:
+) -> PushAction:
     workspace_mock = mock.Mock()
     workspace_mock.get_github_enterprise_url.return_value = None
     workspace_mock.get_gitlab_url.return_value = None
@@ -30,6 +30,7 @@ def execute_push(
     repository_info = RepositoryInfo.read(repo_path, workspace=workspace_mock)
     push_action = PushAction(repository_info, push_args, github_api=github_mock)
     push_action.execute()
+    return push_action
 
 
 def test_create(
@@ -66,7 +67,7 @@ def test_create(
     execute_push(repo_path, push_args, github_mock)
 
     mock_repo.create_pull.assert_called_with("new feature", "devel", "new-feature")
-    mock_repo.pull_requests.assert_called_with()
+    mock_repo.pull_requests.assert_called_with(state="open", head="owner:new-feature")
     mock_repo.issue.assert_called_with(42)
     mock_issue.assign.assert_called_with("assignee1")
     mock_repo._build_url.assert_called_with(
@@ -170,6 +171,7 @@ def test_close(
 
     push_args.merge = True
     push_args.close = True
-    execute_push(repo_path, push_args, github_mock)
+    push_action = execute_push(repo_path, push_args, github_mock)
 
     opened_pr.close.assert_called_with()
+    assert push_action.review_url == opened_pr.html_url
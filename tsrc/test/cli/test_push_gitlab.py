@@ -1,12 +1,14 @@
 import argparse
-from typing import Any, List
+from typing import Any, List, Optional
 
 from gitlab import Gitlab
+from gitlab.exceptions import GitlabGetError
 from path import Path
 import mock
 import pytest
 
 import tsrc
+from tsrc.cache import ApiCache
 from tsrc.test.helpers.cli import CLI
 from tsrc.cli.push import RepositoryInfo
 from tsrc.cli.push_gitlab import PushAction, FeatureNotAvailable
@@ -67,14 +69,20 @@ def gitlab_mock_with_merge_requests(mock_merge_requests: List[Any]) -> Any:
 
 
 def execute_push(
-    repo_path: Path, push_args: argparse.Namespace, gitlab_mock: Gitlab
+    repo_path: Path,
+    push_args: argparse.Namespace,
+    gitlab_mock: Gitlab,
+    *,
+    api_cache: Optional[ApiCache] = None
 ) -> None:
     workspace_mock = mock.Mock()
     workspace_mock.get_github_enterprise_url.return_value = None
     workspace_mock.get_gitlab_url.return_value = GITLAB_URL
 
     repository_info = RepositoryInfo.read(repo_path, workspace=workspace_mock)
-    push_action = PushAction(repository_info, push_args, gitlab_api=gitlab_mock)
+    push_action = PushAction(
+        repository_info, push_args, gitlab_api=gitlab_mock, api_cache=api_cache
+    )
     push_action.execute()
 
 
@@ -249,3 +257,71 @@ def test_wipify_existing_merge_request(
 
     assert mock_mr.title == "WIP: not ready"
     mock_mr.save.assert_called_once()
+
+
+def test_lookups_are_cached(
+    repo_path: Path, tsrc_cli: CLI, push_args: argparse.Namespace, tmp_path: Path
+) -> None:
+    """ Scenario:
+    * Push once, with a reviewer
+    * Push again with the same cache
+    * Check that the project, the group, the reviewer and the features
+      were only looked up during the first push
+    """
+    mock_mr = mock.Mock(iid="42", web_url="http://42", title="old title")
+    gitlab_mock = gitlab_mock_with_merge_requests([mock_mr])
+    mock_project = gitlab_mock.projects.get()
+    mock_project.id = 12
+    mock_project.default_branch = "master"
+    gitlab_mock.groups.get().id = 3
+    gitlab_mock.reset_mock()
+    push_args.reviewers = ["alice"]
+    api_cache = ApiCache(tmp_path / "api")
+
+    execute_push(repo_path, push_args, gitlab_mock, api_cache=api_cache)
+    execute_push(repo_path, push_args, gitlab_mock, api_cache=api_cache)
+
+    assert gitlab_mock.projects.get.call_args_list == [
+        mock.call("owner/project"),
+        mock.call(12, lazy=True),
+    ]
+    assert gitlab_mock.groups.get.call_args_list == [
+        mock.call("owner"),
+        mock.call(3, lazy=True),
+    ]
+    gitlab_mock.features.list.assert_called_once_with()
+    mock_project.members.list.assert_called_once()
+    assert mock_mr.approvals.set_approvers.call_args_list == [
+        mock.call([ALICE.id]),
+        mock.call([ALICE.id]),
+    ]
+
+
+def test_negative_lookups(
+    repo_path: Path, tsrc_cli: CLI, push_args: argparse.Namespace, tmp_path: Path
+) -> None:
+    """ Scenario:
+    * Look for a group that does not exist, and for a feature when there
+      are no features at all, twice with the same cache
+    * Check that the missing group is looked up again, but that the empty
+      list of features is cached
+    """
+    gitlab_mock = gitlab_mock_with_merge_requests([])
+    gitlab_mock.groups.get.side_effect = GitlabGetError(response_code=404)
+    gitlab_mock.features.list.return_value = []
+    workspace_mock = mock.Mock()
+    workspace_mock.get_github_enterprise_url.return_value = None
+    workspace_mock.get_gitlab_url.return_value = GITLAB_URL
+    repository_info = RepositoryInfo.read(repo_path, workspace=workspace_mock)
+    api_cache = ApiCache(tmp_path / "api")
+
+    for _ in range(2):
+        push_action = PushAction(
+            repository_info, push_args, gitlab_api=gitlab_mock, api_cache=api_cache
+        )
+        assert push_action._get_group("owner") is None
+        with pytest.raises(FeatureNotAvailable):
+            push_action.check_gitlab_feature("multiple_merge_request_assignees")
+
+    assert gitlab_mock.groups.get.call_count == 2
+    gitlab_mock.features.list.assert_called_once_with()
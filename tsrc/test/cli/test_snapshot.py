@@ -0,0 +1,59 @@
+from path import Path
+
+import tsrc
+import tsrc.git
+
+from tsrc.test.helpers.cli import CLI
+from tsrc.test.helpers.git_server import GitServer
+
+
+def test_snapshot(tsrc_cli: CLI, git_server: GitServer, workspace_path: Path) -> None:
+    git_server.add_repo("foo")
+    git_server.add_repo("bar")
+    git_server.tag("bar", "v0.1")
+    git_server.manifest.set_repo_tag("bar", "v0.1")
+    tsrc_cli.run("init", git_server.manifest_url)
+
+    tsrc_cli.run("snapshot", "lock.yml")
+
+    lock_data = tsrc.parse_config(workspace_path / "lock.yml")
+    repos = {x["src"]: x for x in lock_data["repos"]}
+    assert repos["foo"]["sha1"] == tsrc.git.get_sha1(workspace_path / "foo")
+    assert repos["bar"]["sha1"] == tsrc.git.get_sha1(workspace_path / "bar")
+    assert "tag" not in repos["bar"]
+
+
+def test_sync_with_lock_file(
+    tsrc_cli: CLI, git_server: GitServer, workspace_path: Path
+) -> None:
+    git_server.add_repo("foo")
+    git_server.add_repo("bar")
+    tsrc_cli.run("init", git_server.manifest_url)
+    tsrc_cli.run("snapshot", "lock.yml")
+    foo_path = workspace_path / "foo"
+    locked_sha1 = tsrc.git.get_sha1(foo_path)
+    git_server.push_file("foo", "new.txt")
+    tsrc_cli.run("sync")
+    assert tsrc.git.get_sha1(foo_path) != locked_sha1
+
+    tsrc_cli.run("sync", "--lock", "lock.yml")
+
+    assert tsrc.git.get_sha1(foo_path) == locked_sha1
+
+
+def test_sync_with_lock_file_fetches_missing_commits(
+    tsrc_cli: CLI, git_server: GitServer, workspace_path: Path
+) -> None:
+    git_server.add_repo("foo")
+    tsrc_cli.run("init", git_server.manifest_url)
+    git_server.push_file("foo", "new.txt")
+    # Write the lock file from an other, more recent workspace
+    other_path = workspace_path.parent / "other"
+    other_path.mkdir()
+    tsrc_cli.run("init", "-w", other_path, git_server.manifest_url)
+    tsrc_cli.run("snapshot", "-w", other_path, "lock.yml")
+    locked_sha1 = tsrc.git.get_sha1(other_path / "foo")
+
+    tsrc_cli.run("sync", "--lock", "lock.yml")
+
+    assert tsrc.git.get_sha1(workspace_path / "foo") == locked_sha1
@@ -1,6 +1,13 @@
+import io
+import json
+import sys
+from typing import Any
+
 from path import Path
+import pytest
 
 import tsrc.cli
+import tsrc.cli.status
 
 from cli_ui.tests import MessageRecorder
 from tsrc.test.helpers.cli import CLI
@@ -100,3 +107,151 @@ def test_status_with_missing_repos(
     (workspace_path / "foo").rmtree()
 
     tsrc_cli.run("status")
+
+
+def test_status_json(
+    tsrc_cli: CLI, git_server: GitServer, workspace_path: Path, capsys: Any
+) -> None:
+    git_server.add_repo("foo/bar")
+    git_server.add_repo("spam/eggs")
+    git_server.add_repo("missing")
+    tsrc_cli.run("init", git_server.manifest_url)
+    tsrc.git.run(workspace_path / "spam/eggs", "checkout", "-b", "fish")
+    (workspace_path / "spam/eggs/new.txt").write_text("new")
+    (workspace_path / "missing").rmtree()
+    capsys.readouterr()
+
+    tsrc_cli.run("status", "--format", "json")
+
+    statuses = json.loads(capsys.readouterr().out)
+    by_src = {x["src"]: x for x in statuses}
+    assert by_src["foo/bar"]["branch"] == "master"
+    assert by_src["foo/bar"]["dirty"] is False
+    assert by_src["foo/bar"]["error"] is None
+    assert by_src["spam/eggs"]["branch"] == "fish"
+    assert by_src["spam/eggs"]["untracked"] == 1
+    assert by_src["spam/eggs"]["dirty"] is True
+    assert by_src["missing"]["error"]
+    assert by_src["missing"]["branch"] is None
+
+
+def test_status_json_branch_only(
+    tsrc_cli: CLI, git_server: GitServer, workspace_path: Path, capsys: Any
+) -> None:
+    """ Fields that were not computed should be null, not 0 or false """
+    git_server.add_repo("foo")
+    tsrc_cli.run("init", git_server.manifest_url)
+    capsys.readouterr()
+
+    tsrc_cli.run("status", "--format", "json", "--branch-only")
+
+    (status,) = json.loads(capsys.readouterr().out)
+    assert status["branch"] == "master"
+    assert status["sha1"]
+    for key in ["ahead", "behind", "staged", "not_staged", "added", "untracked"]:
+        assert status[key] is None
+    assert status["dirty"] is None
+
+
+def test_status_ndjson(
+    tsrc_cli: CLI, git_server: GitServer, workspace_path: Path, capsys: Any
+) -> None:
+    git_server.add_repo("foo")
+    git_server.add_repo("bar")
+    tsrc_cli.run("init", git_server.manifest_url)
+    capsys.readouterr()
+
+    tsrc_cli.run("status", "--format", "ndjson")
+
+    lines = capsys.readouterr().out.splitlines()
+    statuses = [json.loads(x) for x in lines]
+    assert [x["src"] for x in statuses] == ["foo", "bar"]
+    assert all(x["sha1"] for x in statuses)
+
+
+def test_status_dirty_only(
+    tsrc_cli: CLI,
+    git_server: GitServer,
+    workspace_path: Path,
+    message_recorder: MessageRecorder,
+) -> None:
+    git_server.add_repo("clean")
+    git_server.add_repo("dirty")
+    git_server.add_repo("other_branch")
+    tsrc_cli.run("init", git_server.manifest_url)
+    (workspace_path / "dirty/README").write_text("changed")
+    tsrc.git.run(workspace_path / "other_branch", "checkout", "-b", "fish")
+    message_recorder.reset()
+
+    tsrc_cli.run("status", "--dirty-only")
+
+    assert message_recorder.find(r"\* dirty\s+master \(dirty\)")
+    assert message_recorder.find(r"\* other_branch\s+fish")
+    assert not message_recorder.find(r"\* clean")
+
+
+def test_status_no_untracked(
+    tsrc_cli: CLI,
+    git_server: GitServer,
+    workspace_path: Path,
+    message_recorder: MessageRecorder,
+) -> None:
+    git_server.add_repo("foo")
+    tsrc_cli.run("init", git_server.manifest_url)
+    (workspace_path / "foo/untracked.txt").write_text("new")
+
+    tsrc_cli.run("status", "--no-untracked")
+
+    assert message_recorder.find(r"\* foo master")
+    assert not message_recorder.find(r"\(dirty\)")
+
+
+def test_status_branch_only(
+    tsrc_cli: CLI,
+    git_server: GitServer,
+    workspace_path: Path,
+    message_recorder: MessageRecorder,
+) -> None:
+    git_server.add_repo("foo")
+    tsrc_cli.run("init", git_server.manifest_url)
+    (workspace_path / "foo/README").write_text("changed")
+    tsrc.git.run(workspace_path / "foo", "commit", "--all", "--message", "local")
+
+    tsrc_cli.run("status", "--branch-only")
+
+    assert message_recorder.find(r"\* foo master")
+    assert not message_recorder.find("commit")
+
+
+@pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="inotify is only available on Linux"
+)
+def test_status_watch(
+    tsrc_cli: CLI, git_server: GitServer, workspace_path: Path, monkeypatch: Any
+) -> None:
+    git_server.add_repo("foo")
+    git_server.add_repo("bar")
+    tsrc_cli.run("init", git_server.manifest_url)
+    monkeypatch.setenv("GIT_OPTIONAL_LOCKS", "0")
+    workspace = tsrc.Workspace(workspace_path)
+    output = io.StringIO()
+    dashboard = tsrc.cli.status.StatusDashboard(workspace, fileobj=output)
+    dashboard.start()
+    assert "dirty" not in output.getvalue()
+
+    collected = list()
+    collect = dashboard.state.collect
+
+    def spy(repo: tsrc.Repo) -> Any:
+        collected.append(repo.src)
+        return collect(repo)
+
+    dashboard.state.collect = spy
+
+    (workspace_path / "foo/new.txt").write_text("new")
+    dashboard.run(max_rounds=1)
+    dashboard.close()
+
+    assert "foo master (dirty)" in output.getvalue()
+    # Only the repo that changed had its status collected again
+    assert collected == ["foo"]
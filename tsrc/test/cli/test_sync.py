@@ -4,6 +4,9 @@ import os
 from path import Path
 
 import tsrc.cli
+import tsrc.workspace.remote_setter
+import tsrc.workspace.state
+import tsrc.workspace.syncer
 
 from cli_ui.tests import MessageRecorder
 from tsrc.test.helpers.cli import CLI
@@ -135,6 +138,30 @@ def test_copies_are_up_to_date(
     assert (workspace_path / "top.txt").text() == "v2"
 
 
+def test_unchanged_copies_are_skipped(
+    tsrc_cli: CLI,
+    git_server: GitServer,
+    workspace_path: Path,
+    message_recorder: MessageRecorder,
+) -> None:
+    git_server.add_repo("foo")
+    git_server.push_file("foo", "foo.txt", contents="v1")
+    git_server.push_file("foo", "bar.txt", contents="v1")
+    git_server.manifest.set_repo_file_copies(
+        "foo", [("foo.txt", "top.txt"), ("bar.txt", "bar.txt")]
+    )
+    tsrc_cli.run("init", git_server.manifest_url)
+    top_mtime = (workspace_path / "top.txt").stat().st_mtime_ns
+    git_server.push_file("foo", "bar.txt", contents="v2")
+
+    message_recorder.reset()
+    tsrc_cli.run("sync")
+
+    assert (workspace_path / "top.txt").stat().st_mtime_ns == top_mtime
+    assert (workspace_path / "bar.txt").text() == "v2"
+    assert message_recorder.find("Skipped 1 unchanged copies")
+
+
 def test_copies_are_readonly(
     tsrc_cli: CLI, git_server: GitServer, workspace_path: Path
 ) -> None:
@@ -310,3 +337,182 @@ def test_fetch_additional_remotes(
     second_sha1 = tsrc.git.get_sha1(foo_path, ref="other/master")
 
     assert first_sha1 != second_sha1, "remote 'other' was not fetched"
+
+
+def test_failed_remotes_are_reported_by_name(
+    tsrc_cli: CLI,
+    git_server: GitServer,
+    workspace_path: Path,
+    message_recorder: MessageRecorder,
+) -> None:
+    foo_url = git_server.add_repo("foo")
+    upstream_url = git_server.add_repo("upstream")
+    broken_url = str(workspace_path.parent / "no-such-repo")
+    git_server.manifest.set_repo_remotes(
+        "foo",
+        [("origin", foo_url), ("upstream", upstream_url), ("broken", broken_url)],
+    )
+    tsrc_cli.run("init", git_server.manifest_url)
+    git_server.push_file("upstream", "new.txt")
+
+    message_recorder.reset()
+    tsrc_cli.run("sync", expect_fail=True)
+
+    assert message_recorder.find("fetch from broken failed")
+    assert not message_recorder.find("fetch from upstream failed")
+    upstream_sha1 = tsrc.git.get_sha1(workspace_path / "foo", ref="upstream/master")
+    assert upstream_sha1 == tsrc.git.get_sha1(git_server.get_path("upstream"))
+
+
+def test_only_changed_remotes_are_updated(
+    tsrc_cli: CLI,
+    git_server: GitServer,
+    workspace_path: Path,
+    message_recorder: MessageRecorder,
+) -> None:
+    foo_url = git_server.add_repo("foo")
+    git_server.add_repo("bar")
+    tsrc_cli.run("init", git_server.manifest_url)
+    mirror_path = workspace_path.parent / "mirror.git"
+    tsrc.git.run(workspace_path, "clone", "--bare", foo_url, mirror_path)
+    mirror_url = "file://" + str(mirror_path)
+    git_server.manifest.set_repo_url("foo", mirror_url)
+
+    message_recorder.reset()
+    tsrc_cli.run("sync")
+
+    _, actual_url = tsrc.git.run_captured(
+        workspace_path / "foo", "remote", "get-url", "origin"
+    )
+    assert actual_url == mirror_url
+    assert message_recorder.find("foo: Update remote origin")
+    assert not message_recorder.find("bar: Update remote")
+
+
+def test_remotes_are_not_read_again_when_config_is_unchanged(
+    tsrc_cli: CLI, git_server: GitServer, workspace_path: Path, monkeypatch: Any
+) -> None:
+    git_server.add_repo("foo")
+    git_server.add_repo("bar")
+    tsrc_cli.run("init", git_server.manifest_url)
+    tsrc.git.run(workspace_path / "bar", "config", "core.autocrlf", "false")
+    read = list()
+
+    def get_remote_urls(self: Any, repo: tsrc.Repo) -> Any:
+        read.append(repo.src)
+        return {"origin": repo.remotes[0].url}
+
+    monkeypatch.setattr(
+        tsrc.workspace.remote_setter.RemoteSetter, "get_remote_urls", get_remote_urls
+    )
+    tsrc_cli.run("sync")
+
+    assert read == ["bar"]
+    state = tsrc.workspace.state.StateStore(workspace_path)
+    assert state.get_repo("foo").last_fetch
+    assert state.get_repo("foo").remotes == {"origin": git_server.get_url("foo")}
+
+
+def test_sync_commits_state_after_each_repo(
+    tsrc_cli: CLI, git_server: GitServer, workspace_path: Path, monkeypatch: Any
+) -> None:
+    git_server.add_repo("bar")
+    git_server.add_repo("foo")
+    tsrc_cli.run("init", git_server.manifest_url)
+    sync_repo_to_branch = tsrc.workspace.syncer.Syncer.sync_repo_to_branch
+    seen = dict()
+
+    def spy(repo_path: Path) -> None:
+        if repo_path.name == "foo":
+            other = tsrc.workspace.state.StateStore(workspace_path)
+            seen["bar"] = other.get_repo("bar").sync_duration
+            other.close()
+        sync_repo_to_branch(repo_path)
+
+    monkeypatch.setattr(
+        tsrc.workspace.syncer.Syncer, "sync_repo_to_branch", staticmethod(spy)
+    )
+    tsrc_cli.run("sync")
+
+    assert seen["bar"] is not None
+
+
+def test_pinned_repos_already_at_ref_are_left_alone(
+    tsrc_cli: CLI,
+    git_server: GitServer,
+    workspace_path: Path,
+    message_recorder: MessageRecorder,
+) -> None:
+    git_server.add_repo("foo")
+    git_server.tag("foo", "v0.1")
+    git_server.manifest.set_repo_tag("foo", "v0.1")
+    tsrc_cli.run("init", git_server.manifest_url)
+    # Local changes are not a problem as long as there is nothing to reset
+    (workspace_path / "foo/untracked.txt").write_text("")
+
+    message_recorder.reset()
+    tsrc_cli.run("sync")
+
+    assert message_recorder.find("Already at v0.1")
+    assert not message_recorder.find("Resetting")
+
+
+def test_narrow_sync_only_fetches_the_branch(
+    tsrc_cli: CLI, git_server: GitServer, workspace_path: Path
+) -> None:
+    git_server.add_repo("foo")
+    tsrc_cli.run("init", git_server.manifest_url)
+    git_server.push_file("foo", "new.txt")
+    git_server.tag("foo", "ci-1")
+    git_server.change_repo_branch("foo", "other")
+    git_server.push_file("foo", "other.txt")
+
+    tsrc_cli.run("sync", "--narrow")
+
+    foo_path = workspace_path / "foo"
+    assert (foo_path / "new.txt").exists()
+    _, tags = tsrc.git.run_captured(foo_path, "tag")
+    assert "ci-1" not in tags
+    rc, _ = tsrc.git.run_captured(foo_path, "rev-parse", "origin/other", check=False)
+    assert rc != 0
+
+
+def test_narrow_sync_with_remote_lacking_the_branch(
+    tsrc_cli: CLI, git_server: GitServer, workspace_path: Path
+) -> None:
+    """ Scenario:
+    * Create a 'foo' repo with an other remote named 'fork', which does
+      not have the 'master' branch
+    * Check that `tsrc sync --narrow` still works
+    """
+    foo_url = git_server.add_repo("foo")
+    fork_url = git_server.add_repo("fork", add_to_manifest=False, default_branch="other")
+    git_server.manifest.set_repo_remotes("foo", [("origin", foo_url), ("fork", fork_url)])
+    tsrc_cli.run("init", git_server.manifest_url)
+    git_server.push_file("foo", "new.txt")
+
+    tsrc_cli.run("sync", "--narrow")
+
+    assert (workspace_path / "foo/new.txt").exists()
+
+
+def test_narrow_sync_pinned_repos(
+    tsrc_cli: CLI, git_server: GitServer, workspace_path: Path
+) -> None:
+    git_server.add_repo("foo")
+    git_server.tag("foo", "v0.1")
+    git_server.manifest.set_repo_tag("foo", "v0.1")
+    git_server.add_repo("bar")
+    git_server.manifest.set_repo_sha1("bar", git_server.get_sha1("bar"))
+    tsrc_cli.run("init", git_server.manifest_url)
+
+    git_server.push_file("foo", "new.txt")
+    git_server.tag("foo", "v0.2")
+    git_server.manifest.set_repo_tag("foo", "v0.2")
+    git_server.push_file("bar", "new.txt")
+    git_server.manifest.set_repo_sha1("bar", git_server.get_sha1("bar"))
+
+    tsrc_cli.run("sync", "--narrow")
+
+    assert (workspace_path / "foo/new.txt").exists()
+    assert (workspace_path / "bar/new.txt").exists()
@@ -0,0 +1,42 @@
+from path import Path
+
+import tsrc.git
+
+from cli_ui.tests import MessageRecorder
+from tsrc.test.helpers.cli import CLI
+from tsrc.test.helpers.git_server import GitServer
+
+
+def test_tune(
+    tsrc_cli: CLI,
+    git_server: GitServer,
+    workspace_path: Path,
+    message_recorder: MessageRecorder,
+) -> None:
+    git_server.add_repo("foo")
+    git_server.add_repo("bar")
+    tsrc_cli.run("init", git_server.manifest_url)
+
+    tsrc_cli.run("tune")
+
+    foo_path = workspace_path / "foo"
+    _, untracked_cache = tsrc.git.run_captured(
+        foo_path, "config", "core.untrackedCache"
+    )
+    assert untracked_cache == "true"
+    _, index_version = tsrc.git.run_captured(foo_path, "config", "index.version")
+    assert index_version == "4"
+    assert (foo_path / ".git/objects/info/commit-graph").exists()
+    assert message_recorder.find(r"before: \d+\.\d+s")
+    assert message_recorder.find(r"after:\s+\d+\.\d+s")
+
+
+def test_tune_skips_missing_repos(
+    tsrc_cli: CLI, git_server: GitServer, workspace_path: Path
+) -> None:
+    git_server.add_repo("foo")
+    git_server.add_repo("bar")
+    tsrc_cli.run("init", git_server.manifest_url)
+    (workspace_path / "bar").rmtree()
+
+    tsrc_cli.run("tune")
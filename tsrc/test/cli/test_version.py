@@ -1,3 +1,7 @@
+from path import Path
+
+import tsrc.git
+from tsrc.cli.version import get_details
 from tsrc.test.helpers.cli import CLI
 from cli_ui.tests import MessageRecorder
 
@@ -5,3 +9,14 @@ from cli_ui.tests import MessageRecorder
 def test_version(tsrc_cli: CLI, message_recorder: MessageRecorder) -> None:
     tsrc_cli.run("version")
     assert message_recorder.find("version")
+
+
+def test_version_timing(tsrc_cli: CLI, message_recorder: MessageRecorder) -> None:
+    tsrc_cli.run("version", "--timing")
+    assert message_recorder.find(r"imports\s+\d+\.\d ms")
+    assert message_recorder.find(r"command\s+\d+\.\d ms")
+
+
+def test_details_without_commits(tmp_path: Path) -> None:
+    tsrc.git.run(tmp_path, "init")
+    assert get_details(tmp_path) == " - git: no commit yet"
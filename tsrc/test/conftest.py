@@ -5,6 +5,7 @@ from path import Path
 import pytest
 
 import tsrc
+import tsrc.cache
 
 from cli_ui.tests import MessageRecorder
 from .helpers.git_server import git_server  # noqa
@@ -18,6 +19,14 @@ def tmp_path(tmpdir: Any) -> Path:
     return Path(tmpdir.strpath)
 
 
+@pytest.fixture(autouse=True)
+def api_cache_path(tmp_path: Path, monkeypatch: Any) -> Path:
+    """ Make sure tests never use the cache of the user running them """
+    res = tmp_path / "cache"
+    monkeypatch.setattr(tsrc.cache, "get_cache_path", lambda: res)
+    return res
+
+
 @pytest.fixture
 def workspace_path(tmp_path: Path) -> Path:
     return (tmp_path / "work").mkdir()
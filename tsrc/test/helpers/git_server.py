@@ -9,6 +9,7 @@ from path import Path
 
 RepoConfig = Dict[str, Any]
 CopyConfig = Tuple[str, str]
+LinkConfig = Tuple[str, str, str]
 RemoteConfig = Tuple[str, str]
 
 
@@ -84,6 +85,12 @@ class ManifestHandler:
             copy_dicts.append({"src": copy_src, "dest": copy_dest})
         self.configure_repo(src, "copy", copy_dicts)
 
+    def set_repo_file_links(self, src: str, links: List[LinkConfig]) -> None:
+        link_dicts = list()
+        for link_src, link_dest, link_type in links:
+            link_dicts.append({"src": link_src, "dest": link_dest, "type": link_type})
+        self.configure_repo(src, "link", link_dicts)
+
     def set_repo_remotes(self, src: str, remotes: List[RemoteConfig]) -> None:
         remote_dicts = list()
         for name, url in remotes:
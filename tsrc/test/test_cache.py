@@ -0,0 +1,45 @@
+from path import Path
+
+from tsrc.cache import ApiCache, NullCache
+
+
+def test_roundtrip(tmp_path: Path) -> None:
+    cache = ApiCache(tmp_path / "api")
+    assert cache.get("gitlab/project/foo/bar") is None
+    cache.set("gitlab/project/foo/bar", {"id": 42}, ttl=60)
+    assert cache.get("gitlab/project/foo/bar") == {"id": 42}
+    assert cache.get("gitlab/project/foo/baz") is None
+
+    cache.invalidate("gitlab/project/foo/bar")
+    assert cache.get("gitlab/project/foo/bar") is None
+
+
+def test_expired_entries_are_not_used(tmp_path: Path) -> None:
+    cache = ApiCache(tmp_path)
+    cache.set("features", ["foo"], ttl=-1)
+    assert cache.get("features") is None
+
+
+def test_corrupted_entries_are_ignored(tmp_path: Path) -> None:
+    cache = ApiCache(tmp_path)
+    cache.set("features", ["foo"], ttl=60)
+    (entry_path,) = tmp_path.files("*.json")
+    entry_path.write_text("{ not json")
+    assert cache.get("features") is None
+
+    cache.set("features", ["foo"], ttl=60)
+    assert cache.get("features") == ["foo"]
+
+
+def test_write_errors_are_ignored(tmp_path: Path) -> None:
+    not_a_dir = tmp_path / "file"
+    not_a_dir.write_text("")
+    cache = ApiCache(not_a_dir / "api")
+    cache.set("features", ["foo"], ttl=60)
+    assert cache.get("features") is None
+
+
+def test_null_cache() -> None:
+    cache = NullCache()
+    cache.set("features", ["foo"], ttl=60)
+    assert cache.get("features") is None
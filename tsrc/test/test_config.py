@@ -90,3 +90,14 @@ def test_use_pure_python_types_when_not_roundtripping(tmp_path: Path) -> None:
     # should be used instead. But here we want to assert we have
     # a proper dict, and not an OrderedDict or a yaml's CommentedMap
     assert type(parsed) == type(dict())  # noqa
+
+
+def test_tsrc_config_is_only_parsed_again_when_changed(tmp_path: Path) -> None:
+    tsrc_yml_path = tmp_path / "tsrc.yml"
+    tsrc_yml_path.write_text("auth:\n  gitlab:\n    token: OLD_TOKEN\n")
+    config = tsrc.parse_tsrc_config(config_path=tsrc_yml_path)
+    assert tsrc.parse_tsrc_config(config_path=tsrc_yml_path) is config
+
+    tsrc_yml_path.write_text("auth:\n  gitlab:\n    token: NEW_SECRET_TOKEN\n")
+    config = tsrc.parse_tsrc_config(config_path=tsrc_yml_path)
+    assert config["auth"]["gitlab"]["token"] == "NEW_SECRET_TOKEN"
@@ -1,7 +1,10 @@
+import time
+
 import pytest
 import cli_ui as ui
 
 import tsrc
+import tsrc.executor
 
 
 class Kaboom(tsrc.Error):
@@ -41,3 +44,68 @@ def test_collect_errors() -> None:
     task = FakeTask()
     with pytest.raises(tsrc.ExecutorFailed):
         tsrc.run_sequence(["foo", "bar"], task)
+
+
+def test_parallel_happy() -> None:
+    task = FakeTask()
+    tsrc.run_parallel(["foo", "spam", "eggs"], task, num_jobs=2)
+
+
+def test_parallel_collect_errors_in_order() -> None:
+    class FailingTask(FakeTask):
+        def process(self, index: int, count: int, item: str) -> None:
+            # Make the first item fail last
+            if index == 0:
+                time.sleep(0.1)
+            raise Kaboom()
+
+    task = FailingTask()
+    executor = tsrc.executor.ParallelExecutor(task, num_jobs=3)
+    with pytest.raises(tsrc.ExecutorFailed):
+        executor.process(["foo", "bar", "baz"])
+    assert [item for item, _ in executor.errors] == ["foo", "bar", "baz"]
+
+
+def test_dag_respects_dependencies() -> None:
+    items = ["foo", "bar", "baz", "spam"]
+    # foo and bar depend on baz, spam depends on foo
+    dependencies = {0: [2], 1: [2], 2: list(), 3: [0]}
+    done = list()
+
+    class RecordingTask(FakeTask):
+        def process(self, index: int, count: int, item: str) -> None:
+            # Make the items that can start first finish last, if they
+            # were not waiting for their dependencies
+            time.sleep(0.05 * (len(items) - index))
+            done.append(item)
+
+    task = RecordingTask()
+    tsrc.run_dag(items, task, get_dependencies=dependencies.__getitem__, num_jobs=4)
+    assert done.index("baz") < done.index("foo")
+    assert done.index("baz") < done.index("bar")
+    assert done.index("foo") < done.index("spam")
+
+
+def test_dag_skips_only_downstream_items() -> None:
+    items = ["foo", "bar", "baz", "spam"]
+    # spam depends on baz which depends on bar, foo does not depend on anything
+    dependencies = {0: list(), 1: list(), 2: [1], 3: [2]}
+    done = list()
+
+    class RecordingTask(FakeTask):
+        def process(self, index: int, count: int, item: str) -> None:
+            done.append(item)
+            if item == "bar":
+                raise Kaboom()
+
+    task = RecordingTask()
+    executor = tsrc.executor.DagExecutor(
+        task, get_dependencies=dependencies.__getitem__, num_jobs=2
+    )
+    with pytest.raises(tsrc.ExecutorFailed):
+        executor.process(items)
+    assert sorted(done) == ["bar", "foo"]
+    assert [item for item, _ in executor.errors] == ["bar", "baz", "spam"]
+    _, spam_error = executor.errors[2]
+    assert isinstance(spam_error, tsrc.executor.DependencyFailed)
+    assert "bar" in spam_error.message
@@ -33,6 +33,11 @@ repos:
       - src: top.cmake
         dest: CMakeLists.txt
       - src: .clang-format
+    link:
+      - src: big.bin
+        dest: data/big.bin
+        type: hardlink
+      - src: .editorconfig
 """
     manifest = tsrc.Manifest()
     parsed = ruamel.yaml.safe_load(contents)
@@ -68,6 +73,10 @@ repos:
         (os.path.join("master", "top.cmake"), "CMakeLists.txt"),
         (os.path.join("master", ".clang-format"), ".clang-format"),
     ]
+    assert manifest.filelinks == [
+        (os.path.join("master", "big.bin"), "data/big.bin", "hardlink"),
+        (os.path.join("master", ".editorconfig"), ".editorconfig", "symlink"),
+    ]
 
 
 def test_get_repo() -> None:
@@ -279,3 +288,53 @@ groups:
     repos_getter.contents = contents
     assert repos_getter.get_repos(all_=False) == ["one"]
     assert repos_getter.get_repos(all_=True) == ["one", "two"]
+
+
+def test_dependencies() -> None:
+    contents = """
+repos:
+  - src: foo
+    url: git@example.com/foo
+    depends_on: [bar]
+  - src: bar
+    url: git@example.com/bar
+"""
+    manifest = tsrc.manifest.Manifest()
+    parsed = ruamel.yaml.safe_load(contents)
+    manifest.load(parsed)
+    assert manifest.get_repo("foo").depends_on == ["bar"]
+    assert manifest.get_repo("bar").depends_on == []
+
+
+def test_unknown_dependency() -> None:
+    contents = """
+repos:
+  - src: foo
+    url: git@example.com/foo
+    depends_on: [no-such]
+"""
+    manifest = tsrc.manifest.Manifest()
+    parsed = ruamel.yaml.safe_load(contents)
+    with pytest.raises(tsrc.manifest.InvalidDependencies) as e:
+        manifest.load(parsed)
+    assert "no-such" in e.value.message
+
+
+def test_dependency_cycle() -> None:
+    contents = """
+repos:
+  - src: foo
+    url: git@example.com/foo
+    depends_on: [bar]
+  - src: bar
+    url: git@example.com/bar
+    depends_on: [baz]
+  - src: baz
+    url: git@example.com/baz
+    depends_on: [foo]
+"""
+    manifest = tsrc.manifest.Manifest()
+    parsed = ruamel.yaml.safe_load(contents)
+    with pytest.raises(tsrc.manifest.InvalidDependencies) as e:
+        manifest.load(parsed)
+    assert e.value.message == "Dependency cycle: foo -> bar -> baz -> foo"
@@ -0,0 +1,69 @@
+""" Make sure tsrc starts fast, by checking what gets imported """
+
+import os
+import subprocess
+import sys
+from typing import List
+
+import pytest
+
+# Modules that take a long time to import, and should only be
+# imported by the commands that actually use them
+SLOW_MODULES = [
+    "colored_traceback",
+    "github3",
+    "gitlab",
+    "pkg_resources",
+    "ruamel.yaml",
+    "schema",
+    "xdg",
+]
+
+# Budget for `import tsrc.cli.main`, in milliseconds
+DEFAULT_IMPORT_TIME_BUDGET = 500
+
+
+def get_imported_modules(module_name: str) -> List[str]:
+    code = "import sys, {}; print('\\n'.join(sys.modules))".format(module_name)
+    out = subprocess.check_output([sys.executable, "-c", code])
+    return out.decode().splitlines()
+
+
+def get_import_time(module_name: str) -> float:
+    """ Return the cumulative time spent importing `module_name`, in
+    milliseconds, as reported by `python -X importtime`
+
+    """
+    cmd = [sys.executable, "-X", "importtime", "-c", "import %s" % module_name]
+    process = subprocess.run(cmd, stderr=subprocess.PIPE, check=True)
+    for line in process.stderr.decode().splitlines():
+        # import time: self [us] | cumulative | imported package
+        _, cumulative, name = line.split("|")
+        if name.strip() == module_name:
+            return int(cumulative) / 1000
+    assert False, "%s not found in importtime output" % module_name
+
+
+@pytest.mark.parametrize(
+    "module_name, allowed",
+    [
+        ("tsrc.cli.main", []),
+        ("tsrc.cli.status", ["ruamel.yaml", "schema", "xdg"]),
+        ("tsrc.cli.sync", ["ruamel.yaml", "schema", "xdg"]),
+        ("tsrc.cli.version", []),
+    ],
+)
+def test_slow_modules_are_not_imported(module_name: str, allowed: List[str]) -> None:
+    imported = get_imported_modules(module_name)
+    unexpected = [x for x in SLOW_MODULES if x in imported and x not in allowed]
+    assert unexpected == []
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="requires -X importtime")
+def test_import_time_budget() -> None:
+    budget = float(
+        os.environ.get("TSRC_IMPORT_TIME_BUDGET", DEFAULT_IMPORT_TIME_BUDGET)
+    )
+    # Take the best of a few runs to avoid flakiness on busy machines
+    import_time = min(get_import_time("tsrc.cli.main") for _ in range(3))
+    assert import_time < budget
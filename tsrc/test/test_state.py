@@ -0,0 +1,89 @@
+from typing import Any
+import sqlite3
+
+from path import Path
+
+import tsrc.workspace.state
+from tsrc.workspace.state import CopyRecord, StateStore
+
+
+def test_repo_roundtrip(tmp_path: Path) -> None:
+    state = StateStore(tmp_path)
+    state.update_repo("foo", remotes={"origin": "git@example.com:foo"})
+    state.update_repo("foo", synced_sha1="abc123", last_fetch=42.0)
+    state.close()
+
+    state = StateStore(tmp_path)
+    foo = state.get_repo("foo")
+    assert foo.remotes == {"origin": "git@example.com:foo"}
+    assert foo.synced_sha1 == "abc123"
+    assert foo.last_fetch == 42.0
+    assert foo.sync_duration is None
+    assert state.get_repo("bar").remotes is None
+    assert [x.src for x in state.get_repos()] == ["foo"]
+
+
+def test_copy_roundtrip(tmp_path: Path) -> None:
+    state = StateStore(tmp_path)
+    record = CopyRecord(
+        src="foo/top.txt",
+        sha1="abc123",
+        src_size=3,
+        src_mtime_ns=1,
+        dest_size=3,
+        dest_mtime_ns=2,
+    )
+    state.set_copy("top.txt", record)
+    assert state.get_copy("top.txt") == record
+    state.remove_copy("top.txt")
+    assert state.get_copy("top.txt") is None
+
+
+def test_changes_are_lost_without_commit(tmp_path: Path) -> None:
+    state = StateStore(tmp_path)
+    state.update_repo("foo", synced_sha1="abc123")
+    state.commit()
+    state.update_repo("bar", synced_sha1="def456")
+
+    other = StateStore(tmp_path)
+    assert other.get_repo("foo").synced_sha1 == "abc123"
+    assert other.get_repo("bar").synced_sha1 is None
+
+
+def test_corrupted_database_is_recreated(tmp_path: Path) -> None:
+    db_path = tmp_path / ".tsrc" / "state.db"
+    db_path.parent.makedirs_p()
+    db_path.write_bytes(b"this is not a database" * 100)
+
+    state = StateStore(tmp_path)
+    state.update_repo("foo", synced_sha1="abc123")
+
+    assert state.get_repo("foo").synced_sha1 == "abc123"
+
+
+def test_locked_database_is_not_fatal(tmp_path: Path, monkeypatch: Any) -> None:
+    monkeypatch.setattr(tsrc.workspace.state, "BUSY_TIMEOUT", 0.1)
+    state = StateStore(tmp_path)
+    state.update_repo("foo", synced_sha1="abc123")
+    state.commit()
+
+    other = sqlite3.connect(str(state.db_path))
+    other.execute("BEGIN EXCLUSIVE")
+    state.update_repo("foo", synced_sha1="def456")
+    state.commit()
+    other.rollback()
+    other.close()
+
+    assert state.get_repo("foo").synced_sha1 == "abc123"
+
+
+def test_unusable_database_is_ignored(tmp_path: Path) -> None:
+    (tmp_path / ".tsrc" / "state.db").makedirs_p()
+
+    state = StateStore(tmp_path)
+    state.update_repo("foo", synced_sha1="abc123")
+    state.commit()
+
+    assert state.get_repo("foo").synced_sha1 is None
+    assert state.get_copy("top.txt") is None
+    state.close()
@@ -0,0 +1,49 @@
+import json
+import threading
+from typing import Any
+
+from path import Path
+
+import tsrc.git
+import tsrc.tracing
+
+
+def test_disabled_by_default(monkeypatch: Any) -> None:
+    monkeypatch.delenv("TSRC_TRACE", raising=False)
+    assert tsrc.tracing.get_tracer() is None
+
+
+def test_records_git_commands(tmp_path: Path, monkeypatch: Any) -> None:
+    trace_path = tmp_path / "trace.json"
+    monkeypatch.setenv("TSRC_TRACE", trace_path)
+    repo_path = tmp_path / "repo"
+    repo_path.mkdir()
+    tsrc.git.run(repo_path, "init", "--quiet")
+
+    def worker() -> None:
+        tsrc.git.run_captured(repo_path, "status", "--porcelain")
+
+    thread = threading.Thread(target=worker, name="worker-1")
+    thread.start()
+    thread.join()
+
+    tracer = tsrc.tracing.get_tracer()
+    assert tracer
+    tracer.save()
+
+    trace = json.loads(trace_path.text())
+    events = [x for x in trace["traceEvents"] if x["ph"] == "X"]
+    init_event, status_event = events[-2:]
+    assert init_event["name"] == "git init"
+    assert init_event["args"]["cwd"] == repo_path
+    assert init_event["args"]["returncode"] == 0
+    assert init_event["args"]["output_size"] is None
+    assert status_event["args"]["argv"] == ["git", "status", "--porcelain"]
+    assert status_event["args"]["output_size"] == 0
+    assert status_event["args"]["thread"] == "worker-1"
+    assert status_event["dur"] >= 0
+
+    thread_names = [
+        x["args"]["name"] for x in trace["traceEvents"] if x["name"] == "thread_name"
+    ]
+    assert "worker-1" in thread_names
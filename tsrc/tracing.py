@@ -0,0 +1,138 @@
+""" Record git invocations to a file using the Chrome trace-event format
+
+Set the TSRC_TRACE environment variable to the path of a .json file, and
+open it with chrome://tracing or https://ui.perfetto.dev once tsrc exits.
+
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence  # noqa
+
+from path import Path
+
+TRACE_ENV_VAR = "TSRC_TRACE"
+
+# Timestamps in trace files are relative to this origin, in microseconds
+_ORIGIN = time.perf_counter()
+
+
+def now() -> float:
+    return time.perf_counter()
+
+
+def _to_us(timestamp: float) -> int:
+    return int((timestamp - _ORIGIN) * 1000000)
+
+
+class Tracer:
+    def __init__(self, output_path: Path) -> None:
+        self.output_path = output_path
+        self.pid = os.getpid()
+        self.events = list()  # type: List[Dict[str, Any]]
+        self._thread_names = dict()  # type: Dict[int, str]
+        self._lock = threading.Lock()
+
+    def record_command(
+        self,
+        working_path: Path,
+        cmd: Sequence[str],
+        *,
+        start: float,
+        end: float,
+        returncode: int,
+        output_size: Optional[int] = None
+    ) -> None:
+        thread = threading.current_thread()
+        name = " ".join(cmd[0:2])
+        event = {
+            "name": name,
+            "cat": cmd[0],
+            "ph": "X",
+            "ts": _to_us(start),
+            "dur": _to_us(end) - _to_us(start),
+            "pid": self.pid,
+            "tid": thread.ident,
+            "args": {
+                "argv": list(cmd),
+                "cwd": str(working_path),
+                "returncode": returncode,
+                "output_size": output_size,
+                "thread": thread.name,
+            },
+        }
+        with self._lock:
+            self.events.append(event)
+            self._thread_names[thread.ident or 0] = thread.name
+
+    def _metadata_events(self) -> List[Dict[str, Any]]:
+        res = list()  # type: List[Dict[str, Any]]
+        res.append(
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": self.pid,
+                "args": {"name": "tsrc"},
+            }
+        )
+        for tid, thread_name in sorted(self._thread_names.items()):
+            res.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": self.pid,
+                    "tid": tid,
+                    "args": {"name": thread_name},
+                }
+            )
+        return res
+
+    def save(self) -> None:
+        with self._lock:
+            trace_events = self._metadata_events() + list(self.events)
+        to_dump = {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+        self.output_path.write_text(json.dumps(to_dump, indent=2))
+
+
+_TRACER = None  # type: Optional[Tracer]
+_TRACER_LOCK = threading.Lock()
+
+
+def get_tracer() -> Optional[Tracer]:
+    """ Return the active tracer, or None if TSRC_TRACE is not set.
+
+    The trace file is written when the interpreter exits.
+    """
+    global _TRACER
+    trace_path = os.environ.get(TRACE_ENV_VAR)
+    if not trace_path:
+        return None
+    with _TRACER_LOCK:
+        if _TRACER is None or _TRACER.output_path != Path(trace_path):
+            _TRACER = Tracer(Path(trace_path))
+            atexit.register(_TRACER.save)
+        return _TRACER
+
+
+def record_command(
+    working_path: Path,
+    cmd: Sequence[str],
+    *,
+    start: float,
+    returncode: int,
+    output_size: Optional[int] = None
+) -> None:
+    tracer = get_tracer()
+    if not tracer:
+        return
+    tracer.record_command(
+        working_path,
+        cmd,
+        start=start,
+        end=now(),
+        returncode=returncode,
+        output_size=output_size,
+    )
@@ -0,0 +1,285 @@
+""" Know which repos of a workspace changed, using inotify """
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set  # noqa
+
+import cli_ui as ui
+from path import Path
+
+import tsrc
+import tsrc.git
+import tsrc.inotify
+
+# Used to tell manifest changes apart from repo changes
+MANIFEST_KEY = "<manifest>"
+
+# Wait for the file system to be quiet for that long before collecting
+# statuses, so that a big checkout does not trigger many refreshes
+DEBOUNCE_DELAY = 0.2
+
+# Repos that could not be watched (because they are missing, or because
+# the inotify watch limit was reached) have to be polled. Do it at most
+# that often, unless asked explicitly
+UNWATCHED_DELAY = 30.0
+
+
+def get_ignored_dirs(path: Path) -> Set[Path]:
+    """ Return the directories below `path` (including `path` itself) that
+    are ignored by git. Changes in those cannot change the output of
+    `git status`, and they are often huge (build outputs, node_modules ...)
+
+    """
+    cmd = ["ls-files", "-z", "--others", "--ignored", "--exclude-standard"]
+    cmd.append("--directory")
+    returncode, out = tsrc.git.run_captured(path, *cmd, check=False)
+    if returncode != 0:
+        # Not in a git worktree (in .git/refs/ for instance)
+        return set()
+    res = set()  # type: Set[Path]
+    for entry in out.split("\0"):
+        if entry.endswith("/"):
+            res.add((path / entry).normpath())
+    return res
+
+
+class WorkspaceWatcher:
+    """ Watch a set of named paths (usually repos), and report which ones
+    changed.
+
+    Names that could not be watched (because the path does not exist, or
+    because the inotify watch limit was reached) are kept in `unwatched`:
+    callers should assume they may have changed at any time.
+
+    """
+
+    def __init__(self) -> None:
+        self.inotify = tsrc.inotify.Inotify()
+        self.unwatched = set()  # type: Set[str]
+        self._names = dict()  # type: Dict[int, Set[str]]
+        self._paths = dict()  # type: Dict[int, Path]
+
+    def _add(self, name: str, path: Path) -> None:
+        wd = self.inotify.add_watch(path)
+        self._names.setdefault(wd, set()).add(name)
+        self._paths[wd] = path
+
+    def _add_tree(self, name: str, path: Path) -> None:
+        ignored = get_ignored_dirs(path)
+        if path.normpath() in ignored:
+            return
+        for dir_path, dir_names, _ in os.walk(path):
+            # The .git directory is handled separately, see watch_repo()
+            dir_names[:] = [
+                x
+                for x in dir_names
+                if x != ".git" and (Path(dir_path) / x).normpath() not in ignored
+            ]
+            self._add(name, Path(dir_path))
+
+    def _try(self, name: str, path: Path, func: str) -> None:
+        if not path.exists():
+            self.unwatched.add(name)
+            return
+        try:
+            getattr(self, func)(name, path)
+        except tsrc.Error:
+            self.unwatched.add(name)
+            return
+        self.unwatched.discard(name)
+
+    def watch_dir(self, name: str, path: Path) -> None:
+        """ Watch a directory, but not its sub-directories """
+        self._try(name, path, "_add")
+
+    def watch_tree(self, name: str, path: Path) -> None:
+        """ Watch a directory and all its sub-directories, except .git
+        and the ones ignored by git
+
+        """
+        self._try(name, path, "_add_tree")
+
+    def watch_repo(self, name: str, repo_path: Path) -> None:
+        """ Watch everything that can change the output of `git status`
+        in the given repo: the worktree, and the index and refs in .git/
+
+        """
+        self._try(name, repo_path, "_add_repo")
+
+    def _add_repo(self, name: str, repo_path: Path) -> None:
+        git_path = repo_path / ".git"
+        self._add_tree(name, repo_path)
+        self._add(name, git_path)
+        self._add_tree(name, git_path / "refs")
+
+    def clear(self) -> None:
+        """ Stop watching everything """
+        for wd in self._names:
+            self.inotify.remove_watch(wd)
+        self._names = dict()
+        self._paths = dict()
+        self.unwatched = set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """ Wait at most `timeout` seconds for changes, without reading them """
+        return self.inotify.wait(timeout=timeout)
+
+    def wait_for_changes(self, timeout: Optional[float] = None) -> Set[str]:
+        """ Wait at most `timeout` seconds, and return the names of the
+        paths that changed in the meantime
+
+        """
+        res = set()  # type: Set[str]
+        for event in self.inotify.read_events(timeout=timeout):
+            if event.mask & tsrc.inotify.IN_Q_OVERFLOW:
+                # Some events were lost, so anything may have changed
+                for names in self._names.values():
+                    res.update(names)
+                continue
+            names = self._names.get(event.wd, set())
+            if event.mask & tsrc.inotify.IN_IGNORED:
+                # The watched directory was removed
+                self._names.pop(event.wd, None)
+                self._paths.pop(event.wd, None)
+            res.update(names)
+            created = event.mask & (tsrc.inotify.IN_CREATE | tsrc.inotify.IN_MOVED_TO)
+            # Note: events may still be queued for watches that were
+            # removed since, by clear() or because of IN_IGNORED
+            parent_path = self._paths.get(event.wd)
+            if event.is_dir and created and event.name != ".git" and parent_path:
+                new_path = parent_path / event.name
+                for name in names:
+                    self.watch_tree(name, new_path)
+        return res
+
+    def close(self) -> None:
+        self.inotify.close()
+
+
+def get_file_digest(path: Path) -> Optional[str]:
+    try:
+        return hashlib.sha1(path.bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+class WorkspaceState:
+    """ Statuses of all the repos in the workspace, collected again
+    only when something changed.
+
+    `collect` is called with a repo and should return its status.
+
+    """
+
+    def __init__(
+        self, workspace: "tsrc.Workspace", collect: Callable[[tsrc.Repo], Any]
+    ) -> None:
+        self.workspace = workspace
+        self.collect = collect
+        self.lock = threading.RLock()
+        self.repos = list()  # type: List[tsrc.Repo]
+        self.statuses = dict()  # type: Dict[str, Any]
+        self.stale = set()  # type: Set[str]
+        self.manifest_digest = None  # type: Optional[str]
+        self.watcher = None  # type: Optional[WorkspaceWatcher]
+        # time.monotonic() of the last time unwatched repos were checked
+        self.unwatched_checked = None  # type: Optional[float]
+
+    def load(self) -> None:
+        """ (Re)load the manifest and watch every repo it contains """
+        with self.lock:
+            self.workspace.load_manifest()
+            local_manifest = self.workspace.local_manifest
+            yml_path = local_manifest.get_yml_path()
+            self.manifest_digest = self.get_manifest_digest()
+            if self.watcher:
+                self.watcher.clear()
+            else:
+                self.watcher = WorkspaceWatcher()
+            self.watcher.watch_dir(MANIFEST_KEY, local_manifest.cfg_path.parent)
+            self.watcher.watch_dir(MANIFEST_KEY, yml_path.parent)
+            self.repos = self.workspace.get_repos()
+            for repo in self.repos:
+                self.watcher.watch_repo(repo.src, self.workspace.root_path / repo.src)
+            self.statuses = dict()
+            self.stale = set(x.src for x in self.repos)
+
+    def get_manifest_digest(self) -> str:
+        local_manifest = self.workspace.local_manifest
+        paths = [local_manifest.cfg_path, local_manifest.get_yml_path()]
+        return json.dumps([get_file_digest(x) for x in paths])
+
+    def on_changes(self, changed: Set[str]) -> None:
+        with self.lock:
+            if MANIFEST_KEY in changed:
+                changed.discard(MANIFEST_KEY)
+                if self.get_manifest_digest() != self.manifest_digest:
+                    try:
+                        self.load()
+                        return
+                    except tsrc.Error as e:
+                        ui.warning("Could not reload manifest:", e)
+            self.stale.update(changed)
+
+    def process_pending_changes(self) -> None:
+        with self.lock:
+            assert self.watcher
+            changed = self.watcher.wait_for_changes(timeout=0)
+            if changed:
+                self.on_changes(changed)
+
+    def refresh(self, *, check_unwatched: bool = False) -> Set[str]:
+        """ Collect statuses of the repos that may have changed, and
+        return their names.
+
+        Repos that are not watched are only checked every UNWATCHED_DELAY
+        seconds, unless `check_unwatched` is True
+
+        """
+        with self.lock:
+            assert self.watcher
+            # Make sure changes that happened before we were called are
+            # taken into account, even if they were not read yet
+            self.process_pending_changes()
+            # Repos that could not be watched (because they are missing,
+            # for instance) may have changed at any time
+            now = time.monotonic()
+            last_checked = self.unwatched_checked
+            if last_checked is None or now - last_checked > UNWATCHED_DELAY:
+                check_unwatched = True
+            if check_unwatched:
+                self.stale.update(self.watcher.unwatched)
+                self.unwatched_checked = now
+            self.stale.discard(MANIFEST_KEY)
+            for repo in self.repos:
+                if repo.src not in self.stale:
+                    continue
+                repo_path = self.workspace.root_path / repo.src
+                if repo.src in self.watcher.unwatched and repo_path.exists():
+                    self.watcher.watch_repo(repo.src, repo_path)
+                self.statuses[repo.src] = self.collect(repo)
+            res = self.stale
+            self.stale = set()
+            return res
+
+    def wait_and_refresh(self, timeout: Optional[float] = None) -> Set[str]:
+        """ Wait at most `timeout` seconds for changes, wait for the file
+        system to be quiet, then refresh the statuses of the repos that
+        changed and return their names
+
+        """
+        assert self.watcher
+        if self.watcher.wait(timeout=timeout):
+            # Note: events are read with the lock held, so that other
+            # threads never see changes that were read but not processed yet
+            self.process_pending_changes()
+            while self.watcher.wait(timeout=DEBOUNCE_DELAY):
+                self.process_pending_changes()
+        return self.refresh()
+
+    def close(self) -> None:
+        if self.watcher:
+            self.watcher.close()
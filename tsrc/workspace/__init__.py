@@ -1,9 +1,10 @@
 """ Implementation of the tsrc Workspace: a collection of git repositories
 """
 
-from typing import Iterable, List, Tuple, Optional
+from typing import Dict, Iterable, List, Tuple, Optional
 
 from path import Path
+import cli_ui as ui
 
 import tsrc
 import tsrc.executor
@@ -11,23 +12,29 @@ import tsrc.git
 import tsrc.manifest
 
 from .manifest_config import ManifestConfig
+from .bundles import BundleCreator, create_bundle, get_manifest_bundle_path
 from .cloner import Cloner
 from .copier import FileCopier
+from .linker import FileLinker
+from .prefetcher import Prefetcher
 from .syncer import Syncer
 from .remote_setter import RemoteSetter
+from .tuner import RepoTuner
 from .local_manifest import LocalManifest
+from .state import StateStore
 
 
 class Workspace:
     def __init__(self, root_path: Path) -> None:
         self.root_path = root_path
         self.local_manifest = LocalManifest(root_path)
+        self.state = StateStore(root_path)
 
     def get_repos(self) -> List[tsrc.Repo]:
         return self.local_manifest.get_repos()
 
-    def load_manifest(self) -> None:
-        self.local_manifest.load()
+    def load_manifest(self, *, yml_path: Optional[Path] = None) -> None:
+        self.local_manifest.load(yml_path=yml_path)
 
     def get_gitlab_url(self) -> Optional[str]:
         return self.local_manifest.get_gitlab_url()
@@ -35,8 +42,10 @@ class Workspace:
     def get_github_enterprise_url(self) -> Optional[str]:
         return self.local_manifest.get_github_enterprise_url()
 
-    def configure_manifest(self, manifest_config: ManifestConfig) -> None:
-        self.local_manifest.configure(manifest_config)
+    def configure_manifest(
+        self, manifest_config: ManifestConfig, *, bundles_path: Optional[Path] = None
+    ) -> None:
+        self.local_manifest.configure(manifest_config, bundles_path=bundles_path)
 
     def update_manifest(self) -> None:
         self.local_manifest.update()
@@ -49,30 +58,82 @@ class Workspace:
     def shallow(self) -> bool:
         return self.local_manifest.shallow
 
-    def clone_missing(self) -> None:
+    def clone_missing(self, *, bundles_path: Optional[Path] = None) -> None:
         to_clone = list()
         for repo in self.get_repos():
             repo_path = self.root_path / repo.src
             if not repo_path.exists():
                 to_clone.append(repo)
-        cloner = Cloner(self.root_path, shallow=self.shallow)
+        cloner = Cloner(self.root_path, shallow=self.shallow, bundles_path=bundles_path)
         tsrc.executor.run_sequence(to_clone, cloner)
 
     def set_remotes(self) -> None:
-        remote_setter = RemoteSetter(self.root_path)
-        tsrc.executor.run_sequence(self.get_repos(), remote_setter)
+        remote_setter = RemoteSetter(self.root_path, state=self.state)
+        try:
+            tsrc.executor.run_parallel(self.get_repos(), remote_setter)
+        finally:
+            self.state.commit()
 
     def copy_files(self) -> None:
-        file_copier = FileCopier(self.root_path)
-        tsrc.executor.run_sequence(self.local_manifest.copyfiles, file_copier)
-
-    def sync(self, *, force: bool = False) -> None:
-        syncer = Syncer(self.root_path, force=force)
+        file_copier = FileCopier(self.root_path, state=self.state)
+        try:
+            tsrc.executor.run_sequence(self.local_manifest.copyfiles, file_copier)
+        finally:
+            self.state.commit()
+
+    def link_files(self) -> None:
+        file_linker = FileLinker(self.root_path)
+        tsrc.executor.run_sequence(self.local_manifest.filelinks, file_linker)
+
+    def sync(
+        self,
+        *,
+        force: bool = False,
+        narrow: bool = False,
+        bundles_path: Optional[Path] = None,
+        max_prefetch_age: Optional[float] = None
+    ) -> None:
+        syncer = Syncer(
+            self.root_path,
+            state=self.state,
+            force=force,
+            narrow=narrow,
+            bundles_path=bundles_path,
+            max_prefetch_age=max_prefetch_age,
+        )
         try:
             tsrc.executor.run_sequence(self.get_repos(), syncer)
         finally:
+            self.state.commit()
             syncer.display_bad_branches()
 
+    def prefetch(self, *, num_jobs: Optional[int] = None) -> None:
+        prefetcher = Prefetcher(self.root_path, state=self.state)
+        try:
+            tsrc.executor.run_parallel(
+                self.get_cloned_repos(), prefetcher, num_jobs=num_jobs
+            )
+        finally:
+            self.state.commit()
+
+    def create_bundles(
+        self, bundles_path: Path, *, since: Optional[Dict[str, str]] = None
+    ) -> None:
+        if self.local_manifest.clone_path.exists():
+            ui.info_1("Creating bundle for the manifest")
+            create_bundle(
+                self.local_manifest.clone_path, get_manifest_bundle_path(bundles_path)
+            )
+        bundle_creator = BundleCreator(self.root_path, bundles_path, since=since)
+        tsrc.executor.run_parallel(self.get_cloned_repos(), bundle_creator)
+
+    def get_cloned_repos(self) -> List[tsrc.Repo]:
+        return [x for x in self.get_repos() if (self.root_path / x.src).exists()]
+
+    def tune(self, *, fsmonitor: bool = True) -> None:
+        repo_tuner = RepoTuner(self.root_path, fsmonitor=fsmonitor)
+        tsrc.executor.run_sequence(self.get_cloned_repos(), repo_tuner)
+
     def enumerate_repos(self) -> Iterable[Tuple[int, tsrc.Repo, Path]]:
         """ Yield (index, repo, full_path) for all the repos """
         for i, repo in enumerate(self.get_repos()):
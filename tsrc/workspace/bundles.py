@@ -0,0 +1,111 @@
+""" Export repos of a workspace to git bundles, and import them back,
+so that a workspace can be bootstrapped without fetching everything
+from the remotes
+
+A bundles directory looks like this:
+
+    manifest.bundle     # the manifest clone, unless using `--file`
+    repos/<src>.bundle  # one per repo
+
+"""
+
+from typing import Dict, List, Optional  # noqa
+
+from path import Path
+import cli_ui as ui
+
+import tsrc
+import tsrc.executor
+import tsrc.git
+
+# Branches and tags are enough to recreate the repos, and HEAD makes
+# sure commits of repos pinned to a sha1 are included too
+BUNDLE_REFS = ["--branches", "--tags", "HEAD"]
+
+
+def get_manifest_bundle_path(bundles_path: Path) -> Path:
+    return bundles_path / "manifest.bundle"
+
+
+def get_repo_bundle_path(bundles_path: Path, src: str) -> Path:
+    return bundles_path / "repos" / (src + ".bundle")
+
+
+def create_bundle(
+    repo_path: Path, bundle_path: Path, *, since: Optional[str] = None
+) -> bool:
+    """ Write a bundle with the contents of the repo, or only with commits
+    that are not reachable from the `since` sha1. Return False if there
+    was nothing to bundle
+
+    """
+    refs = list(BUNDLE_REFS)
+    if since:
+        refs.append("^" + since)
+        _, out = tsrc.git.run_captured(repo_path, "rev-list", "--count", *refs)
+        if out == "0":
+            return False
+    bundle_path.parent.makedirs_p()
+    tsrc.git.run_captured(repo_path, "bundle", "create", bundle_path, *refs)
+    return True
+
+
+def fetch_bundle(repo_path: Path, bundle_path: Path, remote_name: str) -> bool:
+    """ Fetch branches and tags from the bundle, as if they came from
+    the given remote, so that only missing commits have to be fetched
+    from the remote afterwards. Return False if the bundle could not be
+    used, for instance because it is incremental and this repo does not
+    have the commits it is based on
+
+    """
+    refspec = "+refs/heads/*:refs/remotes/%s/*" % remote_name
+    rc, out = tsrc.git.run_captured(
+        repo_path, "fetch", "--tags", bundle_path, refspec, check=False
+    )
+    if rc != 0:
+        ui.warning("Could not use", bundle_path, "\n", out)
+        return False
+    return True
+
+
+class BundleCreator(tsrc.executor.Task[tsrc.Repo]):
+    def __init__(
+        self,
+        workspace_path: Path,
+        bundles_path: Path,
+        *,
+        since: Optional[Dict[str, str]] = None
+    ) -> None:
+        self.workspace_path = workspace_path
+        self.bundles_path = bundles_path
+        # src -> sha1 already known by the users of the bundles
+        self.since = since or dict()
+        self.up_to_date = list()  # type: List[str]
+
+    def on_start(self, *, num_items: int) -> None:
+        ui.info_1("Creating bundles for %d repos" % num_items)
+
+    def on_failure(self, *, num_errors: int) -> None:
+        ui.error("Failed to create bundles")
+
+    def on_success(self) -> None:
+        if self.up_to_date:
+            ui.info_2("Skipped %d repos with no new commits" % len(self.up_to_date))
+
+    def display_item(self, repo: tsrc.Repo) -> str:
+        return repo.src
+
+    def process(self, index: int, count: int, repo: tsrc.Repo) -> None:
+        repo_path = self.workspace_path / repo.src
+        bundle_path = get_repo_bundle_path(self.bundles_path, repo.src)
+        since = self.since.get(repo.src)
+        try:
+            created = create_bundle(repo_path, bundle_path, since=since)
+        except tsrc.Error as e:
+            raise tsrc.Error("git bundle failed:", e.message)
+        if created:
+            ui.info_count(index, count, repo.src, "->", bundle_path)
+        else:
+            # Do not leave a bundle from a previous run behind
+            bundle_path.remove_p()
+            self.up_to_date.append(repo.src)
@@ -1,3 +1,4 @@
+from typing import Optional  # noqa
 import textwrap
 
 from path import Path
@@ -6,12 +7,20 @@ import cli_ui as ui
 import tsrc
 import tsrc.git
 import tsrc.executor
+from .bundles import fetch_bundle, get_repo_bundle_path
 
 
 class Cloner(tsrc.executor.Task[tsrc.Repo]):
-    def __init__(self, workspace_path: Path, *, shallow: bool = False) -> None:
+    def __init__(
+        self,
+        workspace_path: Path,
+        *,
+        shallow: bool = False,
+        bundles_path: Optional[Path] = None
+    ) -> None:
         self.workspace_path = workspace_path
         self.shallow = shallow
+        self.bundles_path = bundles_path
 
     def on_start(self, *, num_items: int) -> None:
         ui.info_2("Cloning missing repos")
@@ -56,6 +65,34 @@ class Cloner(tsrc.executor.Task[tsrc.Repo]):
         except tsrc.Error:
             raise tsrc.Error("Cloning failed")
 
+    def clone_from_bundle(self, repo: tsrc.Repo, bundle_path: Path) -> None:
+        """ Like clone_repo(), but get most of the commits from the bundle,
+        and only the missing ones from the remote
+
+        """
+        repo_path = self.workspace_path / repo.src
+        repo_path.makedirs_p()
+        first_remote = repo.remotes[0]
+        remote_name = first_remote.name
+        try:
+            tsrc.git.run(repo_path, "init", "--quiet")
+            tsrc.git.run(repo_path, "remote", "add", remote_name, first_remote.url)
+            ui.info_2("Using", bundle_path)
+            fetch_bundle(repo_path, bundle_path, remote_name)
+            tsrc.git.run(repo_path, "fetch", "--tags", remote_name)
+            if repo.tag:
+                tsrc.git.run(repo_path, "checkout", "--detach", repo.tag)
+            else:
+                remote_branch = "%s/%s" % (remote_name, repo.branch)
+                # fmt: off
+                tsrc.git.run(
+                    repo_path, "checkout", "-B", repo.branch,
+                    "--track", remote_branch
+                )
+                # fmt: on
+        except tsrc.Error:
+            raise tsrc.Error("Cloning from bundle failed")
+
     def reset_repo(self, repo: tsrc.Repo) -> None:
         repo_path = self.workspace_path / repo.src
         ref = repo.sha1
@@ -69,5 +106,11 @@ class Cloner(tsrc.executor.Task[tsrc.Repo]):
     def process(self, index: int, count: int, repo: tsrc.Repo) -> None:
         ui.info_count(index, count, repo.src)
         self.check_shallow_with_sha1(repo)
-        self.clone_repo(repo)
+        bundle_path = None  # type: Optional[Path]
+        if self.bundles_path:
+            bundle_path = get_repo_bundle_path(self.bundles_path, repo.src)
+        if bundle_path and bundle_path.exists():
+            self.clone_from_bundle(repo, bundle_path)
+        else:
+            self.clone_repo(repo)
         self.reset_repo(repo)
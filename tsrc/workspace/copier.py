@@ -1,18 +1,114 @@
 from typing import NewType, Tuple
+import errno
+import hashlib
+import os
+import shutil
 import stat
 
+import attr
 import cli_ui as ui
 from path import Path
 
 import tsrc.executor
+from .state import CopyRecord, StateStore
 
 
 Copy = NewType("Copy", Tuple[str, str])
 
+# Linux ioctl to share data blocks between two files (aka reflink),
+# supported by btrfs, xfs and others. See ioctl_ficlone(2)
+FICLONE = 0x40049409
+
+# Errors meaning the fast copy method is not available, and that we
+# should try the next one
+_UNSUPPORTED_ERRNOS = (
+    errno.EBADF,
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.ENOTTY,
+    errno.EOPNOTSUPP,
+    errno.EXDEV,
+)
+
+
+def _try_reflink(src_fd: int, dest_fd: int) -> bool:
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        fcntl.ioctl(dest_fd, FICLONE, src_fd)
+    except OSError as e:
+        if e.errno in _UNSUPPORTED_ERRNOS:
+            return False
+        raise
+    return True
+
+
+def _try_copy_file_range(src_fd: int, dest_fd: int, size: int) -> bool:
+    # Only available on Linux, since Python 3.8
+    copy_file_range = getattr(os, "copy_file_range", None)
+    if not copy_file_range:
+        return False
+    copied = 0
+    while copied < size:
+        try:
+            done = copy_file_range(src_fd, dest_fd, size - copied)
+        except OSError as e:
+            if copied == 0 and e.errno in _UNSUPPORTED_ERRNOS:
+                return False
+            raise
+        if done == 0:
+            break
+        copied += done
+    return True
+
+
+def fast_copy(src_path: Path, dest_path: Path) -> None:
+    """ Copy contents of src_path to dest_path, sharing data blocks when
+    the file system supports it (reflink), or at least copying them
+    inside the kernel (copy_file_range). Fall back to a regular copy
+    otherwise
+
+    """
+    with open(src_path, "rb") as src, open(dest_path, "wb") as dest:
+        src_fd = src.fileno()
+        dest_fd = dest.fileno()
+        if _try_reflink(src_fd, dest_fd):
+            return
+        size = os.fstat(src_fd).st_size
+        if _try_copy_file_range(src_fd, dest_fd, size):
+            return
+        shutil.copyfileobj(src, dest)
+
+
+def get_sha1(path: Path) -> str:
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def get_stat(path: Path) -> Tuple[int, int]:
+    """ Return size and mtime (in nanoseconds) """
+    st = path.lstat()
+    return st.st_size, st.st_mtime_ns
+
 
 class FileCopier(tsrc.executor.Task[Copy]):
-    def __init__(self, workspace_path: Path) -> None:
+    """ Copy files from the repos to the workspace.
+
+    The size, mtime and sha1 of each copied file are recorded in the
+    workspace state, so that copies can be skipped when neither the
+    source nor the destination changed since last time.
+
+    """
+
+    def __init__(self, workspace_path: Path, *, state: StateStore) -> None:
         self.workspace_path = workspace_path
+        self.state = state
+        self.num_skipped = 0
 
     def on_start(self, *, num_items: int) -> None:
         ui.info_1("Copying files")
@@ -20,21 +116,72 @@ class FileCopier(tsrc.executor.Task[Copy]):
     def on_failure(self, *, num_errors: int) -> None:
         ui.error("Failed to perform the following copies:")
 
+    def on_success(self) -> None:
+        if self.num_skipped:
+            ui.info_2("Skipped %d unchanged copies" % self.num_skipped)
+
     def display_item(self, item: Copy) -> str:
         src, dest = item
         return "%s -> %s" % (src, dest)
 
+    def is_up_to_date(self, src: str, dest: str) -> bool:
+        record = self.state.get_copy(dest)
+        if not record or record.src != src:
+            return False
+        dest_path = self.workspace_path / dest
+        if dest_path.islink() or not dest_path.isfile():
+            return False
+        if get_stat(dest_path) != (record.dest_size, record.dest_mtime_ns):
+            # Destination was modified outside of tsrc
+            return False
+        src_path = self.workspace_path / src
+        src_size, src_mtime_ns = get_stat(src_path)
+        if (src_size, src_mtime_ns) == (record.src_size, record.src_mtime_ns):
+            return True
+        if src_size != record.src_size:
+            return False
+        # Same size but different mtime (for instance because git rewrote
+        # the file): only the contents can tell
+        if get_sha1(src_path) != record.sha1:
+            return False
+        self.state.set_copy(dest, attr.evolve(record, src_mtime_ns=src_mtime_ns))
+        return True
+
     def process(self, index: int, count: int, item: Copy) -> None:
         src, dest = item
-        ui.info_count(index, count, src, "->", dest)
         try:
+            if self.is_up_to_date(src, dest):
+                ui.debug("Skipping unchanged copy", src, "->", dest)
+                self.num_skipped += 1
+                return
+            ui.info_count(index, count, src, "->", dest)
             src_path = self.workspace_path / src
             dest_path = self.workspace_path / dest
-            if dest_path.exists():
+            # Read the source stat before copying, so that a change
+            # happening during the copy is detected next time
+            src_size, src_mtime_ns = get_stat(src_path)
+            sha1 = get_sha1(src_path)
+            if dest_path.islink():
+                # Probably left over from a `link` entry
+                dest_path.remove()
+            elif dest_path.exists():
                 # Re-set the write permissions on the file:
                 dest_path.chmod(stat.S_IWRITE)
-            src_path.copy(dest_path)
+            fast_copy(src_path, dest_path)
             # Make sure perms are read only for everyone
             dest_path.chmod(0o10444)
+            dest_size, dest_mtime_ns = get_stat(dest_path)
+            record = CopyRecord(
+                src=src,
+                sha1=sha1,
+                src_size=src_size,
+                src_mtime_ns=src_mtime_ns,
+                dest_size=dest_size,
+                dest_mtime_ns=dest_mtime_ns,
+            )
+            self.state.set_copy(dest, record)
         except Exception as e:
+            self.state.remove_copy(dest)
             raise tsrc.Error(str(e))
+        finally:
+            self.state.commit()
@@ -0,0 +1,66 @@
+from typing import NewType, Tuple
+import os
+
+import cli_ui as ui
+from path import Path
+
+import tsrc.executor
+
+
+# (src, dest, type), with type being either "symlink" or "hardlink"
+Link = NewType("Link", Tuple[str, str, str])
+
+
+def is_up_to_date(src_path: Path, dest_path: Path, link_type: str) -> bool:
+    if link_type == "symlink":
+        if not dest_path.islink():
+            return False
+        return bool(dest_path.realpath() == src_path.realpath())
+    if dest_path.islink() or not dest_path.exists():
+        return False
+    return os.path.samefile(src_path, dest_path)
+
+
+class FileLinker(tsrc.executor.Task[Link]):
+    """ Create symbolic or hard links to files from the repos in the
+    workspace. Unlike copies, links never need to be updated when
+    the files change
+
+    """
+
+    def __init__(self, workspace_path: Path) -> None:
+        self.workspace_path = workspace_path
+
+    def on_start(self, *, num_items: int) -> None:
+        ui.info_1("Creating links")
+
+    def on_failure(self, *, num_errors: int) -> None:
+        ui.error("Failed to create the following links:")
+
+    def display_item(self, item: Link) -> str:
+        src, dest, link_type = item
+        return "%s -> %s (%s)" % (dest, src, link_type)
+
+    def process(self, index: int, count: int, item: Link) -> None:
+        src, dest, link_type = item
+        src_path = self.workspace_path / src
+        dest_path = self.workspace_path / dest
+        try:
+            if not src_path.exists():
+                raise tsrc.Error("%s does not exist" % src_path)
+            if is_up_to_date(src_path, dest_path, link_type):
+                return
+            ui.info_count(index, count, dest, "->", src)
+            if dest_path.islink() or dest_path.exists():
+                # Files copied by tsrc are read-only
+                if not dest_path.islink():
+                    dest_path.chmod(0o644)
+                dest_path.remove()
+            dest_path.parent.makedirs_p()
+            if link_type == "symlink":
+                # Use a relative target, so that the workspace can be moved
+                os.symlink(src_path.relpath(dest_path.parent), dest_path)
+            else:
+                src_path.link(dest_path)
+        except OSError as e:
+            raise tsrc.Error(str(e))
@@ -3,7 +3,9 @@ from path import Path
 import cli_ui as ui
 
 import tsrc
+import tsrc.git
 import tsrc.manifest
+from .bundles import get_manifest_bundle_path
 from .manifest_config import ManifestConfig
 
 
@@ -32,6 +34,11 @@ class LocalManifest:
         assert self.manifest, "manifest is empty. Did you call load()?"
         return self.manifest.copyfiles
 
+    @property
+    def filelinks(self) -> List[Tuple[str, str, str]]:
+        assert self.manifest, "manifest is empty. Did you call load()?"
+        return self.manifest.filelinks
+
     @property
     def active_groups(self) -> List[str]:
         return self.load_config().groups
@@ -40,12 +47,19 @@ class LocalManifest:
         assert self.manifest, "manifest is empty. Did you call load()?"
         return self.manifest.get_repos(groups=self.active_groups)
 
-    def load(self) -> None:
+    def get_yml_path(self) -> Path:
         config = self.load_config()
         if not config.file_path:
-            yml_path = self.clone_path / "manifest.yml"
-        else:
-            yml_path = config.file_path
+            return self.clone_path / "manifest.yml"
+        return config.file_path
+
+    def load(self, *, yml_path: Optional[Path] = None) -> None:
+        """ Load the manifest of the workspace, or the one in `yml_path`,
+        if set
+
+        """
+        if not yml_path:
+            yml_path = self.get_yml_path()
         if not yml_path.exists():
             message = "No manifest found in {}. Did you run `tsrc init` ?"
             raise tsrc.Error(message.format(yml_path))
@@ -65,11 +79,13 @@ class LocalManifest:
             return None
         return cast(Optional[str], github_enterprise_config.get("url", None))
 
-    def configure(self, manifest_config: ManifestConfig) -> None:
+    def configure(
+        self, manifest_config: ManifestConfig, *, bundles_path: Optional[Path] = None
+    ) -> None:
         if not manifest_config.url and not manifest_config.file_path:
             raise tsrc.Error("Manifest URL is required")
         if manifest_config.url:
-            self._ensure_git_state(manifest_config)
+            self._ensure_git_state(manifest_config, bundles_path=bundles_path)
         self.save_config(manifest_config)
 
     def update(self) -> None:
@@ -93,9 +109,16 @@ class LocalManifest:
     def load_config(self) -> ManifestConfig:
         return ManifestConfig.from_file(self.cfg_path)
 
-    def _ensure_git_state(self, config: ManifestConfig) -> None:
+    def _ensure_git_state(
+        self, config: ManifestConfig, *, bundles_path: Optional[Path] = None
+    ) -> None:
+        manifest_bundle_path = None  # type: Optional[Path]
+        if bundles_path:
+            manifest_bundle_path = get_manifest_bundle_path(bundles_path)
         if self.clone_path.exists():
             self._reset_manifest_clone(config)
+        elif manifest_bundle_path and manifest_bundle_path.exists():
+            self._clone_manifest_from_bundle(config, manifest_bundle_path)
         else:
             self._clone_manifest(config)
 
@@ -116,6 +139,16 @@ class LocalManifest:
             ref = "origin/%s" % config.branch
         tsrc.git.run(self.clone_path, "reset", "--hard", ref)
 
+    def _clone_manifest_from_bundle(
+        self, config: ManifestConfig, bundle_path: Path
+    ) -> None:
+        parent, name = self.clone_path.splitpath()
+        parent.makedirs_p()
+        ui.info_2("Using", bundle_path)
+        tsrc.git.run(parent, "clone", bundle_path, name)
+        # Then fetch what is missing from the real url
+        self._reset_manifest_clone(config)
+
     def _clone_manifest(self, config: ManifestConfig) -> None:
         parent, name = self.clone_path.splitpath()
         parent.makedirs_p()
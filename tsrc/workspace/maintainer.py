@@ -0,0 +1,113 @@
+from typing import Dict, List, Optional, Tuple  # noqa
+import os
+import re
+import threading
+import urllib.parse
+
+from path import Path
+import cli_ui as ui
+
+import tsrc
+import tsrc.errors
+import tsrc.executor
+import tsrc.git
+
+
+# Tasks of `git maintenance run` that only work on local data
+DEFAULT_TASKS = ["commit-graph", "loose-objects", "incremental-repack"]
+
+# Tasks that talk to the remotes
+NETWORK_TASKS = ["prefetch"]
+
+ALL_TASKS = DEFAULT_TASKS + NETWORK_TASKS
+
+
+def get_host(url: str) -> str:
+    """ Return the host name in a git url, or an empty string for local
+    paths
+
+    """
+    if "://" in url:
+        return urllib.parse.urlsplit(url).hostname or ""
+    # scp-like syntax: [user@]host:path
+    match = re.match(r"^(?:[^@/]*@)?([^:/]+):", url)
+    if match:
+        return match.group(1)
+    return ""
+
+
+def get_disk_usage(repo_path: Path) -> int:
+    """ Return the number of bytes used by the objects of the repo """
+    res = 0
+    for root, unused_dirs, files in os.walk(repo_path / ".git" / "objects"):
+        for name in files:
+            try:
+                res += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                # Removed while walking, probably by git itself
+                pass
+    return res
+
+
+class RepoMaintainer(tsrc.executor.Task[tsrc.Repo]):
+    """ Run `git maintenance run` in each repo. When some of the tasks
+    need the network, at most `jobs_per_host` repos with their first
+    remote on the same host are processed at the same time
+
+    """
+
+    def __init__(
+        self,
+        workspace_path: Path,
+        *,
+        tasks: List[str],
+        jobs_per_host: Optional[int] = None
+    ) -> None:
+        self.workspace_path = workspace_path
+        self.tasks = tasks
+        self.jobs_per_host = jobs_per_host
+        self.uses_network = any(x in NETWORK_TASKS for x in tasks)
+        self.disk_usage = dict()  # type: Dict[str, Tuple[int, int]]
+        self._host_semaphores = dict()  # type: Dict[str, threading.Semaphore]
+        self._lock = threading.Lock()
+
+    def on_start(self, *, num_items: int) -> None:
+        ui.info_1("Running %s on %d repos" % (", ".join(self.tasks), num_items))
+
+    def on_failure(self, *, num_errors: int) -> None:
+        ui.error("Maintenance failed for %d repo(s)" % num_errors)
+
+    def display_item(self, repo: tsrc.Repo) -> str:
+        return repo.src
+
+    def get_host_semaphore(self, repo: tsrc.Repo) -> Optional[threading.Semaphore]:
+        if not self.uses_network or not self.jobs_per_host or not repo.remotes:
+            return None
+        host = get_host(repo.remotes[0].url)
+        with self._lock:
+            if host not in self._host_semaphores:
+                self._host_semaphores[host] = threading.Semaphore(self.jobs_per_host)
+            return self._host_semaphores[host]
+
+    def run_maintenance(self, repo_path: Path) -> None:
+        cmd = ["maintenance", "run"]
+        for task in self.tasks:
+            cmd.append("--task=%s" % task)
+        rc, out = tsrc.git.run_captured(repo_path, *cmd, check=False)
+        if rc != 0:
+            raise tsrc.Error("git maintenance failed:", out)
+
+    def process(self, index: int, count: int, repo: tsrc.Repo) -> None:
+        repo_path = self.workspace_path / repo.src
+        if not repo_path.exists():
+            raise tsrc.errors.MissingRepo(repo.src)
+        before = get_disk_usage(repo_path)
+        semaphore = self.get_host_semaphore(repo)
+        if semaphore:
+            with semaphore:
+                self.run_maintenance(repo_path)
+        else:
+            self.run_maintenance(repo_path)
+        after = get_disk_usage(repo_path)
+        self.disk_usage[repo.src] = (before, after)
+        ui.info_count(index, count, repo.src)
@@ -0,0 +1,85 @@
+from typing import List  # noqa
+import concurrent.futures
+import time
+
+from path import Path
+import cli_ui as ui
+
+import tsrc
+import tsrc.errors
+import tsrc.executor
+import tsrc.git
+from .state import StateStore
+
+
+def get_prefetch_refspecs(remote: tsrc.Remote) -> List[str]:
+    """ Branches of each remote are stored in the same place as with
+    `git maintenance run --task=prefetch`, so that both can be used.
+    Tags are needed to sync repos pinned to a tag, so store them too,
+    separately for each remote so that they can be pruned
+
+    """
+    return [
+        "+refs/heads/*:refs/prefetch/remotes/%s/*" % remote.name,
+        "+refs/tags/*:refs/prefetch/tags/%s/*" % remote.name,
+    ]
+
+
+class Prefetcher(tsrc.executor.Task[tsrc.Repo]):
+    """ Fetch all the remotes of the repos into refs/prefetch/, without
+    touching branches, remote-tracking branches or working trees, and
+    record when this was done, so that a later `tsrc sync` can use what
+    was prefetched instead of fetching again
+
+    """
+
+    def __init__(self, workspace_path: Path, *, state: StateStore) -> None:
+        self.workspace_path = workspace_path
+        self.state = state
+
+    def on_start(self, *, num_items: int) -> None:
+        ui.info_1("Prefetching %d repos" % num_items)
+
+    def on_failure(self, *, num_errors: int) -> None:
+        ui.error("Failed to prefetch %d repo(s)" % num_errors)
+
+    def display_item(self, repo: tsrc.Repo) -> str:
+        return repo.src
+
+    @staticmethod
+    def prefetch_remote(repo_path: Path, remote: tsrc.Remote) -> None:
+        # Note: use the url from the manifest, in case the remote is
+        # not configured yet. Output is captured, so that concurrent
+        # fetches do not mix their messages
+        cmd = ["fetch", "--quiet", "--no-tags", "--prune", "--no-write-fetch-head"]
+        cmd += [remote.url] + get_prefetch_refspecs(remote)
+        returncode, out = tsrc.git.run_captured(repo_path, *cmd, check=False)
+        if returncode != 0:
+            raise tsrc.Error("fetch from %s failed:" % remote.name, out)
+
+    @staticmethod
+    def prefetch_remotes(repo_path: Path, remotes: List[tsrc.Remote]) -> None:
+        """ Fetch all the remotes concurrently. This is safe since each
+        remote has its own refs in refs/prefetch/
+
+        """
+        with concurrent.futures.ThreadPoolExecutor(len(remotes)) as pool:
+            futures = [
+                pool.submit(Prefetcher.prefetch_remote, repo_path, x) for x in remotes
+            ]
+        errors = [str(x.exception()) for x in futures if x.exception()]
+        if errors:
+            raise tsrc.Error("\n".join(errors))
+
+    def process(self, index: int, count: int, repo: tsrc.Repo) -> None:
+        repo_path = self.workspace_path / repo.src
+        if not repo_path.exists():
+            raise tsrc.errors.MissingRepo(repo.src)
+        # Only consider the repo fresh from the time the fetches started
+        start = time.time()
+        self.prefetch_remotes(repo_path, repo.remotes)
+        ui.info_count(index, count, repo.src)
+        self.state.update_repo(repo.src, last_prefetch=start)
+        # Commit right away: `tsrc prefetch` is meant to run in the background,
+        # and should not keep other tsrc commands from using the database
+        self.state.commit()
@@ -1,14 +1,24 @@
-from typing import Optional
+from typing import Dict, Optional  # noqa
 from path import Path
 import cli_ui as ui
 
 import tsrc
 import tsrc.executor
+import tsrc.git
+from .state import StateStore
+
+
+def get_config_mtime(repo_path: Path) -> Optional[int]:
+    try:
+        return int((repo_path / ".git" / "config").stat().st_mtime_ns)
+    except OSError:
+        return None
 
 
 class RemoteSetter(tsrc.executor.Task[tsrc.Repo]):
-    def __init__(self, workspace_path: Path) -> None:
+    def __init__(self, workspace_path: Path, *, state: StateStore) -> None:
         self.workspace_path = workspace_path
+        self.state = state
 
     def on_start(self, *, num_items: int) -> None:
         ui.info_1("Configuring remotes")
@@ -25,24 +35,59 @@ class RemoteSetter(tsrc.executor.Task[tsrc.Repo]):
         except Exception as error:
             raise tsrc.Error(repo.src, ":", "Failed to configure remotes")
 
+    def is_up_to_date(self, repo: tsrc.Repo, config_mtime: Optional[int]) -> bool:
+        """ Whether the remotes recorded during the last run match the
+        manifest, and .git/config did not change since then
+
+        """
+        if config_mtime is None:
+            return False
+        repo_state = self.state.get_repo(repo.src)
+        if repo_state.config_mtime_ns != config_mtime or not repo_state.remotes:
+            return False
+        for remote in repo.remotes:
+            if repo_state.remotes.get(remote.name) != remote.url:
+                return False
+        return True
+
     def try_process_repo(self, repo: tsrc.Repo) -> None:
+        repo_path = self.workspace_path / repo.src
+        if self.is_up_to_date(repo, get_config_mtime(repo_path)):
+            return
+        existing_urls = self.get_remote_urls(repo)
         for remote in repo.remotes:
-            existing_remote = self.get_remote(repo, remote.name)
-            if existing_remote:
-                if existing_remote.url != remote.url:
-                    self.set_remote(repo, remote)
-            else:
+            existing_url = existing_urls.get(remote.name)
+            if existing_url is None:
                 self.add_remote(repo, remote)
+            elif existing_url != remote.url:
+                self.set_remote(repo, remote)
+            existing_urls[remote.name] = remote.url
+        self.state.update_repo(
+            repo.src,
+            remotes=existing_urls,
+            config_mtime_ns=get_config_mtime(repo_path),
+        )
+        self.state.commit()
+
+    def get_remote_urls(self, repo: tsrc.Repo) -> Dict[str, str]:
+        """ Return the url of every remote of the repo, using only one
+        git process, so that nothing else is spawned when remotes
+        are up to date
 
-    def get_remote(self, repo: tsrc.Repo, name: str) -> Optional[tsrc.Remote]:
+        """
         full_path = self.workspace_path / repo.src
-        rc, url = tsrc.git.run_captured(
-            full_path, "remote", "get-url", name, check=False
+        rc, out = tsrc.git.run_captured(
+            full_path, "config", "--get-regexp", r"^remote\..*\.url$", check=False
         )
+        res = dict()  # type: Dict[str, str]
+        # Note: git config exits with 1 when there are no matching keys
         if rc != 0:
-            return None
-        else:
-            return tsrc.Remote(name=name, url=url)
+            return res
+        for line in out.splitlines():
+            key, url = line.split(" ", maxsplit=1)
+            name = key[len("remote.") : -len(".url")]
+            res.setdefault(name, url)
+        return res
 
     def set_remote(self, repo: tsrc.Repo, remote: tsrc.Remote) -> None:
         full_path = self.workspace_path / repo.src
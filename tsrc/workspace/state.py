@@ -0,0 +1,247 @@
+""" Remember facts about the workspace between two tsrc invocations,
+so that tsrc does not have to ask git again
+
+Everything is stored in a SQLite database in <workspace>/.tsrc/state.db.
+This is only a cache: it is fine to delete it at any time.
+
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple  # noqa
+import json
+import sqlite3
+import threading
+
+import attr
+import cli_ui as ui
+from path import Path
+
+# Bump this when changing the tables below. Databases with an
+# other version are re-created from scratch
+SCHEMA_VERSION = 2
+
+# In seconds. How long to wait for an other tsrc process to release
+# its lock on the database before giving up
+BUSY_TIMEOUT = 2.0
+
+SCHEMA = """
+CREATE TABLE repos (
+  src TEXT PRIMARY KEY,
+  last_fetch REAL,
+  last_prefetch REAL,
+  synced_sha1 TEXT,
+  remotes TEXT,
+  config_mtime_ns INTEGER,
+  sync_duration REAL
+);
+CREATE TABLE copies (
+  dest TEXT PRIMARY KEY,
+  src TEXT NOT NULL,
+  sha1 TEXT NOT NULL,
+  src_size INTEGER NOT NULL,
+  src_mtime_ns INTEGER NOT NULL,
+  dest_size INTEGER NOT NULL,
+  dest_mtime_ns INTEGER NOT NULL
+);
+"""
+
+REPO_COLUMNS = (
+    "last_fetch",
+    "last_prefetch",
+    "synced_sha1",
+    "remotes",
+    "config_mtime_ns",
+    "sync_duration",
+)
+
+
+@attr.s
+class RepoState:
+    src = attr.ib()  # type: str
+    # Seconds since epoch
+    last_fetch = attr.ib(default=None)  # type: Optional[float]
+    # Last time all remotes were fetched by `tsrc prefetch`
+    last_prefetch = attr.ib(default=None)  # type: Optional[float]
+    synced_sha1 = attr.ib(default=None)  # type: Optional[str]
+    # Remote name -> url
+    remotes = attr.ib(default=None)  # type: Optional[Dict[str, str]]
+    # mtime of .git/config when the remotes were recorded
+    config_mtime_ns = attr.ib(default=None)  # type: Optional[int]
+    # Seconds spent syncing the repo during the last `tsrc sync`
+    sync_duration = attr.ib(default=None)  # type: Optional[float]
+
+
+@attr.s(frozen=True)
+class CopyRecord:
+    src = attr.ib()  # type: str
+    sha1 = attr.ib()  # type: str
+    src_size = attr.ib()  # type: int
+    src_mtime_ns = attr.ib()  # type: int
+    dest_size = attr.ib()  # type: int
+    dest_mtime_ns = attr.ib()  # type: int
+
+
+class StateStore:
+    """ Thread-safe access to the state database.
+
+    The database is only opened when first used, and changes are only
+    written to disk when commit() is called. Callers should commit after
+    each repo, so that concurrent tsrc commands are not kept waiting.
+
+    Since this is only a cache, errors (for instance when the database is
+    locked by an other tsrc process for too long) are not fatal: reads
+    behave as if nothing was recorded, and writes are skipped
+    """
+
+    def __init__(self, workspace_path: Path) -> None:
+        self.db_path = workspace_path / ".tsrc" / "state.db"
+        self._connection = None  # type: Optional[sqlite3.Connection]
+        self._lock = threading.RLock()
+        self._warned = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection:
+            return self._connection
+        self.db_path.parent.makedirs_p()
+        try:
+            connection = self._open()
+        except sqlite3.OperationalError:
+            # Locked or read-only: the database is fine, just not usable now
+            raise
+        except sqlite3.DatabaseError:
+            # Corrupted database: since this is only a cache, start over
+            self.db_path.remove_p()
+            connection = self._open()
+        self._connection = connection
+        return connection
+
+    def _open(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            str(self.db_path), timeout=BUSY_TIMEOUT, check_same_thread=False
+        )
+        try:
+            # Let readers and the writer work at the same time, and make
+            # commits cheap enough to be done after each repo
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+        except sqlite3.OperationalError:
+            pass
+        (version,) = connection.execute("PRAGMA user_version").fetchone()
+        if version != SCHEMA_VERSION:
+            connection.executescript(
+                "DROP TABLE IF EXISTS repos; DROP TABLE IF EXISTS copies;"
+            )
+            connection.executescript(SCHEMA)
+            connection.execute("PRAGMA user_version = %d" % SCHEMA_VERSION)
+            connection.commit()
+        return connection
+
+    def _on_error(self, error: Exception) -> None:
+        ui.debug("Workspace state error:", error)
+        if not self._warned:
+            ui.warning("Could not use workspace state, ignoring:", error)
+            self._warned = True
+
+    def _query(self, query: str, params: Sequence[Any] = ()) -> List[Tuple[Any, ...]]:
+        """ Return the rows matching the query, or nothing if the database
+        cannot be read
+
+        """
+        with self._lock:
+            try:
+                return self._connect().execute(query, params).fetchall()
+            except (sqlite3.Error, OSError) as e:
+                self._on_error(e)
+                return list()
+
+    def _write(self, *statements: Tuple[str, Sequence[Any]]) -> None:
+        """ Run the statements, or none of them if the database cannot
+        be written to. Note that uncommitted changes are lost too in
+        this case
+
+        """
+        with self._lock:
+            try:
+                connection = self._connect()
+                for query, params in statements:
+                    connection.execute(query, params)
+            except (sqlite3.Error, OSError) as e:
+                self._on_error(e)
+                self._rollback()
+
+    def _rollback(self) -> None:
+        if self._connection:
+            try:
+                self._connection.rollback()
+            except sqlite3.Error:
+                pass
+
+    def get_repo(self, src: str) -> RepoState:
+        rows = self._query(
+            "SELECT %s FROM repos WHERE src = ?" % ", ".join(REPO_COLUMNS), (src,)
+        )
+        if not rows:
+            return RepoState(src=src)
+        values = dict(zip(REPO_COLUMNS, rows[0]))
+        if values["remotes"] is not None:
+            values["remotes"] = json.loads(values["remotes"])
+        return RepoState(src=src, **values)
+
+    def get_repos(self) -> List[RepoState]:
+        rows = self._query("SELECT src FROM repos ORDER BY src")
+        return [self.get_repo(x[0]) for x in rows]
+
+    def update_repo(self, src: str, **values: Any) -> None:
+        """ Update some of the columns of the given repo """
+        for key in values:
+            assert key in REPO_COLUMNS, "unknown column: %s" % key
+        if "remotes" in values and values["remotes"] is not None:
+            values["remotes"] = json.dumps(values["remotes"], sort_keys=True)
+        keys = sorted(values.keys())
+        assignments = ", ".join("%s = ?" % x for x in keys)
+        self._write(
+            ("INSERT OR IGNORE INTO repos (src) VALUES (?)", (src,)),
+            (
+                "UPDATE repos SET %s WHERE src = ?" % assignments,
+                [values[x] for x in keys] + [src],
+            ),
+        )
+
+    def get_copy(self, dest: str) -> Optional[CopyRecord]:
+        columns = [x.name for x in attr.fields(CopyRecord)]
+        rows = self._query(
+            "SELECT %s FROM copies WHERE dest = ?" % ", ".join(columns), (dest,)
+        )
+        if not rows:
+            return None
+        return CopyRecord(**dict(zip(columns, rows[0])))
+
+    def set_copy(self, dest: str, record: CopyRecord) -> None:
+        as_dict = attr.asdict(record)
+        columns = ["dest"] + sorted(as_dict.keys())
+        values = [dest] + [as_dict[x] for x in columns[1:]]
+        query = "INSERT OR REPLACE INTO copies (%s) VALUES (%s)" % (
+            ", ".join(columns),
+            ", ".join("?" for x in columns),
+        )
+        self._write((query, values))
+
+    def remove_copy(self, dest: str) -> None:
+        self._write(("DELETE FROM copies WHERE dest = ?", (dest,)))
+
+    def commit(self) -> None:
+        with self._lock:
+            if not self._connection:
+                return
+            try:
+                self._connection.commit()
+            except sqlite3.Error as e:
+                self._on_error(e)
+                self._rollback()
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._connection:
+                return
+            self.commit()
+            self._connection.close()
+            self._connection = None
@@ -1,4 +1,7 @@
-from typing import List, Tuple  # noqa
+from typing import List, Optional, Tuple  # noqa
+import re
+import time
+
 import attr
 from path import Path
 import cli_ui as ui
@@ -6,6 +9,8 @@ import cli_ui as ui
 import tsrc
 import tsrc.executor
 import tsrc.git
+from .bundles import fetch_bundle, get_repo_bundle_path
+from .state import StateStore
 
 
 class BadBranches(tsrc.Error):
@@ -19,11 +24,33 @@ class RepoAtIncorrectBranchDescription:
     expected = attr.ib()  # type: str
 
 
+def has_commit(repo_path: Path, ref: str) -> bool:
+    rc, _ = tsrc.git.run_captured(
+        repo_path, "cat-file", "-e", "%s^{commit}" % ref, check=False
+    )
+    return rc == 0
+
+
 class Syncer(tsrc.executor.Task[tsrc.Repo]):
-    def __init__(self, workspace_path: Path, *, force: bool = False) -> None:
+    def __init__(
+        self,
+        workspace_path: Path,
+        *,
+        state: StateStore,
+        force: bool = False,
+        narrow: bool = False,
+        bundles_path: Optional[Path] = None,
+        max_prefetch_age: Optional[float] = None
+    ) -> None:
         self.workspace_path = workspace_path
+        self.state = state
+        self.bundles_path = bundles_path
+        # In seconds. When set, use refs fetched by `tsrc prefetch` if they
+        # are more recent than this, instead of fetching
+        self.max_prefetch_age = max_prefetch_age
         self.bad_branches = list()  # type: List[RepoAtIncorrectBranchDescription]
         self.force = force
+        self.narrow = narrow
 
     def on_start(self, *, num_items: int) -> None:
         ui.info_1("Synchronizing workspace")
@@ -36,8 +63,23 @@ class Syncer(tsrc.executor.Task[tsrc.Repo]):
 
     def process(self, index: int, count: int, repo: tsrc.Repo) -> None:
         ui.info_count(index, count, repo.src)
+        start = time.time()
         repo_path = self.workspace_path / repo.src
-        self.fetch(repo)
+        if self.bundles_path:
+            bundle_path = get_repo_bundle_path(self.bundles_path, repo.src)
+            if bundle_path.exists():
+                ui.info_2("Using", bundle_path)
+                fetch_bundle(repo_path, bundle_path, repo.remotes[0].name)
+        fetched = False
+        if self.has_recent_prefetch(repo):
+            self.use_prefetched_refs(repo_path, repo.remotes)
+            # The tag or sha1 may have been added to the manifest since
+            if not self.has_pinned_commit(repo_path, repo):
+                fetched = self.fetch(repo)
+        else:
+            fetched = self.fetch(repo)
+        if fetched:
+            self.state.update_repo(repo.src, last_fetch=time.time())
         ref = None
 
         if repo.tag:
@@ -45,11 +87,18 @@ class Syncer(tsrc.executor.Task[tsrc.Repo]):
         elif repo.sha1:
             ref = repo.sha1
 
+        synced_sha1 = None  # type: Optional[str]
         if ref:
-            self.sync_repo_to_ref(repo_path, ref)
+            synced_sha1 = self.sync_repo_to_ref(repo_path, ref)
         else:
             self.check_branch(repo, repo_path)
             self.sync_repo_to_branch(repo_path)
+        self.state.update_repo(
+            repo.src, synced_sha1=synced_sha1, sync_duration=time.time() - start
+        )
+        # Commit right away, so that a concurrent `tsrc prefetch` does
+        # not have to wait for the whole sync to be over
+        self.state.commit()
 
     def check_branch(self, repo: tsrc.Repo, repo_path: Path) -> None:
         current_branch = None
@@ -65,28 +114,159 @@ class Syncer(tsrc.executor.Task[tsrc.Repo]):
                 )
             )
 
-    def fetch(self, repo: tsrc.Repo) -> None:
+    def has_recent_prefetch(self, repo: tsrc.Repo) -> bool:
+        if self.force or not self.max_prefetch_age:
+            return False
+        last_prefetch = self.state.get_repo(repo.src).last_prefetch
+        if not last_prefetch:
+            return False
+        return time.time() - last_prefetch < self.max_prefetch_age
+
+    @staticmethod
+    def has_pinned_commit(repo_path: Path, repo: tsrc.Repo) -> bool:
+        """ Whether the tag or sha1 the repo is pinned to, if any, is
+        present locally
+
+        """
+        if repo.tag:
+            return has_commit(repo_path, "refs/tags/%s" % repo.tag)
+        if repo.sha1:
+            return has_commit(repo_path, repo.sha1)
+        return True
+
+    @staticmethod
+    def use_prefetched_refs(repo_path: Path, remotes: List[tsrc.Remote]) -> None:
+        """ Update remote-tracking branches and tags from what `tsrc prefetch`
+        fetched, without using the network
+
+        """
+        ui.info_2("Using prefetched refs")
+        branch_refspecs = [
+            "+refs/prefetch/remotes/%s/*:refs/remotes/%s/*" % (x.name, x.name)
+            for x in remotes
+        ]
+        tag_refspecs = ["refs/prefetch/tags/%s/*:refs/tags/*" % x.name for x in remotes]
+        try:
+            tsrc.git.run(
+                repo_path, "fetch", "--quiet", "--prune", ".", *branch_refspecs
+            )
+            # Note: do not prune tags, they may come from elsewhere
+            tsrc.git.run(repo_path, "fetch", "--quiet", ".", *tag_refspecs)
+        except tsrc.Error:
+            raise tsrc.Error("updating from prefetched refs failed")
+
+    def fetch(self, repo: tsrc.Repo) -> bool:
+        """ Return False if nothing had to be fetched """
+        if self.narrow:
+            return self.narrow_fetch(repo)
         repo_path = self.workspace_path / repo.src
-        for remote in repo.remotes:
+        self.full_fetch(repo_path, repo.remotes)
+        return True
+
+    def full_fetch(self, repo_path: Path, remotes: List[tsrc.Remote]) -> None:
+        """ Fetch all the remotes at once. Git takes care of updating the
+        refs they share (like tags) one remote at a time
+
+        """
+        names = [x.name for x in remotes]
+        ui.info_2("Fetching", ", ".join(names))
+        cmd = ["fetch", "--tags", "--prune"]
+        if self.force:
+            cmd.append("--force")
+        if len(remotes) == 1:
+            cmd += names
             try:
-                ui.info_2("Fetching", remote.name)
-                cmd = ["fetch", "--tags", "--prune", remote.name]
-                if self.force:
-                    cmd.append("--force")
                 tsrc.git.run(repo_path, *cmd)
             except tsrc.Error:
-                raise tsrc.Error("fetch from %s failed" % remote.name)
+                raise tsrc.Error("fetch from %s failed" % names[0])
+            return
+        cmd += ["--multiple", "--jobs=%d" % len(remotes)] + names
+        returncode, out = tsrc.git.run_captured(repo_path, *cmd, check=False)
+        if out:
+            ui.info(out)
+        if returncode == 0:
+            return
+        failed = re.findall(r"could not fetch '(.*)'", out)
+        raise tsrc.Error("fetch from %s failed" % (", ".join(failed) or "remotes"))
+
+    def narrow_fetch(self, repo: tsrc.Repo) -> bool:
+        """ Only fetch what is needed to sync the repo from the first remote:
+        the tag or sha1 when the repo is pinned, the branch otherwise.
+        Other remotes (forks, mirrors ...) may not have them.
+
+        Nothing is fetched when the tag or sha1 is already present locally
+        """
+        repo_path = self.workspace_path / repo.src
+        remote = repo.remotes[0]
+        if repo.tag or repo.sha1:
+            if repo.tag:
+                ref = "refs/tags/%s" % repo.tag
+                refspec = "%s:%s" % (ref, ref)
+            else:
+                ref = refspec = str(repo.sha1)
+            if not self.force and has_commit(repo_path, ref):
+                ui.info_2("Found", ref, "locally, skipping fetch")
+                return False
+            try:
+                self.run_fetch(repo_path, remote, refspec)
+            except tsrc.Error:
+                if not repo.sha1:
+                    raise
+                # Some servers do not allow fetching a commit by its sha1
+                ui.warning(
+                    "Could not fetch", repo.sha1, "directly, fetching everything"
+                )
+                self.full_fetch(repo_path, [remote])
+            return True
+
+        refspec = "+refs/heads/%s:refs/remotes/%s/%s" % (
+            repo.branch,
+            remote.name,
+            repo.branch,
+        )
+        self.run_fetch(repo_path, remote, refspec)
+        return True
+
+    def run_fetch(self, repo_path: Path, remote: tsrc.Remote, refspec: str) -> None:
+        ui.info_2("Fetching", refspec, "from", remote.name)
+        cmd = ["fetch", "--no-tags", remote.name, refspec]
+        if self.force:
+            cmd.append("--force")
+        try:
+            tsrc.git.run(repo_path, *cmd)
+        except tsrc.Error:
+            raise tsrc.Error("fetch of %s from %s failed" % (refspec, remote.name))
+
+    @staticmethod
+    def resolve_ref(repo_path: Path, ref: str) -> Tuple[Optional[str], Optional[str]]:
+        """ Return the sha1s of HEAD and of the commit `ref` resolves to,
+        or (None, None) if they cannot be found
+
+        """
+        # Note: use a single process to resolve both refs
+        rc, out = tsrc.git.run_captured(
+            repo_path, "rev-parse", "HEAD", "%s^{commit}" % ref, check=False
+        )
+        lines = out.splitlines()
+        if rc != 0 or len(lines) != 2:
+            return None, None
+        return lines[0], lines[1]
 
     @staticmethod
-    def sync_repo_to_ref(repo_path: Path, ref: str) -> None:
+    def sync_repo_to_ref(repo_path: Path, ref: str) -> Optional[str]:
+        """ Return the sha1 of the commit the repo was reset to, if known """
+        head, target = Syncer.resolve_ref(repo_path, ref)
+        if head and head == target:
+            ui.info_2("Already at", ref)
+            return target
         ui.info_2("Resetting to", ref)
-        status = tsrc.git.get_status(repo_path)
-        if status.dirty:
+        if tsrc.git.is_dirty(repo_path):
             raise tsrc.Error("%s is dirty, skipping" % repo_path)
         try:
             tsrc.git.run(repo_path, "reset", "--hard", ref)
         except tsrc.Error:
             raise tsrc.Error("updating ref failed")
+        return target
 
     @staticmethod
     def sync_repo_to_branch(repo_path: Path) -> None:
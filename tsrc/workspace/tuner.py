@@ -0,0 +1,63 @@
+from typing import List, Tuple  # noqa
+
+from path import Path
+import cli_ui as ui
+
+import tsrc
+import tsrc.executor
+import tsrc.git
+
+
+# Settings known to make `git status` faster on big repositories.
+# See `git help config` for details
+PERFORMANCE_SETTINGS = [
+    ("core.untrackedCache", "true"),
+    ("feature.manyFiles", "true"),
+    ("index.version", "4"),
+    ("core.commitGraph", "true"),
+    ("fetch.writeCommitGraph", "true"),
+]  # type: List[Tuple[str, str]]
+
+
+def has_builtin_fsmonitor() -> bool:
+    """ Whether git was built with the fsmonitor daemon. This is not the
+    case on every platform
+
+    """
+    _, out = tsrc.git.run_captured(Path.getcwd(), "version", "--build-options")
+    return "feature: fsmonitor--daemon" in out
+
+
+class RepoTuner(tsrc.executor.Task[tsrc.Repo]):
+    def __init__(self, workspace_path: Path, *, fsmonitor: bool = True) -> None:
+        self.workspace_path = workspace_path
+        self.settings = list(PERFORMANCE_SETTINGS)
+        if fsmonitor:
+            if has_builtin_fsmonitor():
+                self.settings.append(("core.fsmonitor", "true"))
+            else:
+                ui.warning("git was built without fsmonitor support, skipping")
+
+    def on_start(self, *, num_items: int) -> None:
+        ui.info_1("Tuning git settings of %d repos" % num_items)
+
+    def on_failure(self, *, num_errors: int) -> None:
+        ui.error("Failed to tune %d repo(s)" % num_errors)
+
+    def display_item(self, repo: tsrc.Repo) -> str:
+        return repo.src
+
+    def process(self, index: int, count: int, repo: tsrc.Repo) -> None:
+        ui.info_count(index, count, repo.src)
+        repo_path = self.workspace_path / repo.src
+        try:
+            for key, value in self.settings:
+                tsrc.git.run(repo_path, "config", key, value)
+            # Rewrite the index right away instead of waiting for the
+            # next command that modifies it
+            tsrc.git.run(
+                repo_path, "update-index", "--index-version", "4", "--untracked-cache"
+            )
+            tsrc.git.run(repo_path, "commit-graph", "write", "--reachable")
+        except tsrc.Error as error:
+            raise tsrc.Error("Failed to tune repo:", error)